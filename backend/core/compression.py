@@ -0,0 +1,147 @@
+"""
+API javoblarini siqish (Accept-Encoding bo'yicha zstd / br / gzip).
+
+brotli va zstandard ixtiyoriy: o'rnatilmagan bo'lsa faqat gzip ishlaydi.
+Rasmlar va boshqa allaqachon siqilgan kontent siqilmaydi.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # brotli o'rnatilmagan - br taklif qilinmaydi
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard o'rnatilmagan - zstd taklif qilinmaydi
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml',
+    'text/', 'image/svg+xml',
+)
+
+
+def _gzip(content, level):
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def _brotli(content, level):
+    return brotli.compress(content, quality=level)
+
+
+def _zstd(content, level):
+    return zstandard.ZstdCompressor(level=level).compress(content)
+
+
+# Server afzalligi tartibida
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd
+if brotli is not None:
+    ENCODERS['br'] = _brotli
+ENCODERS['gzip'] = _gzip
+
+
+def parse_accept_encoding(header):
+    """'gzip;q=0.5, br' -> {'gzip': 0.5, 'br': 1.0}"""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate_encoding(request):
+    """Mijoz qabul qiladigan va serverda mavjud eng yaxshi kodlash (yoki None)"""
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODERS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    level = settings.API_COMPRESSION_LEVELS.get(encoding)
+    return ENCODERS[encoding](content, level)
+
+
+def compress_variants(content):
+    """Kesh uchun barcha mavjud kodlashlardagi variantlar ({kodlash: baytlar})"""
+    if len(content) < settings.API_COMPRESSION_MIN_SIZE:
+        return {}
+    variants = {}
+    for encoding in ENCODERS:
+        compressed = compress(content, encoding)
+        if len(compressed) < len(content):
+            variants[encoding] = compressed
+    return variants
+
+
+def set_encoded_content(response, content, encoding):
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    # Kodlangan tana baytlari boshqa - kuchli ETag kuchsizlanadi (GZipMiddleware kabi)
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+def is_compressible(request, response):
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if response.status_code < 200 or response.status_code == 206:
+        return False
+    if request.path.startswith(settings.MEDIA_URL):
+        return False
+    if any(request.path.startswith(path) for path in settings.API_COMPRESSION_EXCLUDE_PATHS):
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    API_COMPRESSION_MIN_SIZE dan katta matnli javoblarni siqish.
+
+    Keshlangan katalog javoblari allaqachon Content-Encoding bilan keladi
+    (products.cache), ular qayta siqilmaydi.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not is_compressible(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.API_COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = negotiate_encoding(request)
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) < len(response.content):
+            set_encoded_content(response, compressed, encoding)
+        return response
@@ -0,0 +1,285 @@
+"""
+/media/ fayllarini berish: lokal MEDIA_ROOT va masofaviy (Telegram) rasmlar
+uchun cheklangan disk keshi (LRU).
+
+- Masofaviy rasm birinchi so'rovda storage orqali yuklab olinib
+  MEDIA_CACHE_DIR ga yoziladi; keyingi so'rovlar diskdan.
+- Kuchli ETag, If-None-Match (304), Range/If-Range (206/416).
+- `tg:` va MEDIA_IMMUTABLE_PREFIXES dagi nomlar o'zgarmaydi - `immutable`.
+- MEDIA_OFFLOAD='x-accel-redirect' (nginx) yoki 'x-sendfile' (Apache) bo'lsa
+  fayl baytlarini Python emas, old server yuboradi (Range ham o'sha yerda).
+  nginx uchun MEDIA_ACCEL_REDIRECT_PREFIXES dagi `internal` location'lar
+  MEDIA_ROOT va MEDIA_CACHE_DIR ga `alias` qilinadi.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+MISSING_TIMEOUT = 60  # topilmagan masofaviy fayl qayta so'ralmaydigan muddat
+EVICT_RATIO = 0.9  # tozalashda kesh hajmi shu ulushgacha tushiriladi
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Baytlar bo'yicha turi (kengaytmasiz `tg:` nomlari uchun)
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF8', 'image/gif'),
+)
+
+
+def cache_key(name):
+    return hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+
+class MediaCache:
+    """
+    Masofaviy fayllar uchun disk keshi. Fayl nomi - asl nomning sha256'i;
+    LRU tartibi fayllarning atime'i (har bir murojaatda yangilanadi).
+    Bir nechta jarayon bitta papkadan foydalanishi mumkin: yozish vaqtinchalik
+    fayl + os.replace orqali.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = str(directory)
+        self.max_size = max_size
+        self.size = None  # taxminiy hajm, birinchi tozalashda hisoblanadi
+        self.size_lock = threading.Lock()
+        self.locks = [threading.Lock() for _ in range(64)]
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # mtime saqlanadi (ETag), atime - LRU uchun
+        os.utime(path, (time.time(), stat.st_mtime))
+        return path
+
+    def fetch(self, name, storage):
+        """Faylni keshga yuklab olish; topilmasa None"""
+        key = cache_key(name)
+        with self.locks[int(key[:2], 16) % len(self.locks)]:
+            path = self.get(key)
+            if path is not None:
+                return path
+            if cache.get(f'media:missing:{key}'):
+                return None
+
+            path = self.path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as target, storage.open(name, 'rb') as source:
+                    for chunk in source.chunks(CHUNK_SIZE):
+                        target.write(chunk)
+                os.replace(temp_path, path)
+            except OSError as exc:
+                os.unlink(temp_path)
+                logger.warning("Cannot fetch media %s: %s", name, exc)
+                cache.set(f'media:missing:{key}', True, MISSING_TIMEOUT)
+                return None
+
+        self.added(os.path.getsize(path))
+        return path
+
+    def added(self, size):
+        with self.size_lock:
+            if self.size is not None:
+                self.size += size
+            if self.size is None or self.size > self.max_size:
+                self.size = self.evict()
+
+    def evict(self):
+        """Eng uzoq ishlatilmagan fayllarni o'chirish; qolgan hajmni qaytaradi"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size:
+            return total
+        target = self.max_size * EVICT_RATIO
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+
+media_cache = MediaCache(settings.MEDIA_CACHE_DIR, settings.MEDIA_CACHE_MAX_SIZE)
+
+
+def local_path(name):
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:  # MEDIA_ROOT dan tashqariga chiqish urinishi
+        raise Http404
+    return path if os.path.isfile(path) else None
+
+
+def is_immutable(name):
+    return name.startswith(tuple(settings.MEDIA_IMMUTABLE_PREFIXES))
+
+
+def content_type(name, path):
+    guessed, _ = mimetypes.guess_type(name)
+    if guessed:
+        return guessed
+    with open(path, 'rb') as content:
+        head = content.read(16)
+    for signature, mime in SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def parse_range(header, size):
+    """'bytes=a-b' -> (boshi, oxiri) yoki False (qoniqtirib bo'lmaydi); bir nechta oraliq -> None"""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end or int(end) == 0:
+            return False
+        return max(0, size - int(end)), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_range(path, start, length):
+    with open(path, 'rb') as content:
+        content.seek(start)
+        while length > 0:
+            chunk = content.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def offload_response(root, path, mime):
+    response = HttpResponse(content_type=mime)
+    if settings.MEDIA_OFFLOAD == 'x-accel-redirect':
+        base = settings.MEDIA_CACHE_DIR if root == 'cache' else settings.MEDIA_ROOT
+        relative = os.path.relpath(path, base).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIXES[root] + quote(relative)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def file_response(request, path, mime, etag):
+    size = os.path.getsize(path)
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if header and (not if_range or if_range == etag):
+        byte_range = parse_range(header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=mime)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=mime)
+        response['Content-Length'] = str(size)
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    body = iter_range(path, start, length) if request.method != 'HEAD' else ()
+    response = StreamingHttpResponse(body, status=206, content_type=mime)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    return response
+
+
+def serve_media(request, path):
+    """
+    /media/<nom>: avval MEDIA_ROOT, bo'lmasa (masofaviy storage'da) disk keshi.
+    Keshda yo'q fayl faqat storage.is_servable() ruxsat bersa yuklab olinadi.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    file_path = local_path(path)
+    root = 'media'
+    if file_path is None:
+        if isinstance(default_storage, FileSystemStorage):
+            raise Http404
+        root = 'cache'
+        file_path = media_cache.get(cache_key(path))
+        if file_path is None:
+            # Ixtiyoriy nom/URL bo'yicha server tashqariga so'rov yubormasligi uchun
+            if not default_storage.is_servable(path):
+                raise Http404
+            file_path = media_cache.fetch(path, default_storage)
+        if file_path is None:
+            raise Http404
+
+    stat = os.stat(file_path)
+    if root == 'cache' and is_immutable(path):
+        # Masofaviy fayl nomi bo'yicha o'zgarmas - ETag barcha serverlarda bir xil
+        etag = f'"{cache_key(path)[:32]}"'
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    if is_immutable(path):
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+    if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponse(status=304)
+    else:
+        mime = content_type(path, file_path)
+        if settings.MEDIA_OFFLOAD:
+            response = offload_response(root, file_path, mime)
+        else:
+            response = file_response(request, file_path, mime, etag)
+            response['Accept-Ranges'] = 'bytes'
+            response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
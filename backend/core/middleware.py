@@ -1,3 +1,9 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.http import JsonResponse
+from django.template.defaultfilters import filesizeformat
+
+
 class CorsMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -12,4 +18,36 @@ class CorsMiddleware:
             response['Access-Control-Allow-Headers'] = 'Content-Type'
             response['Cross-Origin-Resource-Policy'] = 'cross-origin'
 
-        return response
\ No newline at end of file
+        return response
+
+class UploadLimitMiddleware:
+    """
+    Katta so'rovlarni erta rad etish: Content-Length UPLOAD_MAX_REQUEST_SIZE dan
+    oshsa tana o'qilmasdan 413. Yuklash paytida aniqlangan oshib ketish
+    (RequestDataTooBig, masalan products.upload_handlers) ham 413 bo'ladi.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > settings.UPLOAD_MAX_REQUEST_SIZE:
+            return self.too_large(
+                f"So'rov hajmi {filesizeformat(settings.UPLOAD_MAX_REQUEST_SIZE)} dan oshmasligi kerak"
+            )
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, RequestDataTooBig):
+            return self.too_large(str(exception))
+        return None
+
+    @staticmethod
+    def too_large(message):
+        # Connection - hop-by-hop header, WSGI ilovasi uni bera olmaydi (wsgiref/runserver
+        # AssertionError beradi); o'qilmagan tanali ulanishni server o'zi yopadi
+        return JsonResponse({'error': message}, status=413)
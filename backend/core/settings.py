@@ -27,9 +27,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'core.middleware.CorsMiddleware',
+    # CORS'dan keyin - 413 javobini ham frontend o'qiy olsin
+    'core.middleware.UploadLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,6 +81,9 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Test bazasi faylda: xotiradagi (shared cache) baza busy timeout'ni
+            # e'tiborsiz qoldiradi va parallel thread testlari "table is locked" oladi
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
@@ -105,12 +111,43 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Telegram Storage Configuration
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
 TELEGRAM_CHAT_ID = config('TELEGRAM_CHAT_ID', default='')
+TELEGRAM_API_URL = config('TELEGRAM_API_URL', default='https://api.telegram.org')
+
+# Mahsulot rasmlarining WebP nusxalari (kengliklar, px) va ularni yaratuvchi
+# jarayonlar soni (0 - so'rov ichida sinxron)
+THUMBNAIL_WIDTHS = [160, 320, 640]
+THUMBNAIL_WORKERS = config('THUMBNAIL_WORKERS', default=2, cast=int)
+
+# Telegram'ga yuklash fon thread'i (o'chirilsa faqat `process_uploads` komandasi ishlaydi)
+TELEGRAM_UPLOAD_WORKER = config('TELEGRAM_UPLOAD_WORKER', default=True, cast=bool)
+# Telegram'ga bir vaqtda yuklanadigan fayllar soni
+TELEGRAM_UPLOAD_CONCURRENCY = config('TELEGRAM_UPLOAD_CONCURRENCY', default=3, cast=int)
+
+# Buyurtmadan keyin o'xshash mahsulotlarni yangilovchi fon thread'i
+# (o'chirilsa `build_similar_products --stale` komandasi ishlatiladi)
+SIMILAR_REFRESH_WORKER = config('SIMILAR_REFRESH_WORKER', default=True, cast=bool)
+
+# Mahsulot rasmlari sha256 bo'yicha nomlanadi va takrorlari qayta saqlanmaydi
+# (products.storage); hash fayl yuklanayotganda hisoblanadi
+CONTENT_ADDRESSED_PREFIXES = ['products/']
+FILE_UPLOAD_HANDLERS = [
+    'products.upload_handlers.HashingMemoryFileUploadHandler',
+    'products.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+# Yuklash cheklovlari (bayt): bitta fayl, butun so'rov (3 ta rasm + maydonlar),
+# xotirada saqlanadigan fayl (kattasi vaqtinchalik faylga yoziladi)
+UPLOAD_MAX_FILE_SIZE = config('UPLOAD_MAX_FILE_SIZE', default=25 * 1024 * 1024, cast=int)
+UPLOAD_MAX_REQUEST_SIZE = UPLOAD_MAX_FILE_SIZE * 3 + 1024 * 1024
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+# Bitta so'rovdagi rasmlarni parallel saqlovchi thread'lar (products.storage.save_many)
+UPLOAD_SAVE_WORKERS = config('UPLOAD_SAVE_WORKERS', default=3, cast=int)
 
 # Default file storage
 if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
     DEFAULT_FILE_STORAGE = 'products.telegram_storage.TelegramStorage'
 else:
     # Fallback to local storage
+    DEFAULT_FILE_STORAGE = 'products.storage.ContentAddressedFileSystemStorage'
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -121,6 +158,21 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # WhiteNoise uchun media papkani qo'shish
 WHITENOISE_ROOT = MEDIA_ROOT
 
+# /media/ (core.media): masofaviy rasmlar disk keshi (bayt), o'zgarmas nom
+# prefikslari, qolganlari uchun brauzer keshi muddati (soniya).
+# MEDIA_OFFLOAD: '' (Python beradi), 'x-accel-redirect' (nginx), 'x-sendfile'
+MEDIA_CACHE_DIR = config('MEDIA_CACHE_DIR', default=str(BASE_DIR / 'media_cache'))
+MEDIA_CACHE_MAX_SIZE = config('MEDIA_CACHE_MAX_SIZE', default=512 * 1024 * 1024, cast=int)
+MEDIA_IMMUTABLE_PREFIXES = ['tg:', 'thumbnails/', 'products/']
+MEDIA_MAX_AGE = 3600
+MEDIA_OFFLOAD = config('MEDIA_OFFLOAD', default='')
+MEDIA_ACCEL_REDIRECT_PREFIXES = {
+    'media': '/protected/media/',
+    'cache': '/protected/media-cache/',
+}
+# Telegram rasmlari brauzerga api.telegram.org emas, /media/ orqali beriladi
+MEDIA_PROXY_REMOTE = config('MEDIA_PROXY_REMOTE', default=True, cast=bool)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
@@ -165,12 +217,60 @@ SECURE_CROSS_ORIGIN_OPENER_POLICY = None
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,
-    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_RENDERER_CLASSES': ['products.renderers.FastJSONRenderer'],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
 
+# Kesh: CACHE_DIR berilsa fayl keshi (bir nechta gunicorn worker uchun umumiy),
+# aks holda lokal xotira (faqat bitta jarayon uchun)
+CACHE_DIR = config('CACHE_DIR', default='')
+if CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'moongift',
+        }
+    }
+
+# Mehmon savati (products.guest_carts): imzolangan cookie, bazaga yozuvsiz.
+# Login / ro'yxatdan o'tishda foydalanuvchi savatiga qo'shiladi
+GUEST_CART_COOKIE_NAME = 'guest_cart'
+GUEST_CART_COOKIE_AGE = config('GUEST_CART_COOKIE_AGE', default=30 * 24 * 60 * 60, cast=int)
+GUEST_CART_MAX_LINES = 50
+
+# purge_carts: shuncha kun o'zgarmagan savatlar (bo'shlari - CART_EMPTY_IDLE_DAYS dan keyin) o'chiriladi
+CART_IDLE_DAYS = config('CART_IDLE_DAYS', default=60, cast=int)
+CART_EMPTY_IDLE_DAYS = config('CART_EMPTY_IDLE_DAYS', default=1, cast=int)
+
+# Anonim katalog javoblari keshi (soniyalarda): yangilik muddati, eskirgan
+# javobni berib turish muddati va qayta hisoblash lock'i
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=60, cast=int)
+CATALOG_CACHE_STALE_TIMEOUT = config('CATALOG_CACHE_STALE_TIMEOUT', default=600, cast=int)
+CATALOG_CACHE_LOCK_TIMEOUT = 30
+
+# Katalog facet'lari (filter paneli uchun narx gistogrammasi chegaralari, so'm)
+CATALOG_PRICE_BUCKETS = [0, 50000, 100000, 250000, 500000, 1000000]
+CATALOG_FACETS_CACHE_TIMEOUT = config('CATALOG_FACETS_CACHE_TIMEOUT', default=300, cast=int)
+
+# API javoblarini siqish (core.compression): minimal hajm (bayt) va darajalar.
+# Auth javoblarida CSRF token bor - BREACH sababli siqilmaydi
+API_COMPRESSION_MIN_SIZE = config('API_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+API_COMPRESSION_LEVELS = {
+    'gzip': config('API_COMPRESSION_GZIP_LEVEL', default=6, cast=int),
+    'br': config('API_COMPRESSION_BROTLI_LEVEL', default=5, cast=int),
+    'zstd': config('API_COMPRESSION_ZSTD_LEVEL', default=3, cast=int),
+}
+API_COMPRESSION_EXCLUDE_PATHS = ['/api/products/auth/']
+
 # ==========================================
 # JAZZMIN SOZLAMALARI
 # ==========================================
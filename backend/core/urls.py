@@ -2,25 +2,18 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.static import serve
 from django.urls import re_path
 
+from .media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/products/', include('products.urls')),
     path('api/contact/', include('contact.urls')),
+    # Media fayllar (lokal + Telegram rasmlari keshi, CORS core.middleware'da)
+    re_path(r'^media/(?P<path>.*)$', serve_media),
 ]
 
-# Media fayllarni serve qilish (CORS bilan)
-if not settings.DEBUG:
-    urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {
-            'document_root': settings.MEDIA_ROOT,
-        }),
-    ]
-else:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 admin.site.site_header = "MoonGift Admin"
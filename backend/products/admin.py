@@ -1,6 +1,10 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Category, Product, Cart, CartItem, Order, OrderItem
+from . import thumbnails
+from .carts import bump_version, recalculate_totals
+from .models import Category, Product, Cart, CartItem, Order, OrderItem, RemoteUpload, StoredBlob
 
 
 @admin.register(Category)
@@ -17,6 +21,20 @@ class CategoryAdmin(admin.ModelAdmin):
     product_count.short_description = 'Mahsulotlar Soni'
 
 
+def preview_name(product):
+    # 50px preview (retina uchun 100px) - asl rasm o'rniga eng kichik WebP nusxa
+    return thumbnails.thumbnail_name(product.image_variants, 'image', 100) or product.image.name
+
+
+class ProductChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Sahifadagi barcha preview URL'lari bitta getFile to'plamida (Telegram)
+        storage = thumbnails.image_storage()
+        if hasattr(storage, 'prefetch_urls'):
+            storage.prefetch_urls([preview_name(product) for product in self.result_list if product.image])
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['image_preview', 'name', 'category', 'formatted_price', 'discount_badge', 'is_featured', 'is_active', 'created_at']
@@ -55,11 +73,14 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_changelist(self, request, **kwargs):
+        return ProductChangeList
+
     def image_preview(self, obj):
         if obj.image:
             return format_html(
                 '<img src="{}" width="50" height="50" style="border-radius: 5px; object-fit: cover;" />',
-                obj.image.url
+                thumbnails.image_storage().url(preview_name(obj))
             )
         return '-'
 
@@ -107,9 +128,12 @@ class CartItemInline(admin.TabularInline):
     readonly_fields = ['product', 'quantity', 'subtotal']
     can_delete = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
     def subtotal(self, obj):
         if obj.pk:
-            return format_html('<b>{:,.0f} so\'m</b>', float(obj.subtotal))
+            return format_html('<b>{} so\'m</b>', '{:,.0f}'.format(obj.subtotal))
         return '-'
 
     subtotal.short_description = 'Jami'
@@ -117,19 +141,31 @@ class CartItemInline(admin.TabularInline):
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ['user', 'total_items', 'formatted_total_price', 'created_at', 'updated_at']
-    list_filter = ['created_at']
+    # Jamlar Cart ustunlarida - ro'yxat har bir savat uchun alohida so'rov qilmaydi
+    list_display = ['user', 'total_items', 'formatted_total_price', 'totals_stale', 'created_at', 'updated_at']
+    list_filter = ['totals_stale', 'created_at']
     search_fields = ['user__username', 'user__email']
-    readonly_fields = ['total_items', 'formatted_total_price', 'created_at', 'updated_at']
+    readonly_fields = ['total_items', 'formatted_total_price', 'totals_stale', 'version', 'created_at', 'updated_at']
     inlines = [CartItemInline]
+    actions = ['recalculate_totals']
 
     def formatted_total_price(self, obj):
         return format_html(
-            '<b style="color: #2e7d32;">{:,.0f} so\'m</b>',
-            float(obj.total_price)
+            '<b style="color: #2e7d32;">{} so\'m</b>',
+            '{:,.0f}'.format(obj.total_price)
         )
 
     formatted_total_price.short_description = 'Jami narx'
+    formatted_total_price.admin_order_field = 'total_price'
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Inline'da o'chirilgan elementlar - jamlar va versiya shu tranzaksiyada
+        bump_version(form.instance)
+
+    @admin.action(description="Jamlarni qayta hisoblash")
+    def recalculate_totals(self, request, queryset):
+        recalculate_totals(list(queryset.values_list('pk', flat=True)))
 
 
 class OrderItemInline(admin.TabularInline):
@@ -197,4 +233,33 @@ class OrderAdmin(admin.ModelAdmin):
         )
 
     formatted_total_price.short_description = 'Jami narx'
-    formatted_total_price.admin_order_field = 'total_price'
\ No newline at end of file
+    formatted_total_price.admin_order_field = 'total_price'
+
+
+@admin.register(RemoteUpload)
+class RemoteUploadAdmin(admin.ModelAdmin):
+    list_display = ['local_name', 'status', 'attempts', 'next_attempt_at', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['local_name', 'remote_name']
+    readonly_fields = ['local_name', 'remote_name', 'attempts', 'last_error', 'created_at', 'updated_at']
+    actions = ['retry_uploads']
+
+    @admin.action(description="Qayta yuklash")
+    def retry_uploads(self, request, queryset):
+        from .uploads import worker
+
+        queryset.exclude(status=RemoteUpload.DONE).update(
+            status=RemoteUpload.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        worker.wake()
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'upload_count', 'created_at']
+    search_fields = ['sha256', 'name']
+    readonly_fields = ['sha256', 'name', 'size', 'upload_count', 'created_at', 'updated_at']
+    ordering = ['-upload_count']
+
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,6 @@ class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
     verbose_name = 'Mahsulotlar'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import authenticate, login, logout
 from django.middleware.csrf import get_token
+from .guest_carts import merge_guest_cart
 from .serializers import UserRegistrationSerializer, UserSerializer
 
 
@@ -84,10 +85,11 @@ class UserRegisterView(APIView):
         if serializer.is_valid():
             user = serializer.save()
             login(request, user)  # Avtomatik login qilish
-            return Response({
+            response = Response({
                 'message': 'Muvaffaqiyatli ro\'yxatdan o\'tdingiz',
                 'user': UserSerializer(user).data
             }, status=status.HTTP_201_CREATED)
+            return merge_guest_cart(request, response, user)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -109,10 +111,11 @@ class UserLoginView(APIView):
 
         if user is not None:
             login(request, user)
-            return Response({
+            response = Response({
                 'message': 'Muvaffaqiyatli login qilindi',
                 'user': UserSerializer(user).data
             }, status=status.HTTP_200_OK)
+            return merge_guest_cart(request, response, user)
         else:
             return Response(
                 {'error': 'Noto\'g\'ri username yoki password'},
@@ -0,0 +1,68 @@
+"""Benchmark management komandalari uchun umumiy yordamchilar"""
+import statistics
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from .models import Category, Product
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rollback_after():
+    """Blok ichida yaratilgan barcha ma'lumotlarni oxirida bekor qilish"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def seed_catalog(count, categories=5, batch_size=1000):
+    """Benchmark uchun `count` ta faol mahsulot yaratish"""
+    cats = [
+        Category.objects.create(name=f'Bench {i}', slug=f'bench-{i}')
+        for i in range(categories)
+    ]
+    products = [
+        Product(
+            name=f'Bench mahsulot {i}',
+            slug=f'bench-mahsulot-{i}',
+            category=cats[i % categories],
+            description=f'Benchmark uchun mahsulot tavsifi {i}. ' * 10,
+            price=Decimal(10000 + (i * 7919) % 990000),
+            image=f'products/bench-{i}.jpg',
+            uzum_link='https://uzum.uz/',
+            discount_percentage=(i * 13) % 4 * 10,
+            is_featured=i % 50 == 0,
+        )
+        for i in range(count)
+    ]
+    for product in products:
+        product.effective_price = Product.calculate_effective_price(product.price, product.discount_percentage)
+        product.excerpt = Product.make_excerpt(product.description)
+    Product.objects.bulk_create(products, batch_size=batch_size)
+    return cats
+
+
+def request_factory():
+    """ALLOWED_HOSTS dagi birinchi host bilan so'rov yaratuvchi"""
+    return APIRequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+
+
+def measure(func, repeat=20):
+    """`func`ni `repeat` marta ishga tushirib, median millisekundni qaytarish"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
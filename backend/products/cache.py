@@ -0,0 +1,197 @@
+"""
+Katalog uchun versiyalangan javob keshi.
+
+Katalog versiyasi (CatalogVersion qatori) Product yoki Category o'zgarganda
+signal orqali oshiriladi; u bazada, shuning uchun lokal xotira keshi bilan
+ham barcha worker'lar o'zgarishni darhol ko'radi. Keshlangan javob o'z versiyasini saqlaydi: versiya
+mos kelmasa yoki yangilik muddati (CATALOG_CACHE_TIMEOUT) o'tgan bo'lsa javob
+"eskirgan" hisoblanadi. Eskirgan javobni faqat bitta so'rov qayta hisoblaydi
+(single-flight lock), qolganlar shu payt eski javobni olishadi
+(stale-while-revalidate). Javob keshga siqilgan variantlari bilan yoziladi,
+shuning uchun siqish faqat kesh to'ldirilganda bajariladi.
+"""
+import hashlib
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag, urlencode
+from rest_framework.request import Request
+
+from core.compression import compress_variants, negotiate_encoding, set_encoded_content
+
+from .models import CatalogVersion
+
+CATALOG_VERSION_ID = 1
+
+
+def get_catalog_state(request=None):
+    """Katalog (versiyasi, oxirgi o'zgarish vaqti); `request` berilsa so'rov davomida bir marta o'qiladi"""
+    state = getattr(request, '_catalog_state', None)
+    if state is None:
+        catalog, created = CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_ID)
+        state = (catalog.version, catalog.updated_at)
+        if request is not None:
+            request._catalog_state = state
+    return state
+
+
+def get_catalog_version(request=None):
+    return get_catalog_state(request)[0]
+
+
+def bump_catalog_version():
+    """Katalog o'zgardi - barcha keshlangan javoblar va ETag'lar eskirgan hisoblanadi"""
+    changes = {'version': F('version') + 1, 'updated_at': timezone.now()}
+    if not CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).update(**changes):
+        CatalogVersion.objects.get_or_create(pk=CATALOG_VERSION_ID)
+        CatalogVersion.objects.filter(pk=CATALOG_VERSION_ID).update(**changes)
+
+
+def request_cache_key(request, prefix='catalog:response'):
+    """Javobda mutlaq URL'lar (rasm, havolalar) bor - sxema va host ham kalitga kiradi"""
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+class CatalogCacheMixin:
+    """
+    Anonim GET so'rovlar uchun javob keshi (APIView'lar uchun mixin).
+
+    Admin va tizimga kirgan foydalanuvchilar keshni chetlab o'tadi.
+    """
+    cache_lock_wait = 2.0
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = request_cache_key(request)
+        lock_key = f'{key}:lock'
+        version = get_catalog_version(request)
+        entry = cache.get(key)
+
+        if entry is not None and self.is_fresh(entry, version):
+            return self.build_cached_response(request, entry, 'HIT')
+
+        if cache.add(lock_key, 1, settings.CATALOG_CACHE_LOCK_TIMEOUT):
+            try:
+                return self.fill_cache(key, version, request, *args, **kwargs)
+            finally:
+                cache.delete(lock_key)
+
+        if entry is not None:
+            # Boshqa so'rov qayta hisoblayapti - eski javobni berib turamiz
+            return self.build_cached_response(request, entry, 'STALE')
+
+        # Kesh bo'sh va boshqa so'rov hisoblayapti - qisqa kutib ko'ramiz
+        deadline = time.monotonic() + self.cache_lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return self.build_cached_response(request, entry, 'HIT')
+        return super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def is_cacheable(request):
+        # Middleware'siz so'rovlarda (benchmark, RequestFactory) request.user bo'lmaydi
+        user = getattr(request, 'user', None)
+        return request.method == 'GET' and not (user and user.is_authenticated)
+
+    @staticmethod
+    def is_fresh(entry, version):
+        age = time.time() - entry['created']
+        return entry['version'] == version and age < settings.CATALOG_CACHE_TIMEOUT
+
+    def fill_cache(self, key, version, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+
+        response.render()
+        entry = {
+            'version': version,
+            # Tana bilan birga shu tana hisoblangan paytdagi ETag / Last-Modified
+            'validators': getattr(self, 'validators', None),
+            'created': time.time(),
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'variants': compress_variants(response.content),
+        }
+        cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT + settings.CATALOG_CACHE_STALE_TIMEOUT)
+        self.encode_response(request, response, entry)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def encode_response(request, response, entry):
+        """Keshdagi tayyor siqilgan variantni berish (CompressionMiddleware qayta siqmaydi)"""
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request)
+        variants = entry.get('variants', {})
+        if encoding in variants:
+            set_encoded_content(response, variants[encoding], encoding)
+
+    def build_cached_response(self, request, entry, state):
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['Vary'] = 'Accept'
+        self.encode_response(request, response, entry)
+        response['X-Cache'] = state
+        # ConditionalGetMixin hozirgi emas, tana bilan saqlangan validatorlarni beradi
+        response.cached_validators = entry.get('validators')
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validatorlari va 304 javoblar (APIView'lar uchun mixin).
+
+    Validatorlar standart holda katalog versiyasidan olinadi (bitta PK so'rovi;
+    o'chirishda ham o'zgaradi), view `get_validator_values` orqali aniqroq
+    agregat berishi mumkin (mahsulot sahifasi). If-None-Match yoki If-Modified-Since mos
+    kelsa serializatsiya va kesh umuman ishlamaydi. Keshdan (HIT / STALE)
+    berilgan tana o'zi bilan saqlangan validatorlar bilan chiqadi - eski tana
+    yangi ETag ostida berilmaydi va keyingi so'rovda 304 olmaydi.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        # Filter backend'lar DRF Request (query_params) bilan ishlaydi
+        self.request, self.args, self.kwargs = Request(request), args, kwargs
+        etag, last_modified = self.validators = self.get_validators(request)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            etag, last_modified = getattr(response, 'cached_validators', None) or self.validators
+        if response.status_code in (200, 304):
+            # Siqilgan tana uchun kuchsiz ETag (If-None-Match baribir kuchsiz taqqoslanadi)
+            response['ETag'] = 'W/' + etag if response.has_header('Content-Encoding') else etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def get_validator_values(self):
+        version, updated_at = get_catalog_state(self.request._request)
+        return {'catalog_version': version, 'updated_at': updated_at}
+
+    def get_validators(self, request):
+        values = self.get_validator_values()
+        query = urlencode(sorted(request.GET.lists()), doseq=True)
+        raw = repr([request.path, query, sorted(values.items())])
+        etag = quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+        timestamps = [value for value in values.values() if isinstance(value, datetime)]
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        return etag, last_modified
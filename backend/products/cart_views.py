@@ -1,66 +1,107 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from django.shortcuts import get_object_or_404
-from .models import Cart, CartItem, Product
-from .serializers import CartSerializer, AddToCartSerializer
+from rest_framework.permissions import AllowAny
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+from .models import CartItem, Product
+from .carts import (
+    add_to_cart, apply_operations, bump_version, cart_delta, cart_etag, cart_response, create_cart, etag_matches,
+    get_or_create_cart, lock_cart, set_cart_headers,
+)
+from .guest_carts import GUEST_CART_FULL, GuestCart, guest_cart_delta, guest_cart_response
+from .serializers import AddToCartSerializer, CartBatchSerializer
+
+# Anonim foydalanuvchilar uchun savat cookie'da (products.guest_carts), buyurtma esa login talab qiladi
+
+
+def locked_cart_or_404(user):
+    """
+    Savat o'zgarishining birinchi qadami (tranzaksiya ichida): savat qatorini
+    qulflash. Qulflar checkout / batch / qo'shishdagi kabi avval savat, keyin
+    elementlar tartibida olinadi - teskari tartib deadlock berardi.
+    """
+    cart = lock_cart(user.pk)
+    if cart is None:
+        raise Http404
+    return cart
+
+
+def guest_cart_line(request, product_id):
+    """Mehmon savati va undagi qator (element id'si = mahsulot id'si)"""
+    guest = GuestCart.load(request)
+    if product_id not in guest.lines:
+        raise Http404
+    return guest
 
 
 class CartView(APIView):
     """Foydalanuvchi savati"""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def get(self, request):
         """Savatni ko'rish"""
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        if not request.user.is_authenticated:
+            guest = GuestCart.load(request)
+            if etag_matches(request.headers.get('If-None-Match'), cart_etag(guest)):
+                return set_cart_headers(Response(status=status.HTTP_304_NOT_MODIFIED), guest)
+            return guest_cart_response(guest)
+
+        cart = get_or_create_cart(request.user)
+        if etag_matches(request.headers.get('If-None-Match'), cart_etag(cart)):
+            return set_cart_headers(Response(status=status.HTTP_304_NOT_MODIFIED), cart)
+        return set_cart_headers(Response(cart_response(cart)), cart)
 
 
 class AddToCartView(APIView):
     """Savatga mahsulot qo'shish"""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def post(self, request):
         serializer = AddToCartSerializer(data=request.data)
         if serializer.is_valid():
-            product_id = serializer.validated_data['product_id']
-            quantity = serializer.validated_data['quantity']
-
-            product = get_object_or_404(Product, id=product_id, is_active=True)
-            cart, created = Cart.objects.get_or_create(user=request.user)
-
-            # Agar mahsulot allaqachon savatda bo'lsa, miqdorni yangilash
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': quantity}
+            if not request.user.is_authenticated:
+                return self.guest_post(request, serializer.validated_data)
+
+            # Mahsulot tekshiruvi, qo'shish va miqdorni oshirish - bitta upsert (carts.add_to_cart)
+            cart = add_to_cart(
+                request.user,
+                serializer.validated_data['product_id'],
+                serializer.validated_data['quantity'],
             )
+            if cart is None:
+                return Response(
+                    {'product_id': ['Mahsulot topilmadi yoki faol emas']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            if not created:
-                # Mahsulot allaqachon savatda bo'lsa, miqdorni qo'shish
-                cart_item.quantity += quantity
-                if cart_item.quantity > 99:
-                    cart_item.quantity = 99
-                cart_item.save()
-
-            cart_serializer = CartSerializer(cart)
-            return Response({
+            return set_cart_headers(Response({
                 'message': 'Mahsulot savatga qo\'shildi',
-                'cart': cart_serializer.data
-            }, status=status.HTTP_201_CREATED)
+                'cart': cart_response(cart)
+            }, status=status.HTTP_201_CREATED), cart)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def guest_post(self, request, data):
+        if not Product.objects.filter(id=data['product_id'], is_active=True).exists():
+            return Response(
+                {'product_id': ['Mahsulot topilmadi yoki faol emas']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        guest = GuestCart.load(request)
+        if guest.apply([{'op': 'add', **data}]) is None:
+            return Response({'error': GUEST_CART_FULL}, status=status.HTTP_400_BAD_REQUEST)
+        return guest_cart_response(guest, 'Mahsulot savatga qo\'shildi', status=status.HTTP_201_CREATED)
+
 
 class UpdateCartItemView(APIView):
     """Savat elementini yangilash"""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def put(self, request, item_id):
-        cart = get_object_or_404(Cart, user=request.user)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+        if not request.user.is_authenticated:
+            guest = guest_cart_line(request, item_id)
 
         quantity = request.data.get('quantity')
         if quantity is None:
@@ -79,42 +120,113 @@ class UpdateCartItemView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        cart_item.quantity = quantity
-        cart_item.save()
+        if not request.user.is_authenticated:
+            guest.apply([{'op': 'set', 'product_id': item_id, 'quantity': quantity}])
+            return guest_cart_response(guest, 'Savat yangilandi')
 
-        cart_serializer = CartSerializer(cart)
-        return Response({
+        with transaction.atomic():
+            cart = locked_cart_or_404(request.user)
+            updated = CartItem.objects.filter(id=item_id, cart=cart).update(
+                quantity=quantity, updated_at=timezone.now(),
+            )
+            if not updated:
+                raise Http404
+            bump_version(cart)
+
+        return set_cart_headers(Response({
             'message': 'Savat yangilandi',
-            'cart': cart_serializer.data
-        })
+            'cart': cart_response(cart)
+        }), cart)
 
 
 class RemoveFromCartView(APIView):
     """Savatdan mahsulotni o'chirish"""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def delete(self, request, item_id):
-        cart = get_object_or_404(Cart, user=request.user)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-        cart_item.delete()
-
-        cart_serializer = CartSerializer(cart)
-        return Response({
+        if not request.user.is_authenticated:
+            guest = guest_cart_line(request, item_id)
+            guest.apply([{'op': 'remove', 'product_id': item_id}])
+            return guest_cart_response(guest, 'Mahsulot savatdan o\'chirildi')
+
+        with transaction.atomic():
+            cart = locked_cart_or_404(request.user)
+            deleted, _ = CartItem.objects.filter(id=item_id, cart=cart).delete()
+            if not deleted:
+                raise Http404
+            bump_version(cart)
+
+        return set_cart_headers(Response({
             'message': 'Mahsulot savatdan o\'chirildi',
-            'cart': cart_serializer.data
-        })
+            'cart': cart_response(cart)
+        }), cart)
 
 
 class ClearCartView(APIView):
     """Savatni tozalash"""
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def delete(self, request):
-        cart = get_object_or_404(Cart, user=request.user)
-        cart.items.all().delete()
+        if not request.user.is_authenticated:
+            guest = GuestCart.load(request)
+            guest.apply([{'op': 'remove', 'product_id': product_id} for product_id in guest.lines])
+            return guest_cart_response(guest, 'Savat tozalandi')
+
+        with transaction.atomic():
+            cart = locked_cart_or_404(request.user)
+            CartItem.objects.filter(cart=cart).delete()
+            bump_version(cart)
 
-        cart_serializer = CartSerializer(cart)
-        return Response({
+        return set_cart_headers(Response({
             'message': 'Savat tozalandi',
-            'cart': cart_serializer.data
-        })
+            'cart': cart_response(cart)
+        }), cart)
+
+
+class CartBatchView(APIView):
+    """
+    Savatga bir nechta amalni bitta tranzaksiyada qo'llash.
+    Faqat o'zgargan qatorlar va yangi jamlar qaytadi; If-Match (savat ETag'i)
+    berilsa va savat o'shandan beri o'zgargan bo'lsa - 412.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not request.user.is_authenticated:
+            return self.guest_post(request, serializer.validated_data['operations'])
+
+        with transaction.atomic():
+            cart = lock_cart(request.user.pk)
+            if cart is None:
+                create_cart(request.user.pk)
+                cart = lock_cart(request.user.pk)
+            if_match = request.headers.get('If-Match')
+            if if_match and not etag_matches(if_match, cart_etag(cart)):
+                return set_cart_headers(Response({
+                    'error': 'Savat boshqa so\'rovda o\'zgargan',
+                    'version': cart.version,
+                }, status=status.HTTP_412_PRECONDITION_FAILED), cart)
+
+            changed, removed = apply_operations(cart, serializer.validated_data['operations'])
+            if changed or removed:
+                bump_version(cart)
+            data = cart_delta(cart, changed, removed)
+
+        return set_cart_headers(Response(data), cart)
+
+    def guest_post(self, request, operations):
+        guest = GuestCart.load(request)
+        if_match = request.headers.get('If-Match')
+        if if_match and not etag_matches(if_match, cart_etag(guest)):
+            return set_cart_headers(Response({
+                'error': 'Savat boshqa so\'rovda o\'zgargan',
+                'version': guest.version,
+            }, status=status.HTTP_412_PRECONDITION_FAILED), guest)
+
+        result = guest.apply(operations)
+        if result is None:
+            return Response({'error': GUEST_CART_FULL}, status=status.HTTP_400_BAD_REQUEST)
+        return guest_cart_delta(guest, *result)
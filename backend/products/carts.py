@@ -0,0 +1,361 @@
+"""
+Savatni o'qish modeli: elementlar mahsulotlari bilan bitta JOIN so'rovida,
+jamlar esa Cart ustunlarida (total_price / total_items) - o'qish O(1).
+
+Barcha savat view'lari javobni `cart_response` orqali quradi, shuning uchun
+so'rovlar soni savatdagi elementlar soniga bog'liq emas.
+
+Har bir o'zgarish savat qatorini qulflash (`lock_cart`) bilan boshlanadi va
+`touch_cart` bilan tugaydi: bitta UPDATE ... RETURNING
+`Cart.version` ni oshiradi (javoblardagi ETag, `cart/batch/` If-Match) va
+jamlarni savat qatorlaridan qayta yozadi - element o'zgarishi bilan bir
+tranzaksiyada. Mahsulot narxi o'zgarsa savatlar `totals_stale` deb
+belgilanadi (`mark_totals_stale`) va `reprice_carts` komandasi ularni
+partiyalab qayta hisoblaydi; ungacha o'qishda jamlar yuklangan elementlardan olinadi.
+
+`add_to_cart` - uch so'rov: savatni qulflash (`lock_cart`), CartItem upsert
+(INSERT ... ON CONFLICT, miqdor bazada oshiriladi) va `touch_cart`. Parallel
+qo'shishlarda miqdor yo'qolmaydi. Savat `create_cart` bilan (INSERT ... ON
+CONFLICT (user_id) DO NOTHING) yaratiladi - foydalanuvchida bitta savat
+(unique cheklov). SQLite 3.35+ / PostgreSQL.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Prefetch, Q
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+from .models import Cart, CartItem, Product
+from .serializers import CartDeltaSerializer, CartSerializer
+
+MAX_QUANTITY = 99
+
+
+def cart_items_queryset():
+    return CartItem.objects.select_related('product').order_by('id')
+
+
+def cart_snapshot(cart):
+    """
+    `cart.items` ni mahsulotlari bilan bitta so'rovda yuklash. Jamlar eskirgan
+    bo'lsa (narx o'zgargan, reprice_carts hali ishlamagan) shu elementlardan hisoblanadi.
+    """
+    prefetch_related_objects([cart], Prefetch('items', queryset=cart_items_queryset()))
+    if cart.totals_stale:
+        items = cart.items.all()
+        cart.total_price = sum((item.subtotal for item in items), Decimal('0')).quantize(Decimal('0.01'))
+        cart.total_items = sum(item.quantity for item in items)
+    return cart
+
+
+def cart_response(cart, context=None):
+    """CartSerializer ma'lumotlari (elementlar va jamlar oldindan yuklangan)"""
+    return CartSerializer(cart_snapshot(cart), context=context or {}).data
+
+
+# ---------- versiya va ETag ----------
+
+def _now():
+    return connection.ops.adapt_datetimefield_value(timezone.now())
+
+
+def _totals_assignments():
+    """Savat jamlarini uning qatorlaridan qayta yozuvchi SET qismi (parametr: totals_stale)"""
+    qn = connection.ops.quote_name
+    cart, item, product = (qn(model._meta.db_table) for model in (Cart, CartItem, Product))
+    lines = f"FROM {item} i WHERE i.{qn('cart_id')} = {cart}.{qn('id')}"
+    priced = (
+        f"FROM {item} i INNER JOIN {product} p ON p.{qn('id')} = i.{qn('product_id')} "
+        f"WHERE i.{qn('cart_id')} = {cart}.{qn('id')}"
+    )
+    return (
+        f"{qn('total_items')} = COALESCE((SELECT SUM(i.{qn('quantity')}) {lines}), 0), "
+        f"{qn('total_price')} = COALESCE((SELECT SUM(i.{qn('quantity')} * p.{qn('effective_price')}) {priced}), 0), "
+        f"{qn('totals_stale')} = %s"
+    )
+
+
+def touch_cart(cart_id):
+    """Versiyani oshirish, jamlarni qayta yozish va yangilangan savatni qaytarish (bitta UPDATE ... RETURNING)"""
+    qn = connection.ops.quote_name
+    sql = (
+        f"UPDATE {qn(Cart._meta.db_table)} SET {qn('version')} = {qn('version')} + 1, {qn('updated_at')} = %s, "
+        f"{_totals_assignments()} WHERE {qn('id')} = %s RETURNING *"
+    )
+    return next(iter(Cart.objects.raw(sql, [_now(), False, cart_id])), None)
+
+
+def bump_version(cart):
+    fresh = touch_cart(cart.pk)
+    for field in ('version', 'updated_at', 'total_price', 'total_items', 'totals_stale'):
+        setattr(cart, field, getattr(fresh, field))
+
+
+def mark_totals_stale(product_ids):
+    """
+    Narxi o'zgargan (yoki o'chirilayotgan) mahsulotlar bor savatlar: jamlar
+    eskirgan, versiya oshadi (ETag bilan keshlangan javob ham eskiradi).
+    """
+    return Cart.objects.filter(items__product_id__in=product_ids).update(
+        totals_stale=True, version=F('version') + 1,
+    )
+
+
+def recalculate_totals(cart_ids):
+    """Berilgan savatlar jamlarini ularning qatorlaridan qayta yozish va versiyasini oshirish (bitta UPDATE)"""
+    if not cart_ids:
+        return
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(cart_ids))
+    sql = (
+        f"UPDATE {qn(Cart._meta.db_table)} SET {qn('version')} = {qn('version')} + 1, {_totals_assignments()} "
+        f"WHERE {qn('id')} IN ({placeholders})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [False, *cart_ids])
+
+
+def reprice_stale_carts(batch_size=500):
+    """Eskirgan savatlarning bir partiyasini qayta hisoblash; yangilangan savatlar soni"""
+    cart_ids = list(Cart.objects.filter(totals_stale=True).order_by('pk').values_list('pk', flat=True)[:batch_size])
+    recalculate_totals(cart_ids)
+    return len(cart_ids)
+
+
+# ---------- tozalash (purge_carts) ----------
+
+@transaction.atomic
+def purge_idle_carts(cutoff, empty_cutoff, after=0, batch_size=500):
+    """
+    `after` dan keyingi bir partiya nofaol savatni elementlari bilan o'chirish:
+    `cutoff` dan beri o'zgarmagan yoki `empty_cutoff` dan beri bo'sh turganlar.
+    Jonli so'rov qulflagan savatlar o'tkazib yuboriladi (SKIP LOCKED).
+    (o'chirilgan qatorlar soni, oxirgi ko'rilgan id) qaytadi; id None - savatlar tugadi.
+    """
+    cart_ids = list(
+        Cart.objects.select_for_update(skip_locked=True)
+        .filter(Q(updated_at__lt=cutoff) | Q(total_items=0, updated_at__lt=empty_cutoff), pk__gt=after)
+        .order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not cart_ids:
+        return 0, None
+    deleted, _ = Cart.objects.filter(pk__in=cart_ids).delete()
+    return deleted, cart_ids[-1]
+
+
+@transaction.atomic
+def purge_inactive_items(batch_size=500):
+    """
+    Faol bo'lmagan mahsulotlar elementlarini bir partiya savat bo'yicha o'chirish
+    va shu savatlar jamlarini yangilash. Qulflar checkout / batch kabi avval
+    savat, keyin elementlar tartibida olinadi. O'chirilgan elementlar soni qaytadi.
+    """
+    inactive = CartItem.objects.filter(product__is_active=False)
+    cart_ids = list(
+        Cart.objects.select_for_update(skip_locked=True)
+        .filter(pk__in=inactive.values('cart_id'))
+        .order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not cart_ids:
+        return 0
+    deleted, _ = inactive.filter(cart_id__in=cart_ids).delete()
+    recalculate_totals(cart_ids)
+    return deleted
+
+
+def cart_etag(cart):
+    if cart.pk is None:
+        # Mehmon savati (guest_carts.GuestCart): versiya har bir cookie uchun 0 dan
+        # boshlanadi, narx o'zgarishlari esa faqat katalog versiyasida ko'rinadi
+        return quote_etag(f"cart-guest-{cart.nonce or 'new'}-{cart.version}-{cart.catalog_version}")
+    return quote_etag(f'cart-{cart.pk}-{cart.version}')
+
+
+def etag_matches(header, etag):
+    """If-Match / If-None-Match qiymati ETag'ga mosmi (siqishdagi W/ prefiksi hisobga olinmaydi)"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [tag.removeprefix('W/') for tag in parse_etags(header)]
+
+
+def set_cart_headers(response, cart):
+    response['ETag'] = cart_etag(cart)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# ---------- yaratish ----------
+
+def create_cart(user_id):
+    """
+    Foydalanuvchi savatini yaratish; bor bo'lsa hech narsa qilinmaydi
+    (INSERT ... ON CONFLICT (user_id) DO NOTHING - parallel birinchi
+    so'rovlar ikkinchi savat yaratmaydi va IntegrityError bermaydi).
+    """
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(name) for name in (
+        'user_id', 'version', 'total_price', 'total_items', 'totals_stale', 'created_at', 'updated_at',
+    ))
+    sql = (
+        f"INSERT INTO {qn(Cart._meta.db_table)} ({columns}) VALUES (%s, 0, 0, 0, %s, %s, %s) "
+        f"ON CONFLICT ({qn('user_id')}) DO NOTHING"
+    )
+    now = _now()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, False, now, now])
+
+
+def get_or_create_cart(user):
+    """Foydalanuvchi savati (yo'q bo'lsa create_cart bilan yaratiladi)"""
+    try:
+        return Cart.objects.get(user=user)
+    except Cart.DoesNotExist:
+        create_cart(user.pk)
+        return Cart.objects.get(user=user)
+
+
+# ---------- qo'shish ----------
+
+def lock_cart(user_id):
+    """
+    Foydalanuvchi savatini qulflab qaytarish (savat yo'q bo'lsa None) - har bir
+    o'zgarishning birinchi so'rovi. SELECT ... FOR UPDATE o'rniga UPDATE ...
+    RETURNING: PostgreSQL'da qator qulfi (checkout va purge'ning FOR UPDATE'i
+    bilan to'qnashadi), SQLite'da esa tranzaksiya darhol yozish qulfini oladi
+    (o'qishdan yozishga o'tishda "database is locked" bo'lmaydi).
+    """
+    qn = connection.ops.quote_name
+    sql = (
+        f"UPDATE {qn(Cart._meta.db_table)} SET {qn('updated_at')} = %s "
+        f"WHERE {qn('user_id')} = %s RETURNING *"
+    )
+    return next(iter(Cart.objects.raw(sql, [_now(), user_id])), None)
+
+
+def _upsert_items(cart_id, lines):
+    """
+    Savatga [(mahsulot id, miqdor), ...] ni qo'shish (bor qatorlarning miqdori
+    oshiriladi), faol bo'lmagan mahsulotlar o'tkazib yuboriladi. Biror qator
+    qo'shilgan yoki yangilangan bo'lsa True.
+    """
+    qn = connection.ops.quote_name
+    item = qn(CartItem._meta.db_table)
+    current = f"{item}.{qn('quantity')} + EXCLUDED.{qn('quantity')}"
+    values = ', '.join(['(%s, %s)'] * len(lines))
+    # Upsert'dagi SELECT'da WHERE bo'lishi shart (SQLite'da ON CONFLICT JOIN ... ON bilan adashmasin)
+    sql = (
+        f"INSERT INTO {item} ({qn('cart_id')}, {qn('product_id')}, {qn('quantity')}, {qn('created_at')}, {qn('updated_at')}) "
+        f"SELECT %s, p.{qn('id')}, v.column2, %s, %s FROM (VALUES {values}) v "
+        f"INNER JOIN {qn(Product._meta.db_table)} p ON p.{qn('id')} = v.column1 AND p.{qn('is_active')} = %s "
+        f"WHERE 1 = 1 "
+        f"ON CONFLICT ({qn('cart_id')}, {qn('product_id')}) DO UPDATE SET "
+        f"{qn('quantity')} = CASE WHEN {current} > %s THEN %s ELSE {current} END, "
+        f"{qn('updated_at')} = EXCLUDED.{qn('updated_at')} "
+        f"RETURNING {qn('cart_id')}"
+    )
+    now = _now()
+    params = [cart_id, now, now]
+    for product_id, quantity in lines:
+        params += [product_id, min(quantity, MAX_QUANTITY)]
+    params += [True, MAX_QUANTITY, MAX_QUANTITY]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone() is not None
+
+
+@transaction.atomic
+def add_lines_to_cart(user, lines):
+    """
+    [(mahsulot id, miqdor), ...] ni bitta upsert bilan savatga qo'shish
+    (miqdorlar MAX_QUANTITY bilan cheklanadi). Yangilangan savat qaytadi;
+    birorta ham faol mahsulot bo'lmasa None.
+
+    Savat upsert'dan oldin qulflanadi: checkout / batch bilan bir xil tartib
+    (avval savat, keyin elementlar) va purge_idle_carts (SKIP LOCKED) uni
+    orada o'chira olmaydi - elementlar o'chirilgan savatga yozilmaydi.
+    """
+    lines = list(lines)
+    cart = lock_cart(user.pk)
+    if cart is None:
+        # Birinchi qo'shish (savat hali yo'q yoki tozalangan): faol mahsulotsiz savat yaratilmaydi
+        product_ids = [product_id for product_id, _ in lines]
+        if not Product.objects.filter(pk__in=product_ids, is_active=True).exists():
+            return None
+        create_cart(user.pk)
+        cart = lock_cart(user.pk)
+    if not _upsert_items(cart.pk, lines):
+        return None
+    return touch_cart(cart.pk)
+
+
+def add_to_cart(user, product_id, quantity):
+    """Mahsulotni savatga qo'shish; mahsulot topilmasa yoki faol bo'lmasa None"""
+    return add_lines_to_cart(user, [(product_id, quantity)])
+
+
+# ---------- batch ----------
+
+def resolve_quantities(quantities, operations):
+    """add / set / remove amallarini {mahsulot id: miqdor} ga ketma-ket qo'llash (yangi lug'at)"""
+    quantities = dict(quantities)
+    for operation in operations:
+        product_id = operation['product_id']
+        if operation['op'] == 'add':
+            quantities[product_id] = min(quantities.get(product_id, 0) + operation['quantity'], MAX_QUANTITY)
+        elif operation['op'] == 'set':
+            quantities[product_id] = operation['quantity']
+        else:
+            quantities.pop(product_id, None)
+    return quantities
+
+
+def apply_operations(cart, operations):
+    """
+    Amallarni savatga qo'llash (natija xotirada hisoblanib, bazaga bir
+    yo'la yoziladi).
+    (o'zgargan mahsulot id'lari, o'chirilgan element id'lari) qaytadi.
+    """
+    product_ids = {operation['product_id'] for operation in operations}
+    items = {item.product_id: item for item in CartItem.objects.filter(cart=cart, product_id__in=product_ids)}
+    quantities = resolve_quantities({product_id: item.quantity for product_id, item in items.items()}, operations)
+
+    now = timezone.now()
+    removed = [item.pk for product_id, item in items.items() if product_id not in quantities]
+    updated = []
+    for product_id, item in items.items():
+        if product_id in quantities and quantities[product_id] != item.quantity:
+            item.quantity = quantities[product_id]
+            item.updated_at = now
+            updated.append(item)
+    created = [
+        CartItem(cart=cart, product_id=product_id, quantity=quantity)
+        for product_id, quantity in quantities.items() if product_id not in items
+    ]
+
+    if removed:
+        CartItem.objects.filter(pk__in=removed).delete()
+    if updated:
+        CartItem.objects.bulk_update(updated, ['quantity', 'updated_at'])
+    if created:
+        CartItem.objects.bulk_create(created)
+    return [item.product_id for item in updated + created], removed
+
+
+def cart_delta(cart, changed_product_ids, removed_item_ids, context=None):
+    """Faqat o'zgargan qatorlar, o'chirilgan element id'lari va yangi jamlar"""
+    changed = (
+        CartItem.objects.filter(cart=cart, product_id__in=changed_product_ids)
+        .select_related('product').order_by('id')
+    )
+    return CartDeltaSerializer({
+        'version': cart.version,
+        'changed': changed,
+        'removed': removed_item_ids,
+        'total_price': cart.total_price,
+        'total_items': cart.total_items,
+    }, context=context or {}).data
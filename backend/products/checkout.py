@@ -0,0 +1,67 @@
+"""
+Buyurtma rasmiylashtirish: so'rovlar soni savatdagi qatorlar soniga bog'liq emas.
+
+Qulflar avval savat, keyin mahsulotlar id bo'yicha o'sish tartibida olinadi
+(SELECT ... FOR UPDATE). Savatni o'zgartiradigan har bir yo'l (qo'shish,
+yangilash, o'chirish, tozalash, batch) ham elementlarga tegishdan oldin savat
+qatorini qulflaydi (carts.lock_cart). Savat va mahsulotni birga qulflaydigan
+boshqa yo'llar ham shu tartibga amal qiladi: mahsulot o'chirilganda savatlar undan oldin
+belgilanadi, narx o'zgarganda esa savatlar commit'dan keyin, mahsulot qulfi
+bo'shagach belgilanadi (signals.product_repriced). Narxlar qulflangan mahsulot
+qatorlaridan bir marta olinadi: buyurtma qatorlari ham, buyurtma jami ham shu
+nusxadan hisoblanadi.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .carts import bump_version
+from .models import Cart, CartItem, Order, OrderItem, Product
+from .similar import mark_similar_stale
+
+
+@transaction.atomic
+def place_order(user, details):
+    """
+    Savatdagi mahsulotlardan buyurtma yaratish va savatni tozalash.
+    `details` - CreateOrderSerializer ma'lumotlari. Savat bo'sh bo'lsa None.
+    """
+    try:
+        cart = Cart.objects.select_for_update().get(user=user)
+    except Cart.DoesNotExist:
+        return None
+
+    lines = list(CartItem.objects.filter(cart=cart).order_by('product_id').values_list('product_id', 'quantity'))
+    locked = Product.objects.select_for_update().filter(pk__in=[product_id for product_id, _ in lines]).order_by('pk')
+    products = {product.pk: product for product in locked}
+    # Parallel o'chirilgan mahsulot qatorlari tashlab ketiladi
+    items = [
+        OrderItem(product=products[product_id], quantity=quantity, price=products[product_id].effective_price)
+        for product_id, quantity in lines if product_id in products
+    ]
+    if not items:
+        return None
+
+    order = Order.objects.create(
+        user=user,
+        total_price=sum((item.subtotal for item in items), Decimal('0')),
+        status='pending',
+        **details,
+    )
+    for item in items:
+        item.order = order
+    OrderItem.objects.bulk_create(items)
+
+    CartItem.objects.filter(cart=cart).delete()
+    bump_version(cart)
+
+    # O'xshash mahsulotlar indeksi so'rovdan tashqarida, fon worker'ida yangilanadi
+    mark_similar_stale(list(products))
+    return order
+
+
+def order_snapshot(order):
+    """OrderSerializer uchun: qatorlar mahsulotlari bilan bitta so'rovda"""
+    prefetch_related_objects([order], Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('pk')))
+    return order
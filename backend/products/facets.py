@@ -0,0 +1,127 @@
+"""
+Katalog facet'lari: kategoriya sonlari, narx gistogrammasi, chegirma
+oraliqlari va mashhur mahsulotlar soni - bitta GROUP BY so'rovda.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+
+from .cache import get_catalog_version
+from .filters import apply_catalog_filters
+from .models import Product
+from .search import normalize, search_queryset
+
+DISCOUNT_RANGES = [(0, 0), (1, 10), (11, 25), (26, 50), (51, 100)]
+
+
+def format_price(value):
+    # ProductListSerializer bilan bir xil ko'rinish: "125000.00"
+    return str(Decimal(value).quantize(Decimal('0.01'))) if value is not None else None
+
+
+def price_ranges():
+    """CATALOG_PRICE_BUCKETS chegaralaridan [min, max) oraliqlar (chegirmali narx bo'yicha)"""
+    edges = settings.CATALOG_PRICE_BUCKETS
+    return list(zip(edges, edges[1:] + [None]))
+
+
+def facets_cache_key(params, query):
+    normalized = {
+        'category': params['category'],
+        'on_sale': params['on_sale'],
+        'min_price': str(params['min_price']) if params['min_price'] is not None else None,
+        'max_price': str(params['max_price']) if params['max_price'] is not None else None,
+        'search': normalize(query),
+    }
+    digest = hashlib.md5(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+    return f'catalog:facets:{get_catalog_version()}:{digest}'
+
+
+def get_catalog_facets(params, query=''):
+    """Normallashtirilgan filterlar bo'yicha keshlangan facet'lar"""
+    key = facets_cache_key(params, query)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_catalog_facets(params, query)
+        cache.set(key, facets, settings.CATALOG_FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def compute_catalog_facets(params, query=''):
+    """
+    Kategoriya bo'yicha GROUP BY qilingan bitta agregat so'rov.
+
+    Kategoriya sonlari tanlangan kategoriyasiz hisoblanadi (boshqa
+    kategoriyalar ham ko'rinib tursin), qolgan facet'lar esa faqat tanlangan
+    kategoriya qatorlaridan yig'iladi.
+    """
+    queryset = apply_catalog_filters(Product.objects.filter(is_active=True), params, category=False)
+    if query:
+        queryset = search_queryset(queryset, query)
+
+    aggregates = {
+        'count': Count('id'),
+        'featured': Count('id', filter=Q(is_featured=True)),
+        'min_price': Min('effective_price'),
+        'max_price': Max('effective_price'),
+    }
+    for index, (low, high) in enumerate(price_ranges()):
+        condition = Q(effective_price__gte=low)
+        if high is not None:
+            condition &= Q(effective_price__lt=high)
+        aggregates[f'price_{index}'] = Count('id', filter=condition)
+    for index, (low, high) in enumerate(DISCOUNT_RANGES):
+        aggregates[f'discount_{index}'] = Count(
+            'id', filter=Q(discount_percentage__gte=low, discount_percentage__lte=high)
+        )
+
+    rows = list(
+        queryset.order_by()
+        .values('category_id', 'category__name', 'category__slug')
+        .annotate(**aggregates)
+        .order_by('category__name')
+    )
+
+    selected = [
+        row for row in rows
+        if not params['category'] or row['category__slug'] == params['category']
+    ]
+    prices = [row['min_price'] for row in selected] + [row['max_price'] for row in selected]
+
+    return {
+        'total': sum(row['count'] for row in selected),
+        'categories': [
+            {
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'slug': row['category__slug'],
+                'count': row['count'],
+            }
+            for row in rows
+        ],
+        'price': {
+            'min': format_price(min(prices)) if prices else None,
+            'max': format_price(max(prices)) if prices else None,
+            'histogram': [
+                {
+                    'min': low,
+                    'max': high,
+                    'count': sum(row[f'price_{index}'] for row in selected),
+                }
+                for index, (low, high) in enumerate(price_ranges())
+            ],
+        },
+        'discounts': [
+            {
+                'min': low,
+                'max': high,
+                'count': sum(row[f'discount_{index}'] for row in selected),
+            }
+            for index, (low, high) in enumerate(DISCOUNT_RANGES)
+        ],
+        'featured': sum(row['featured'] for row in selected),
+    }
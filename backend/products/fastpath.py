@@ -0,0 +1,123 @@
+"""
+Mahsulot ro'yxati/tafsilotlari uchun serializer'siz tezkor yo'l.
+
+`CompiledRowSerializer` ModelSerializer maydonlarini bir marta o'qib,
+`.values()` qatorlari uchun (kalit, ustun, konvertor) jadvalini tuzadi.
+Natijada har bir qator uchun DRF field mashinasi ishlamaydi, `category.name`
+esa o'sha so'rovdagi JOIN orqali keladi. Chiqish ProductListSerializer /
+ProductDetailSerializer bilan bayt-ma-bayt bir xil. ?fields= / ?omit=
+berilganda SELECT'ga faqat kerakli ustunlar kiradi.
+"""
+from rest_framework import serializers
+
+from .serializers import (
+    ImageVariantsField, ProductDetailSerializer, ProductListSerializer, select_fields, sparse_query_params
+)
+
+_DIRECT_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ImageUrlBuilder:
+    """Rasm URL'larini so'rov bo'yicha bir marta hisoblangan host prefiksi bilan qurish"""
+
+    def __init__(self, request, storage):
+        self.request = request
+        self.storage = storage
+        self.host = request.build_absolute_uri('/')[:-1] if request is not None else ''
+
+    def __call__(self, name):
+        if not name:
+            return None
+        url = self.storage.url(name)
+        if self.request is None or '://' in url:
+            return url
+        if url.startswith('/'):
+            return self.host + url
+        return self.request.build_absolute_uri(url)
+
+
+class CompiledRowSerializer:
+    """ModelSerializer'ni `.values()` qatorlari uchun kompilyatsiya qilish"""
+
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        self.columns = []
+        self.image_columns = []
+        self.variant_columns = {}
+        fields = serializer_class(context={'all_fields': True}).fields
+        self.all_keys = list(fields)
+        self.optional = getattr(serializer_class.Meta, 'optional_fields', ())
+        for key, field in fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                continue
+            source = field.source.replace('.', '__')
+            if isinstance(field, serializers.FileField):
+                self.image_columns.append(key)
+                self.columns.append((key, source, None))
+            elif isinstance(field, ImageVariantsField):
+                self.variant_columns[key] = field
+                self.columns.append((key, source, None))
+            elif isinstance(field, _DIRECT_FIELDS):
+                self.columns.append((key, source, None))
+            else:
+                self.columns.append((key, source, field.to_representation))
+        self.keys = [key for key, _, _ in self.columns]
+        self.image_storage = model._meta.get_field('image').storage
+
+    def selected_keys(self, request):
+        """So'rovdagi ?fields= / ?omit= bo'yicha kalitlar (request=None - standart to'plam)"""
+        return select_fields(self.all_keys, sparse_query_params(request), self.optional)
+
+    def select(self, request):
+        keys = set(self.selected_keys(request))
+        return [column for column in self.columns if column[0] in keys]
+
+    def values(self, queryset, request=None, extra=()):
+        sources = list(dict.fromkeys(source for _, source, _ in self.select(request)))
+        return queryset.values(*sources, *[name for name in extra if name not in sources])
+
+    def prefetch_images(self, rows):
+        """Qatorlardagi barcha rasm URL'larini storage'da bir yo'la hal qilish (Telegram)"""
+        prefetch = getattr(self.image_storage, 'prefetch_urls', None)
+        if prefetch is None:
+            return
+        names = []
+        for row in rows:
+            for key, source, _ in self.columns:
+                if key in self.image_columns and row.get(source):
+                    names.append(row[source])
+                elif key in self.variant_columns and source in row:
+                    names += self.variant_columns[key].names(row[source])
+        prefetch(names)
+
+    def render(self, rows, request, sparse=False):
+        """`sparse=True` bo'lsa faqat so'ralgan maydonlar (values(..., request) bilan birga)"""
+        rows = list(rows)
+        self.prefetch_images(rows)
+        columns = self.select(request if sparse else None)
+        image_url = ImageUrlBuilder(request, self.image_storage)
+        image_columns = set(self.image_columns)
+        result = []
+        for row in rows:
+            item = {}
+            for key, source, convert in columns:
+                value = row[source]
+                if value is None:
+                    item[key] = None
+                elif key in self.variant_columns:
+                    item[key] = self.variant_columns[key].from_variants(value, image_url)
+                elif key in image_columns:
+                    item[key] = image_url(value)
+                elif convert is not None:
+                    item[key] = convert(value)
+                else:
+                    item[key] = value
+            result.append(item)
+        return result
+
+
+product_list_rows = CompiledRowSerializer(ProductListSerializer)
+product_detail_rows = CompiledRowSerializer(ProductDetailSerializer)
@@ -0,0 +1,57 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import filters
+
+from .search import search_queryset
+
+
+def parse_catalog_filters(query_params):
+    """?category=, ?min_price=, ?max_price=, ?on_sale= ni o'qib, normallashtirish"""
+    params = {
+        'category': query_params.get('category') or None,
+        'on_sale': query_params.get('on_sale') in ('1', 'true', 'True'),
+    }
+    for name in ('min_price', 'max_price'):
+        value = query_params.get(name)
+        try:
+            value = Decimal(value) if value else None
+        except InvalidOperation:
+            value = None  # Invalid narx, e'tiborsiz qoldiriladi
+        params[name] = value if value is not None and value.is_finite() else None
+    return params
+
+
+def apply_catalog_filters(queryset, params, category=True):
+    """Kategoriya (slug), chegirmadagi mahsulotlar va narx oralig'i (chegirmali narx bo'yicha)"""
+    if category and params['category']:
+        queryset = queryset.filter(category__slug=params['category'])
+    if params['on_sale']:
+        queryset = queryset.filter(discount_percentage__gt=0)
+    if params['min_price'] is not None:
+        queryset = queryset.filter(effective_price__gte=params['min_price'])
+    if params['max_price'] is not None:
+        queryset = queryset.filter(effective_price__lte=params['max_price'])
+    return queryset
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """?search= ni LIKE '%q%' o'rniga to'liq matnli indeks orqali bajarish"""
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        return search_queryset(queryset, query)
+
+
+class CatalogOrderingFilter(filters.OrderingFilter):
+    """Qidiruvda ?ordering= berilmasa natijalar relevantlik bo'yicha tartiblanadi"""
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        if ProductSearchFilter().get_search_query(view.request):
+            return ['-search_rank'] + list(ordering or [])
+        return ordering
@@ -0,0 +1,140 @@
+"""
+Mehmon (anonim foydalanuvchi) savati.
+
+Qatorlar imzolangan cookie'da saqlanadi - bazaga hech narsa yozilmaydi,
+bot sessiyalari uchun Cart qatorlari yaratilmaydi. Cookie qiymati:
+`<nonce>.<versiya>-<mahsulot id>.<miqdor>-...` (django.core.signing, muddati
+GUEST_CART_COOKIE_AGE). Versiya login yoki cookie tiklanganda 0 dan qayta
+boshlanadi, shuning uchun ETag'da cookie nonce'i va katalog versiyasi
+(narx o'zgarishlari) ham bor. Javoblar CartSerializer shaklida; elementning `id`
+si o'rnida mahsulot id'si (cart/items/<mahsulot id>/update/ va h.k.).
+
+Login / ro'yxatdan o'tishda `merge_guest_cart` qatorlarni bitta upsert bilan
+foydalanuvchi savatiga qo'shadi va cookie'ni o'chiradi.
+"""
+import secrets
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.response import Response
+
+from .cache import get_catalog_version
+from .carts import MAX_QUANTITY, add_lines_to_cart, resolve_quantities, set_cart_headers
+from .models import CartItem, Product
+from .serializers import CartDeltaSerializer, CartSerializer
+
+SALT = 'products.guest_carts'
+
+GUEST_CART_FULL = f"Savatda ko'pi bilan {settings.GUEST_CART_MAX_LINES} xil mahsulot bo'lishi mumkin"
+
+
+class GuestCart:
+    pk = None
+
+    def __init__(self, lines=None, version=0, nonce=''):
+        self.lines = dict(lines or {})
+        self.version = version
+        self.nonce = nonce
+        self.modified = False
+
+    @classmethod
+    def load(cls, request):
+        value = request.get_signed_cookie(
+            settings.GUEST_CART_COOKIE_NAME, default=None, salt=SALT, max_age=settings.GUEST_CART_COOKIE_AGE,
+        )
+        if not value:
+            return cls()
+        try:
+            head, *lines = value.split('-')
+            nonce, _, version = head.rpartition('.')
+            guest = cls(
+                {int(product_id): min(int(quantity), MAX_QUANTITY)
+                 for product_id, quantity in (line.split('.') for line in lines)},
+                int(version),
+                nonce,
+            )
+        except ValueError:  # imzo to'g'ri, lekin buzilgan format
+            return cls()
+        if not guest.nonce:
+            # Nonce'siz eski cookie - qatorlar saqlanadi, cookie keyingi javobda qayta yoziladi
+            guest.nonce = secrets.token_hex(4)
+            guest.modified = True
+        return guest
+
+    @cached_property
+    def catalog_version(self):
+        """ETag uchun: narxlar o'zgarsa mehmon savati javobi ham o'zgaradi"""
+        return get_catalog_version()
+
+    def dumps(self):
+        head = f'{self.nonce}.{self.version}'
+        return '-'.join([head] + [f'{product_id}.{quantity}' for product_id, quantity in self.lines.items()])
+
+    def apply(self, operations):
+        """
+        add / set / remove amallarini qo'llash; (o'zgargan, o'chirilgan)
+        mahsulot id'lari qaytadi. Qatorlar soni GUEST_CART_MAX_LINES dan
+        oshsa hech narsa o'zgarmaydi va None qaytadi.
+        """
+        quantities = resolve_quantities(self.lines, operations)
+        if len(quantities) > settings.GUEST_CART_MAX_LINES:
+            return None
+        changed = [product_id for product_id, quantity in quantities.items() if self.lines.get(product_id) != quantity]
+        removed = [product_id for product_id in self.lines if product_id not in quantities]
+        if changed or removed:
+            self.lines = quantities
+            self.version += 1
+            self.nonce = self.nonce or secrets.token_hex(4)
+            self.modified = True
+        return changed, removed
+
+    def snapshot(self):
+        """CartSerializer uchun savat ko'rinishi (faol mahsulotlar bitta so'rovda)"""
+        products = Product.objects.filter(is_active=True).in_bulk(list(self.lines))
+        items = [
+            CartItem(id=product_id, product=products[product_id], quantity=quantity)
+            for product_id, quantity in self.lines.items() if product_id in products
+        ]
+        return SimpleNamespace(
+            id=None, user=None, items=items, version=self.version, created_at=None, updated_at=None,
+            total_price=sum((item.subtotal for item in items), Decimal('0')).quantize(Decimal('0.01')),
+            total_items=sum(item.quantity for item in items),
+        )
+
+    def save(self, response):
+        if self.modified:
+            response.set_signed_cookie(
+                settings.GUEST_CART_COOKIE_NAME, self.dumps(), salt=SALT, max_age=settings.GUEST_CART_COOKIE_AGE,
+                httponly=True, secure=settings.SESSION_COOKIE_SECURE, samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return set_cart_headers(response, self)
+
+
+def guest_cart_response(guest, message=None, status=200):
+    """Savat javobi (cart_views javoblari bilan bir xil shakl) va yangilangan cookie"""
+    data = CartSerializer(guest.snapshot()).data
+    return guest.save(Response(data if message is None else {'message': message, 'cart': data}, status=status))
+
+
+def guest_cart_delta(guest, changed, removed):
+    """carts.cart_delta ning mehmon savati uchun varianti"""
+    snapshot = guest.snapshot()
+    return guest.save(Response(CartDeltaSerializer({
+        'version': guest.version,
+        'changed': [item for item in snapshot.items if item.product_id in set(changed)],
+        'removed': removed,
+        'total_price': snapshot.total_price,
+        'total_items': snapshot.total_items,
+    }).data))
+
+
+def merge_guest_cart(request, response, user):
+    """Login / ro'yxatdan o'tishdan keyin mehmon savatini foydalanuvchi savatiga qo'shish"""
+    guest = GuestCart.load(request)
+    if guest.lines:
+        add_lines_to_cart(user, guest.lines.items())
+    if settings.GUEST_CART_COOKIE_NAME in request.COOKIES:
+        response.delete_cookie(settings.GUEST_CART_COOKIE_NAME, samesite=settings.SESSION_COOKIE_SAMESITE)
+    return response
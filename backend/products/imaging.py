@@ -0,0 +1,68 @@
+"""
+Pillow asosidagi rasm hosilalari: belgilangan kengliklardagi WebP nusxalar va
+kichik LQIP (blur placeholder).
+
+Modul Django'ni import qilmaydi - funksiyalar ProcessPoolExecutor'ning
+alohida (spawn) jarayonlarida ishlaydi.
+"""
+import base64
+import io
+
+from PIL import Image, ImageOps
+
+WEBP_QUALITY = 80
+LQIP_WIDTH = 16
+LQIP_QUALITY = 30
+
+
+def open_image(path, max_width=None):
+    with Image.open(path) as source:
+        if max_width and source.width > max_width:
+            # JPEG'ni darhol kichraytirib dekodlash (ko'p megabaytli rasmlar uchun tez)
+            source.draft('RGB', (max_width, max(1, source.height * max_width // source.width)))
+        # Nusxa (yuklangan) qaytadi - fayl shu yerda yopiladi
+        image = ImageOps.exif_transpose(source)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def encode_webp(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def resize_to_width(image, width):
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def render_derivatives(path, widths):
+    """
+    Bitta rasm fayli uchun {'widths': {kenglik: webp baytlari}, 'lqip': data URI}.
+    Asl rasmdan keng nusxa yaratilmaydi - uning o'rniga asl kenglik qo'shiladi.
+    """
+    image = open_image(path, max(widths))
+    renditions = {}
+    for width in sorted(widths):
+        if width >= image.width:
+            renditions[image.width] = encode_webp(image, WEBP_QUALITY)
+            break
+        renditions[width] = encode_webp(resize_to_width(image, width), WEBP_QUALITY)
+
+    tiny = encode_webp(resize_to_width(image, min(LQIP_WIDTH, image.width)), LQIP_QUALITY)
+    lqip = 'data:image/webp;base64,' + base64.b64encode(tiny).decode('ascii')
+    return {'widths': renditions, 'lqip': lqip}
+
+
+def render_many(images, widths):
+    """{maydon: fayl yo'li} -> {maydon: render_derivatives natijasi}; buzuq rasmlar tashlab ketiladi"""
+    results = {}
+    for field, path in images.items():
+        try:
+            results[field] = render_derivatives(path, widths)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            results[field] = None
+    return results
@@ -0,0 +1,92 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import force_authenticate
+
+from products.benchmark import request_factory, rollback_after
+from products.cart_views import AddToCartView
+from products.carts import MAX_QUANTITY, add_to_cart
+from products.models import Cart, CartItem, Category, Product
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+class Command(BaseCommand):
+    help = "AddToCartView: parallel qo'shishlarda miqdor yo'qolmasligi va upsert so'rovlar sonini tekshirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=40)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--quantity', type=int, default=2)
+
+    def handle(self, *args, **options):
+        with rollback_after():
+            user, product, category = self.create_fixtures()
+            self.check_queries(user, product)
+
+        # Thread'lar bir-birining yozuvlarini ko'rishi kerak - bu qism commit qilinadi,
+        # yaratilgan ma'lumotlar oxirida bitta tranzaksiyada o'chiriladi
+        user, product, category = self.create_fixtures()
+        try:
+            self.check_concurrency(user, product, options)
+        finally:
+            with transaction.atomic():
+                Cart.objects.filter(user=user).delete()
+                user.delete()
+                category.delete()
+
+    @staticmethod
+    def create_fixtures():
+        suffix = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'Bench cart {suffix}', slug=f'bench-cart-{suffix}')
+        product = Product.objects.create(
+            name=f'Bench cart {suffix}', slug=f'bench-cart-{suffix}', category=category,
+            description='Benchmark', price=Decimal(1000), uzum_link='https://uzum.uz/',
+        )
+        return User.objects.create_user(f'bench-cart-{suffix}'), product, category
+
+    def check_queries(self, user, product):
+        add_to_cart(user, product.pk, 1)
+        with CaptureQueriesContext(connection) as captured:
+            cart = add_to_cart(user, product.pk, 1)
+        # Tranzaksiya boshqaruvi (BEGIN / COMMIT / SAVEPOINT) hisobga olinmaydi
+        queries = [query for query in captured if not query['sql'].startswith(TRANSACTION_CONTROL)]
+        self.stdout.write("add_to_cart so'rovlari".ljust(28) + f"{len(queries):>8}")
+        # Savat qulfi, upsert va touch_cart
+        if len(queries) > 3:
+            raise CommandError(f"add_to_cart {len(queries)} ta so'rov bajardi (ko'pi bilan 3)")
+        if CartItem.objects.get(cart=cart, product=product).quantity != 2:
+            raise CommandError("Takroriy qo'shishda miqdor oshmadi")
+
+    def check_concurrency(self, user, product, options):
+        view = AddToCartView.as_view()
+        factory = request_factory()
+
+        def post(_):
+            try:
+                request = factory.post(
+                    '/api/products/cart/add/', {'product_id': product.pk, 'quantity': options['quantity']}, format='json',
+                )
+                force_authenticate(request, user)
+                return view(request).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            statuses = list(executor.map(post, range(options['requests'])))
+
+        expected = min(options['requests'] * options['quantity'], MAX_QUANTITY)
+        quantity = CartItem.objects.get(cart__user=user, product=product).quantity
+        self.stdout.write("parallel so'rovlar".ljust(28) + f"{options['requests']:>8} ({options['workers']} thread)")
+        self.stdout.write(f"{'kutilgan / haqiqiy miqdor':<28}{expected:>8} / {quantity}")
+        if statuses.count(201) != len(statuses):
+            raise CommandError(f"Muvaffaqiyatsiz so'rovlar: {[code for code in statuses if code != 201]}")
+        if quantity != expected:
+            raise CommandError(f"Miqdor yo'qoldi: {expected} kutilgan, {quantity} saqlangan")
+        if Cart.objects.filter(user=user).count() != 1:
+            raise CommandError("Foydalanuvchida bir nechta savat yaratildi")
@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import force_authenticate
+
+from products.benchmark import measure, request_factory, rollback_after, seed_catalog
+from products.cart_views import CartView
+from products.carts import cart_response
+from products.models import Cart, CartItem, Product
+from products.serializers import CartSerializer
+
+
+class Command(BaseCommand):
+    help = "CartView so'rovlar soni savat hajmiga bog'liq emasligini tekshirish (eski yo'l bilan solishtirib)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 20, 100])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        view = CartView.as_view()
+        factory = request_factory()
+
+        with rollback_after():
+            seed_catalog(max(options['sizes']))
+            products = list(Product.objects.order_by('id'))
+            user = User.objects.create_user('bench-cart')
+            cart = Cart.objects.create(user=user)
+
+            def call():
+                request = factory.get('/api/products/cart/')
+                force_authenticate(request, user)
+                response = view(request)
+                assert response.status_code == 200, response.data
+                return response
+
+            self.stdout.write('elementlar' + "eski so'rovlar".rjust(16) + "so'rovlar".rjust(12) + 'ms'.rjust(10))
+            counts = set()
+            for size in options['sizes']:
+                CartItem.objects.filter(cart=cart).delete()
+                CartItem.objects.bulk_create(
+                    CartItem(cart=cart, product=product, quantity=i % 3 + 1)
+                    for i, product in enumerate(products[:size])
+                )
+                with CaptureQueriesContext(connection) as legacy:
+                    expected = CartSerializer(Cart.objects.get(pk=cart.pk)).data
+                with CaptureQueriesContext(connection) as current:
+                    call()
+                if cart_response(Cart.objects.get(pk=cart.pk)) != expected:
+                    raise CommandError("cart_response natijasi CartSerializer'dan farq qiladi")
+                counts.add(len(current))
+                ms = measure(call, options['repeat'])
+                self.stdout.write(f"{size:>10}{len(legacy):>16}{len(current):>12}{ms:>10.2f}")
+
+            if len(counts) != 1:
+                raise CommandError(f"So'rovlar soni savat hajmiga qarab o'zgardi: {sorted(counts)}")
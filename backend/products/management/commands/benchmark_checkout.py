@@ -0,0 +1,130 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import force_authenticate
+
+from products.benchmark import request_factory, rollback_after, seed_catalog
+from products.models import Cart, CartItem, Order, OrderItem, Product
+from products.order_views import CreateOrderView
+from products.similar import refresh_stale_similar_products
+
+DETAILS = {
+    'full_name': 'Bench Checkout', 'phone': '+998901234567', 'email': 'bench@example.com',
+    'address': 'Benchmark ko\'chasi 1', 'city': 'Toshkent',
+}
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+def legacy_checkout(user):
+    """Eski CreateOrderView: har bir qator uchun alohida INSERT va mahsulot so'rovi (solishtirish uchun)"""
+    cart = Cart.objects.get(user=user)
+    cart_items = cart.items.all()
+    if not cart_items.exists():
+        return None
+    total_price = sum(item.product.effective_price * item.quantity for item in cart_items.all())
+    order = Order.objects.create(user=user, total_price=total_price, status='pending', **DETAILS)
+    for cart_item in cart_items:
+        OrderItem.objects.create(
+            order=order, product=cart_item.product, quantity=cart_item.quantity, price=cart_item.product.effective_price,
+        )
+    cart_items.delete()
+    return order
+
+
+class Command(BaseCommand):
+    help = (
+        "CreateOrderView: so'rovlar soni (on_commit ishlari bilan) savat hajmiga bog'liq emasligini "
+        "tekshirish (50 qatorli savat va eski yo'l bilan); o'xshashlarni fon yangilash narxi alohida"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50])
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        view = CreateOrderView.as_view()
+        factory = request_factory()
+
+        with rollback_after():
+            seed_catalog(max(options['sizes']))
+            products = list(Product.objects.order_by('id'))
+            user = User.objects.create_user('bench-checkout')
+            cart = Cart.objects.create(user=user)
+
+            def fill(size):
+                CartItem.objects.bulk_create(
+                    CartItem(cart=cart, product=product, quantity=i % 3 + 1)
+                    for i, product in enumerate(products[:size])
+                )
+
+            def checkout():
+                request = factory.post('/api/products/orders/create/', DETAILS, format='json')
+                force_authenticate(request, user)
+                # Tashqi tranzaksiya rollback qilinadi - on_commit ishlari shu yerda bajariladi va sanaladi
+                with TestCase.captureOnCommitCallbacks(execute=True):
+                    response = view(request)
+                assert response.status_code == 201, response.data
+                return response
+
+            self.stdout.write(
+                'qatorlar' + "eski so'rovlar".rjust(16) + "so'rovlar".rjust(12) + "fon so'rovlari".rjust(16)
+                + 'eski ms'.rjust(10) + 'ms'.rjust(10)
+            )
+            counts = set()
+            for size in options['sizes']:
+                fill(size)
+                with CaptureQueriesContext(connection) as legacy:
+                    legacy_checkout(user)
+                legacy_ms = self.timed(lambda: legacy_checkout(user), fill, size, options['repeat'])
+
+                fill(size)
+                with CaptureQueriesContext(connection) as current:
+                    response = checkout()
+                self.check_order(response.data['order'], size)
+                # Fon worker'i bajaradigan ish (so'rovga kirmaydi): o'xshash mahsulotlarni yangilash
+                with CaptureQueriesContext(connection) as background:
+                    while refresh_stale_similar_products():
+                        pass
+                ms = self.timed(checkout, fill, size, options['repeat'])
+
+                queries = self.statements(current)
+                counts.add(queries)
+                self.stdout.write(
+                    f"{size:>8}{self.statements(legacy):>16}{queries:>12}{self.statements(background):>16}"
+                    f"{legacy_ms:>10.2f}{ms:>10.2f}"
+                )
+
+            if len(counts) != 1:
+                raise CommandError(f"So'rovlar soni savat hajmiga qarab o'zgardi: {sorted(counts)}")
+
+    @staticmethod
+    def statements(captured):
+        """Tranzaksiya boshqaruvi (BEGIN / SAVEPOINT ...) hisobga olinmaydi"""
+        return sum(1 for query in captured if not query['sql'].startswith(TRANSACTION_CONTROL))
+
+    @staticmethod
+    def timed(func, fill, size, repeat):
+        """Median ms; savat har safar oldindan to'ldiriladi (vaqtga kirmaydi)"""
+        timings = []
+        for _ in range(repeat):
+            fill(size)
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return timings[len(timings) // 2]
+
+    @staticmethod
+    def check_order(data, size):
+        items = data['items']
+        if len(items) != size:
+            raise CommandError(f"Buyurtmada {len(items)} ta qator, {size} kutilgan")
+        lines_total = sum(float(item['subtotal']) for item in items)
+        if abs(float(data['total_price']) - lines_total) > 0.001:
+            raise CommandError(f"Buyurtma jami ({data['total_price']}) qatorlar yig'indisiga ({lines_total}) teng emas")
+        if CartItem.objects.filter(cart__user__username='bench-checkout').exists():
+            raise CommandError("Checkout'dan keyin savat tozalanmadi")
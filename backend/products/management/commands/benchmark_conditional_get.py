@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from products.benchmark import rollback_after, seed_catalog
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Takroriy so'rovda If-None-Match (304) tejaydigan bayt va CPU vaqtini o'lchash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST='localhost')
+
+        with rollback_after():
+            seed_catalog(options['products'])
+            slug = Product.objects.values_list('slug', flat=True).first()
+            urls = [
+                '/api/products/',
+                '/api/products/?category=bench-1&ordering=price',
+                '/api/products/featured/',
+                '/api/products/categories/',
+                f'/api/products/{slug}/',
+            ]
+
+            self.stdout.write(
+                f"{'url':<48}{'200 bayt':>10}{'304 bayt':>10}{'200 CPU ms':>12}{'304 CPU ms':>12}"
+            )
+            for url in urls:
+                etag = client.get(url)['ETag']
+                full_bytes, full_cpu = self.run(client, url, options['repeat'])
+                cond_bytes, cond_cpu = self.run(client, url, options['repeat'], HTTP_IF_NONE_MATCH=etag)
+                self.stdout.write(
+                    f"{url[:47]:<48}{full_bytes:>10}{cond_bytes:>10}{full_cpu:>12.3f}{cond_cpu:>12.3f}"
+                )
+
+    @staticmethod
+    def run(client, url, repeat, **headers):
+        """Bitta so'rov uchun o'rtacha javob hajmi va CPU vaqti (kesh o'chirilgan holda)"""
+        total_bytes, total_cpu = 0, 0.0
+        for _ in range(repeat):
+            cache.clear()
+            started = time.process_time()
+            response = client.get(url, **headers)
+            total_cpu += time.process_time() - started
+            total_bytes += len(response.content)
+        return total_bytes // repeat, total_cpu * 1000 / repeat
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from products.benchmark import measure, request_factory, rollback_after, seed_catalog
+from products.models import Product
+from products.pagination import CatalogPagination
+from products.views import ProductListView
+
+
+class Command(BaseCommand):
+    help = "PageNumberPagination va cursor (keyset) rejimini 1- va N-sahifada solishtirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=7000)
+        parser.add_argument('--page', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_size = CatalogPagination.page_size
+        needed = options['page'] * page_size
+        count = max(options['products'], needed)
+        view = ProductListView.as_view()
+        factory = request_factory()
+
+        def call(params):
+            # Javob keshi emas, sahifalash o'lchanadi
+            cache.clear()
+            response = view(factory.get('/api/products/', params))
+            assert response.status_code == 200, response.data
+            return response
+
+        with rollback_after():
+            seed_catalog(count)
+            self.stdout.write(f"{count} ta mahsulot, sahifa hajmi {page_size}")
+            self.stdout.write(f"{'ordering':<12}{'sahifa':>8}{'page= ms':>12}{'cursor= ms':>12}")
+
+            for ordering in ['-created_at', 'price', 'name']:
+                last_on_previous = self.row_before_page(ordering, options['page'], page_size)
+                for page in (1, options['page']):
+                    page_params = {'ordering': ordering, 'page': page}
+                    cursor_params = {'ordering': ordering, 'cursor': ''}
+                    if page > 1:
+                        cursor_params['cursor'] = last_on_previous
+                    page_ms = measure(lambda: call(page_params), options['repeat'])
+                    cursor_ms = measure(lambda: call(cursor_params), options['repeat'])
+                    self.stdout.write(f"{ordering:<12}{page:>8}{page_ms:>12.2f}{cursor_ms:>12.2f}")
+
+    @staticmethod
+    def row_before_page(ordering, page, page_size):
+        """N-sahifaga olib boradigan cursor qiymatini hisoblash"""
+        paginator = CatalogPagination()
+        queryset = Product.objects.filter(is_active=True).order_by(ordering)
+        paginator.ordering = paginator.get_keyset_ordering(queryset)
+        row = queryset.order_by(*paginator.ordering)[(page - 1) * page_size - 1]
+        values = [getattr(row, name) for name, _ in paginator.ordering_fields()]
+        return paginator.encode_cursor(values)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from products.benchmark import measure, request_factory, rollback_after, seed_catalog
+from products.fastpath import product_list_rows
+from products.models import Product
+from products.renderers import FastJSONRenderer
+from products.serializers import ProductListSerializer
+
+
+class Command(BaseCommand):
+    help = "ProductListSerializer + JSONRenderer va tezkor yo'l (rows/sec) solishtirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        request = request_factory().get('/api/products/')
+        count = options['rows']
+
+        def serializer_path():
+            products = Product.objects.filter(is_active=True)[:count]
+            data = ProductListSerializer(products, many=True, context={'request': request}).data
+            return JSONRenderer().render(data)
+
+        def fast_path():
+            rows = product_list_rows.values(Product.objects.filter(is_active=True))[:count]
+            return FastJSONRenderer().render(product_list_rows.render(rows, request))
+
+        with rollback_after():
+            seed_catalog(count)
+            assert serializer_path() == fast_path(), "Tezkor yo'l natijasi farq qiladi"
+
+            for label, func in [('serializer', serializer_path), ('tezkor yo\'l', fast_path)]:
+                ms = measure(func, options['repeat'])
+                self.stdout.write(f"{label:<14}{ms:>10.2f} ms{count / ms * 1000:>14,.0f} rows/sec")
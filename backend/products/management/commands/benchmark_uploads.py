@@ -0,0 +1,184 @@
+import io
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from PIL import Image
+from requests.models import RequestEncodingMixin
+from rest_framework.test import force_authenticate
+
+from products.models import Category, Product, StoredBlob
+from products.telegram_client import MultipartBody
+from products.thumbnails import IMAGE_FIELDS, variant_names
+from products.views import AdminProductCreateView
+
+MB = 1024 * 1024
+URL = '/api/products/admin/products/create/'
+
+
+class UnreadableInput:
+    """Tana o'qilsa xato - 413 erta qaytganini tekshirish uchun"""
+
+    def read(self, *args):
+        raise AssertionError("So'rov tanasi o'qildi")
+
+    readline = read
+
+
+class Command(BaseCommand):
+    help = (
+        "3 x 20 MB rasmni AdminProductCreateView orqali yuklashda xotira sarfini o'lchash "
+        "(on_commit ishlari, ya'ni hosilalarni rejalashtirish bilan)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=3)
+        parser.add_argument('--size', type=int, default=20, help="Har bir rasm hajmi, MB")
+
+    def handle(self, *args, **options):
+        size = options['size'] * MB
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            MEDIA_ROOT=directory, UPLOAD_MAX_FILE_SIZE=size + MB,
+        ):
+            # rollback_after emas: autocommit'da on_commit ishlari (hosilalarni rejalashtirish)
+            # so'rov ichida bajariladi va o'lchovga kiradi; yaratilganlar oxirida o'chiriladi
+            suffix = uuid.uuid4().hex[:8]
+            category = Category.objects.create(name='Bench upload', slug=f'bench-upload-{suffix}')
+            admin = User.objects.create_superuser(f'bench-upload-{suffix}', 'bench@example.com', uuid.uuid4().hex)
+            try:
+                self.measure_upload(directory, category, admin, size, options['files'])
+            finally:
+                self.cleanup(category, admin)
+
+        environ = self.environ(UnreadableInput(), settings.UPLOAD_MAX_REQUEST_SIZE + 1, self.content_type)
+        response = WSGIHandler()(environ, lambda status, headers: None)
+        self.stdout.write(f"{'Content-Length > limit':<32}{response.status_code:>10} (tana o'qilmadi)")
+
+    def measure_upload(self, directory, category, admin, size, files):
+        images = [self.make_image(directory, i, size) for i in range(files)]
+        body_path, self.content_type = self.make_body(directory, images, category.pk)
+        body_size = os.path.getsize(body_path)
+        self.stdout.write(f"{files} ta rasm x {size // MB} MB, so'rov tanasi {body_size / MB:.1f} MB")
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with open(body_path, 'rb') as body:
+            request = WSGIRequest(self.environ(body, body_size, self.content_type))
+            force_authenticate(request, admin)
+            tracemalloc.start()
+            response = AdminProductCreateView.as_view()(request)
+            _, peak = tracemalloc.get_traced_memory()
+            # WSGIHandler kabi: yuklangan vaqtinchalik fayllarni yopish
+            request.close()
+        assert response.status_code == 201, response.data
+        rss_growth = max(0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+        self.stdout.write(f"{'AdminProductCreateView':<32}{peak / MB:>10.1f} MB peak{rss_growth:>10.1f} MB RSS o'sishi")
+
+        # Hosilalar pool'da yaratiladi; natijalarni saqlash shu jarayonda (callback thread'i)
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        product = self.wait_for_variants(response.data['id'], files)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        elapsed = time.perf_counter() - started
+        widths = sum(len(entry['widths']) for entry in product.image_variants.values())
+        self.stdout.write(
+            f"{'WebP hosilalar (fon)':<32}{peak / MB:>10.1f} MB peak{elapsed:>10.2f} s, {widths} ta fayl"
+        )
+
+        self.compare_telegram_body(images[0])
+
+    @staticmethod
+    def wait_for_variants(product_id, files, timeout=120):
+        deadline = time.monotonic() + timeout
+        while True:
+            product = Product.objects.only('id', 'image_variants').get(pk=product_id)
+            if len(product.image_variants or {}) >= files:
+                return product
+            if time.monotonic() > deadline:
+                raise CommandError(f"Rasm hosilalari {timeout} s ichida yaratilmadi")
+            time.sleep(0.05)
+
+    @staticmethod
+    def cleanup(category, admin):
+        names = []
+        for product in Product.objects.filter(category=category):
+            names += [getattr(product, field).name for field in IMAGE_FIELDS if getattr(product, field)]
+            names += [name for field in IMAGE_FIELDS for name in variant_names(product.image_variants, field)]
+        Product.objects.filter(category=category).delete()
+        StoredBlob.objects.filter(name__in=names).delete()
+        category.delete()
+        admin.delete()
+
+    def compare_telegram_body(self, path):
+        """sendPhoto tanasi: requests'ning xotiradagi multipart'i va MultipartBody oqimi"""
+        with open(path, 'rb') as content:
+            tracemalloc.start()
+            RequestEncodingMixin._encode_files({'photo': ('a.jpg', content, 'image/jpeg')}, {'chat_id': 1})
+            _, buffered = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            tracemalloc.start()
+            for _ in MultipartBody({'chat_id': 1}, {'photo': ('a.jpg', content, 'image/jpeg')}):
+                pass
+            _, streamed = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.stdout.write(f"{'sendPhoto: requests files=':<32}{buffered / MB:>10.1f} MB peak")
+        self.stdout.write(f"{'sendPhoto: MultipartBody':<32}{streamed / MB:>10.1f} MB peak")
+
+    @staticmethod
+    def make_image(directory, index, size):
+        """Haqiqiy JPEG + tasodifiy dum (dedup ishlamasligi uchun har biri boshqa)"""
+        path = os.path.join(directory, f'source-{index}.jpg')
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (index * 40 % 256, 80, 160)).save(buffer, 'JPEG')
+        with open(path, 'wb') as target:
+            target.write(buffer.getvalue())
+            remaining = size - buffer.tell()
+            while remaining > 0:
+                chunk = os.urandom(min(MB, remaining))
+                target.write(chunk)
+                remaining -= len(chunk)
+        return path
+
+    @staticmethod
+    def make_body(directory, images, category_id):
+        fields = {
+            'name': 'Bench upload', 'category': category_id, 'description': 'Benchmark',
+            'price': '100000', 'uzum_link': 'https://uzum.uz/', 'is_active': 'true',
+        }
+        files = {}
+        for field, path in zip(['image', 'image_2', 'image_3'], images):
+            files[field] = (os.path.basename(path), open(path, 'rb'), 'image/jpeg')
+        body = MultipartBody(fields, files)
+        path = os.path.join(directory, 'body')
+        with open(path, 'wb') as target:
+            for chunk in body:
+                target.write(chunk)
+        for _, fileobj, _ in files.values():
+            fileobj.close()
+        return path, body.content_type
+
+    @staticmethod
+    def environ(body, length, content_type):
+        return {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': URL,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'CONTENT_TYPE': content_type,
+            'CONTENT_LENGTH': str(length),
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'HTTP_HOST': 'localhost',
+            'wsgi.input': body,
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': io.StringIO(),
+        }
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.thumbnails import backfill_variants
+
+
+class Command(BaseCommand):
+    help = "Mavjud mahsulot rasmlari uchun WebP nusxalar va blur placeholder yaratish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Bor hosilalarni ham qayta yaratish")
+        parser.add_argument('--batch-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = backfill_variants(Product.objects.all(), force=options['force'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{updated} ta mahsulot rasmlari uchun nusxalar yaratildi ({elapsed:.1f} s)"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from products.cache import bump_catalog_version
+from products.similar import SIMILAR_LIMIT, build_similar_products, refresh_stale_similar_products
+
+
+class Command(BaseCommand):
+    help = "O'xshash mahsulotlar jadvalini (kategoriya, narx, birga sotib olish) qaytadan qurish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=SIMILAR_LIMIT)
+        parser.add_argument(
+            '--stale', action='store_true',
+            help="Faqat buyurtmalardan keyin belgilangan (similar_stale) mahsulotlarni yangilash",
+        )
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            total = 0
+            while True:
+                count = refresh_stale_similar_products()
+                if not count:
+                    break
+                total += count
+            self.stdout.write(self.style.SUCCESS(f"{total} ta mahsulot o'xshashlari yangilandi"))
+            return
+
+        count = build_similar_products(limit=options['limit'])
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"{count} ta o'xshash mahsulot bog'lanishi yozildi"))
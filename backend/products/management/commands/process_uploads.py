@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products import metrics
+from products.models import RemoteUpload
+from products.uploads import process_due_uploads
+
+
+class Command(BaseCommand):
+    help = "Telegram'ga yuklash navbatini bo'shatish (fon thread'i o'chirilgan yoki jarayon qayta ishga tushgan bo'lsa)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Xatolik bilan tugaganlarni ham qayta urinish")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            RemoteUpload.objects.filter(status=RemoteUpload.FAILED).update(
+                status=RemoteUpload.PENDING, attempts=0, next_attempt_at=timezone.now()
+            )
+
+        total = 0
+        while True:
+            processed = process_due_uploads()
+            if not processed:
+                break
+            total += processed
+
+        pending = RemoteUpload.objects.filter(status=RemoteUpload.PENDING).count()
+        failed = RemoteUpload.objects.filter(status=RemoteUpload.FAILED).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} ta yuklash qayta ishlandi (kutilmoqda: {pending}, xatolik: {failed})"
+        ))
+
+        snapshot = metrics.snapshot()
+        for name, value in sorted(snapshot['counters'].items()):
+            self.stdout.write(f"  {name}: {value}")
+        for name, timing in sorted(snapshot['timings'].items()):
+            self.stdout.write(
+                f"  {name}: {timing['count']} ta, o'rtacha {timing['avg_ms']:.0f} ms, max {timing['max_ms']:.0f} ms"
+            )
@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from products.carts import purge_idle_carts, purge_inactive_items
+from products.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Nofaol savatlarni va faol bo'lmagan mahsulotlar elementlarini kichik partiyalarda o'chirish "
+        "(har bir partiya - qisqa tranzaksiya, partiyalar orasida pauza)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--idle-days', type=int, default=settings.CART_IDLE_DAYS)
+        parser.add_argument('--empty-idle-days', type=int, default=settings.CART_EMPTY_IDLE_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.1, help="Partiyalar orasidagi pauza, soniya")
+        parser.add_argument('--dry-run', action='store_true', help="Faqat o'chiriladiganlar sonini ko'rsatish")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['idle_days'])
+        empty_cutoff = now - timedelta(days=options['empty_idle_days'])
+
+        if options['dry_run']:
+            carts = Cart.objects.filter(Q(updated_at__lt=cutoff) | Q(total_items=0, updated_at__lt=empty_cutoff))
+            items = CartItem.objects.filter(product__is_active=False).exclude(cart__in=carts)
+            self.stdout.write(f"Nofaol savatlar: {carts.count()}, faol bo'lmagan mahsulot elementlari: {items.count()}")
+            return
+
+        after = 0
+
+        def idle_batch():
+            nonlocal after
+            deleted, after = purge_idle_carts(cutoff, empty_cutoff, after, options['batch_size'])
+            return deleted if after is not None else None
+
+        self.run("Nofaol savatlar (elementlari bilan)", idle_batch, options['sleep'])
+        self.run(
+            "Faol bo'lmagan mahsulot elementlari",
+            lambda: purge_inactive_items(options['batch_size']) or None,
+            options['sleep'],
+        )
+
+    def run(self, label, batch, pause):
+        """batch() - o'chirilgan qatorlar soni yoki tugagan bo'lsa None"""
+        rows = batches = 0
+        busy = 0.0
+        while True:
+            started = time.monotonic()
+            deleted = batch()
+            busy += time.monotonic() - started
+            if deleted is None:
+                break
+            rows += deleted
+            batches += 1
+            # Jonli so'rovlarga navbat berish
+            time.sleep(pause)
+        rate = rows / busy if busy else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {rows} qator, {batches} partiya, {busy:.2f} s ({rate:,.0f} qator/s)"
+        ))
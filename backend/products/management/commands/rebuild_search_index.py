@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Mahsulotlar qidiruv indeksini qaytadan qurish"
+
+    def handle(self, *args, **options):
+        count = rebuild_index(Product.objects.only('id', 'name', 'description'))
+        self.stdout.write(self.style.SUCCESS(f"{count} ta mahsulot indekslandi"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from products.carts import reprice_stale_carts
+
+
+class Command(BaseCommand):
+    help = "Narxi o'zgargan mahsulotlar bor (totals_stale) savatlar jamlarini partiyalab qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = reprice_stale_carts(options['batch_size'])
+            if not count:
+                break
+            total += count
+            self.stdout.write(f"{count} ta savat qayta hisoblandi")
+        self.stdout.write(self.style.SUCCESS(f"Jami: {total} ta savat"))
@@ -0,0 +1,42 @@
+"""
+Jarayon ichidagi oddiy metrikalar (hisoblagichlar va kechikishlar).
+
+Tashqi monitoring yo'q, shuning uchun qiymatlar xotirada yig'iladi va
+`snapshot()` orqali o'qiladi (masalan, `process_uploads` komandasi
+natijasida yoki log'da).
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, milliseconds):
+    """Kechikishni yozish: soni, yig'indisi va eng kattasi"""
+    with _lock:
+        timing = _timings.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        timing['count'] += 1
+        timing['total_ms'] += milliseconds
+        timing['max_ms'] = max(timing['max_ms'], milliseconds)
+
+
+def snapshot():
+    with _lock:
+        timings = {
+            name: {**timing, 'avg_ms': timing['total_ms'] / timing['count']}
+            for name, timing in _timings.items()
+        }
+        return {'counters': dict(_counters), 'timings': timings}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.25 on 2026-10-18 16:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0004_remove_product_material_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Savat',
+                'verbose_name_plural': 'Savatlar',
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=200, verbose_name="To'liq ism")),
+                ('phone', models.CharField(max_length=20, verbose_name='Telefon')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('address', models.TextField(verbose_name='Yetkazib berish manzili')),
+                ('city', models.CharField(max_length=100, verbose_name='Shahar')),
+                ('postal_code', models.CharField(blank=True, max_length=20, verbose_name='Pochta indeksi')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Jami narx')),
+                ('status', models.CharField(choices=[('pending', 'Kutilmoqda'), ('processing', 'Jarayonda'), ('shipped', 'Yuborildi'), ('delivered', 'Yetkazildi'), ('cancelled', 'Bekor qilindi')], default='pending', max_length=20, verbose_name='Holat')),
+                ('notes', models.TextField(blank=True, verbose_name='Izohlar')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Buyurtma',
+                'verbose_name_plural': 'Buyurtmalar',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Miqdori')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Narx')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='products.order', verbose_name='Buyurtma')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product', verbose_name='Mahsulot')),
+            ],
+            options={
+                'verbose_name': 'Buyurtma elementi',
+                'verbose_name_plural': 'Buyurtma elementlari',
+            },
+        ),
+        migrations.CreateModel(
+            name='CartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Miqdori')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='products.cart', verbose_name='Savat')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product', verbose_name='Mahsulot')),
+            ],
+            options={
+                'verbose_name': 'Savat elementi',
+                'verbose_name_plural': 'Savat elementlari',
+                'unique_together': {('cart', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Mahsulotlar uchun to'liq matnli qidiruv indeksi:
+# PostgreSQL - tsvector ustun + GIN indeks, SQLite - FTS5 shadow jadval
+#
+# Migratsiya products.search / products.models'ga bog'liq emas: DDL va
+# normallashtirish shu yerda muzlatilgan (keyingi o'zgarishlar bo'sh bazadan
+# `migrate` ni buzmasligi uchun). Indeksni joriy kod bilan qayta qurish -
+# `rebuild_search_index` komandasi.
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+FTS_TABLE = 'products_product_fts'
+BATCH_SIZE = 2000
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '',
+    'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya', 'ў': 'o', 'қ': 'q',
+    'ғ': 'g', 'ҳ': 'h',
+}
+TRANSLATION = str.maketrans({**CYRILLIC_TO_LATIN, **{apostrophe: '' for apostrophe in "'`ʻʼ‘’´"}})
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    text = (text or '').lower().translate(TRANSLATION)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(TOKEN_RE.findall(text))
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, description, prefix='2 3', tokenize='unicode61')"
+        )
+        sql = f'INSERT OR REPLACE INTO {FTS_TABLE}(name, description, rowid) VALUES (%s, %s, %s)'
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE products_product ADD COLUMN IF NOT EXISTS search_vector tsvector')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS products_product_search_vector_gin '
+            'ON products_product USING GIN (search_vector)'
+        )
+        sql = (
+            "UPDATE products_product SET search_vector = "
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'B') WHERE id = %s"
+        )
+    else:
+        return
+
+    Product = apps.get_model('products', 'Product')
+    rows = Product.objects.using(connection.alias).values_list('name', 'description', 'id')
+    batch = []
+    with connection.cursor() as cursor:
+        for name, description, pk in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append((normalize(name), normalize(description), pk))
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_product_search_vector_gin')
+        schema_editor.execute('ALTER TABLE products_product DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_cart_order_orderitem_cartitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.25 on 2026-10-18 16:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name="O'rni")),
+                ('score', models.FloatField(verbose_name='Ball')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_links', to='products.product', verbose_name='Mahsulot')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='products.product', verbose_name="O'xshash mahsulot")),
+            ],
+            options={
+                'verbose_name': "O'xshash mahsulot",
+                'verbose_name_plural': "O'xshash mahsulotlar",
+                'ordering': ['product', 'rank'],
+                'indexes': [models.Index(fields=['product', 'rank'], name='products_si_product_b6dc42_idx')],
+                'unique_together': {('product', 'similar')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.25 on 2026-10-18 16:31
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def fill_effective_price(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    products = list(Product.objects.only('id', 'price', 'discount_percentage'))
+    for product in products:
+        price = Decimal(product.price)
+        if product.discount_percentage > 0:
+            price = price * (100 - product.discount_percentage) / 100
+        product.effective_price = price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    Product.objects.bulk_update(products, ['effective_price'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_similarproduct'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=10, verbose_name="Chegirmali narx (so'm)"),
+        ),
+        migrations.RunPython(fill_effective_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-18 16:33
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpt(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    products = list(Product.objects.only('id', 'description'))
+    for product in products:
+        product.excerpt = Truncator(' '.join((product.description or '').split())).chars(160)
+    Product.objects.bulk_update(products, ['excerpt'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=160, verbose_name='Qisqa tavsif'),
+        ),
+        migrations.RunPython(fill_excerpt, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.25 on 2026-10-18 16:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_product_excerpt'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(max_length=255, upload_to='products/', verbose_name='Asosiy rasm'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image_2',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='products/', verbose_name='Rasm 2'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image_3',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='products/', verbose_name='Rasm 3'),
+        ),
+        migrations.CreateModel(
+            name='RemoteUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('local_name', models.CharField(max_length=255, unique=True, verbose_name='Lokal fayl')),
+                ('remote_name', models.CharField(blank=True, max_length=255, verbose_name='Telegram manzili')),
+                ('status', models.CharField(choices=[('pending', 'Kutilmoqda'), ('uploading', 'Yuklanmoqda'), ('done', 'Yuklandi'), ('failed', 'Xatolik')], default='pending', max_length=20, verbose_name='Holati')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Urinishlar')),
+                ('last_error', models.TextField(blank=True, verbose_name='Oxirgi xato')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Keyingi urinish')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rasm yuklash',
+                'verbose_name_plural': 'Rasm yuklashlar',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='products_re_status_5b39d8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.25 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('name', models.CharField(db_index=True, max_length=255, verbose_name='Fayl nomi')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Hajmi (bayt)')),
+                ('upload_count', models.PositiveIntegerField(default=1, verbose_name='Yuklashlar soni')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Saqlangan fayl',
+                'verbose_name_plural': 'Saqlangan fayllar',
+            },
+        ),
+    ]
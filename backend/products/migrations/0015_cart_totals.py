@@ -0,0 +1,49 @@
+# Generated by Django 4.2.25 on 2026-10-18 17:07
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def fill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('products', 'Cart')
+    CartItem = apps.get_model('products', 'CartItem')
+    totals = {
+        row['cart']: row
+        for row in CartItem.objects.values('cart').annotate(
+            items=Sum('quantity'),
+            price=Sum(F('quantity') * F('product__effective_price'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        )
+    }
+    carts = list(Cart.objects.filter(pk__in=totals).only('id'))
+    for cart in carts:
+        cart.total_items = totals[cart.pk]['items']
+        cart.total_price = Decimal(totals[cart.pk]['price']).quantize(Decimal('0.01'))
+    Cart.objects.bulk_update(carts, ['total_items', 'total_price'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_cart_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Mahsulotlar soni'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Jami narx'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='totals_stale',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Jamlar eskirgan'),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
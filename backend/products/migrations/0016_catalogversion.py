@@ -0,0 +1,32 @@
+# Generated by Django 4.2.25 on 2026-10-18 17:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_catalog_version(apps, schema_editor):
+    CatalogVersion = apps.get_model('products', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_cart_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1, verbose_name='Versiya')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name="O'zgargan vaqti")),
+            ],
+            options={
+                'verbose_name': 'Katalog versiyasi',
+                'verbose_name_plural': 'Katalog versiyasi',
+            },
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_catalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='similar_stale',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name="O'xshashlar eskirgan"),
+        ),
+    ]
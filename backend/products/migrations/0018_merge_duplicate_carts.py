@@ -0,0 +1,39 @@
+# Generated by Django 4.2.25 on 2026-10-18 23:05
+
+from django.db import migrations
+from django.db.models import Count, F
+
+MAX_QUANTITY = 99
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """Bir foydalanuvchining ortiqcha savatlari eng eskisiga qo'shiladi (miqdorlar yig'iladi) va o'chiriladi"""
+    Cart = apps.get_model('products', 'Cart')
+    CartItem = apps.get_model('products', 'CartItem')
+    users = Cart.objects.values('user').annotate(carts=Count('id')).filter(carts__gt=1).values_list('user', flat=True)
+    for user_id in list(users):
+        keep, *extra = Cart.objects.filter(user_id=user_id).order_by('pk').values_list('pk', flat=True)
+        items = {item.product_id: item for item in CartItem.objects.filter(cart_id=keep)}
+        for duplicate in CartItem.objects.filter(cart_id__in=extra).order_by('pk'):
+            item = items.get(duplicate.product_id)
+            if item is None:
+                duplicate.cart_id = keep
+                duplicate.save(update_fields=['cart'])
+                items[duplicate.product_id] = duplicate
+            else:
+                item.quantity = min(item.quantity + duplicate.quantity, MAX_QUANTITY)
+                item.save(update_fields=['quantity'])
+        Cart.objects.filter(pk__in=extra).delete()
+        # Jamlar qayta hisoblanadi (reprice_carts), versiya - ETag'lar eskiradi
+        Cart.objects.filter(pk=keep).update(totals_stale=True, version=F('version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_product_similar_stale'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.25 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Alohida migratsiya: PostgreSQL'da 0018 dagi o'chirishlarning kechiktirilgan
+    # FK tekshiruvlari bilan bir tranzaksiyada ALTER TABLE qilib bo'lmaydi
+
+    dependencies = [
+        ('products', '0018_merge_duplicate_carts'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user',), name='products_cart_unique_user'),
+        ),
+    ]
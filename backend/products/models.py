@@ -1,5 +1,8 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import models
-from django.utils.text import slugify
+from django.utils import timezone
+from django.utils.text import Truncator, slugify
 from django.contrib.auth.models import User
 
 class Category(models.Model):
@@ -7,6 +10,7 @@ class Category(models.Model):
     slug = models.SlugField(unique=True, blank=True)
     description = models.TextField(blank=True, verbose_name="Tavsif")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Kategoriya"
@@ -22,20 +26,28 @@ class Category(models.Model):
         return self.name
 
 
+EXCERPT_LENGTH = 160
+
+
 class Product(models.Model):
     name = models.CharField(max_length=200, verbose_name="Mahsulot nomi")
     slug = models.SlugField(unique=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', verbose_name="Kategoriya")
     description = models.TextField(verbose_name="Tavsif")
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False, verbose_name="Qisqa tavsif")
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Narx (so'm)")
-    image = models.ImageField(upload_to='products/', verbose_name="Asosiy rasm")
-    image_2 = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name="Rasm 2")
-    image_3 = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name="Rasm 3")
+    image = models.ImageField(upload_to='products/', max_length=255, verbose_name="Asosiy rasm")
+    image_2 = models.ImageField(upload_to='products/', max_length=255, blank=True, null=True, verbose_name="Rasm 2")
+    image_3 = models.ImageField(upload_to='products/', max_length=255, blank=True, null=True, verbose_name="Rasm 3")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Rasm nusxalari (WebP)")
     uzum_link = models.URLField(verbose_name="Uzum Market havola")
     yandex_market_link = models.URLField(blank=True, null=True, verbose_name="Yandex Market havola")
     discount_percentage = models.IntegerField(default=0, verbose_name="Chegirma foizi (0-100)")
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False, db_index=True, verbose_name="Chegirmali narx (so'm)")
     is_featured = models.BooleanField(default=False, verbose_name="Mashhur")
     is_active = models.BooleanField(default=True, verbose_name="Faol")
+    # Buyurtmadan keyin o'xshash mahsulotlari fon worker'ida qayta hisoblanadi (products.similar)
+    similar_stale = models.BooleanField(default=False, editable=False, db_index=True, verbose_name="O'xshashlar eskirgan")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -47,43 +59,105 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        self.effective_price = self.calculate_effective_price(self.price, self.discount_percentage)
+        self.excerpt = self.make_excerpt(self.description)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'price', 'discount_percentage'} & update_fields:
+                update_fields.add('effective_price')
+            if 'description' in update_fields:
+                update_fields.add('excerpt')
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
+        self.loaded_effective_price = self.effective_price
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Saqlashda narx o'zgarganini bilish uchun (signals.product_repriced)
+        instance.loaded_effective_price = instance.__dict__.get('effective_price')
+        return instance
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def calculate_effective_price(price, discount_percentage):
+        """Chegirmali narxni faqat Decimal bilan hisoblash (tiyinlargacha yaxlitlab)"""
+        price = Decimal(price)
+        if discount_percentage > 0:
+            price = price * (100 - discount_percentage) / 100
+        return price.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    @staticmethod
+    def make_excerpt(description):
+        """Ro'yxat kartochkalari uchun qisqa tavsif (bo'shliqlar yig'ilgan, 160 belgigacha)"""
+        return Truncator(' '.join((description or '').split())).chars(EXCERPT_LENGTH)
+
     @property
     def discounted_price(self):
-        """Chegirmali narxni hisoblash"""
-        if self.discount_percentage > 0:
-            discount = self.price * (self.discount_percentage / 100)
-            return self.price - discount
-        return self.price
+        """Chegirmali narx (bazada saqlangan effective_price)"""
+        return self.effective_price
+
+
+class SimilarProduct(models.Model):
+    """Oldindan hisoblangan o'xshash mahsulotlar (build_similar_products komandasi)"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_links', verbose_name="Mahsulot")
+    similar = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_to', verbose_name="O'xshash mahsulot")
+    rank = models.PositiveSmallIntegerField(verbose_name="O'rni")
+    score = models.FloatField(verbose_name="Ball")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "O'xshash mahsulot"
+        verbose_name_plural = "O'xshash mahsulotlar"
+        ordering = ['product', 'rank']
+        unique_together = ['product', 'similar']
+        indexes = [models.Index(fields=['product', 'rank'])]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.similar_id} ({self.rank})"
+
+
+class CatalogVersion(models.Model):
+    """
+    Katalog versiyasi (bitta qator): javob keshi kalitlari va ETag/Last-Modified
+    uchun. Bazada - barcha worker'lar bir xil versiyani ko'radi.
+    """
+    version = models.PositiveBigIntegerField(default=1, verbose_name="Versiya")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="O'zgargan vaqti")
+
+    class Meta:
+        verbose_name = "Katalog versiyasi"
+        verbose_name_plural = "Katalog versiyasi"
+
+    def __str__(self):
+        return f"v{self.version}"
 
 
 class Cart(models.Model):
     """Foydalanuvchi savati"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart', verbose_name="Foydalanuvchi")
+    # Har bir o'zgarishda oshadi: ETag / If-Match (carts.cart_etag)
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name="Versiya")
+    # Jamlar har bir o'zgarish bilan bir tranzaksiyada yangilanadi (carts.touch_cart);
+    # mahsulot narxi o'zgarsa eskirgan deb belgilanadi va reprice_carts qayta hisoblaydi
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, verbose_name="Jami narx")
+    total_items = models.PositiveIntegerField(default=0, editable=False, verbose_name="Mahsulotlar soni")
+    totals_stale = models.BooleanField(default=False, editable=False, db_index=True, verbose_name="Jamlar eskirgan")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Savat"
         verbose_name_plural = "Savatlar"
+        # Bitta foydalanuvchi - bitta savat (carts.create_cart ON CONFLICT shu cheklovga tayanadi)
+        constraints = [models.UniqueConstraint(fields=['user'], name='products_cart_unique_user')]
 
     def __str__(self):
         return f"{self.user.username} ning savati"
 
-    @property
-    def total_price(self):
-        """Savat umumiy narxi"""
-        return sum(item.subtotal for item in self.items.all())
-
-    @property
-    def total_items(self):
-        """Savat umumiy mahsulotlar soni"""
-        return sum(item.quantity for item in self.items.all())
-
 
 class CartItem(models.Model):
     """Savatdagi mahsulotlar"""
@@ -104,7 +178,7 @@ class CartItem(models.Model):
     @property
     def subtotal(self):
         """Mahsulot uchun jami narx"""
-        return self.product.discounted_price * self.quantity
+        return self.product.effective_price * self.quantity
 
 
 class Order(models.Model):
@@ -157,3 +231,61 @@ class OrderItem(models.Model):
     def subtotal(self):
         """Mahsulot uchun jami narx"""
         return self.price * self.quantity
+
+
+class RemoteUpload(models.Model):
+    """
+    Telegram'ga yuklanishi kutilayotgan rasm (lokal diskka yozilgan nusxa).
+
+    Fon worker'i (products.uploads) faylni yuklaydi va mahsulot maydonlarini
+    lokal nomdan Telegram nomiga (tg:<file_id>) almashtiradi.
+    """
+    PENDING = 'pending'
+    UPLOADING = 'uploading'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Kutilmoqda'),
+        (UPLOADING, 'Yuklanmoqda'),
+        (DONE, 'Yuklandi'),
+        (FAILED, 'Xatolik'),
+    ]
+
+    local_name = models.CharField(max_length=255, unique=True, verbose_name="Lokal fayl")
+    remote_name = models.CharField(max_length=255, blank=True, verbose_name="Telegram manzili")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, verbose_name="Holati")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Urinishlar")
+    last_error = models.TextField(blank=True, verbose_name="Oxirgi xato")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Keyingi urinish")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Rasm yuklash"
+        verbose_name_plural = "Rasm yuklashlar"
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.local_name} ({self.get_status_display()})"
+
+
+class StoredBlob(models.Model):
+    """
+    Saqlangan rasm baytlarining indeksi (sha256 -> storage nomi).
+
+    Bir xil rasm qayta yuklansa storage yangi fayl yozmaydi va Telegram'ga
+    yubormaydi - mavjud nom qaytariladi (products.storage).
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    name = models.CharField(max_length=255, db_index=True, verbose_name="Fayl nomi")
+    size = models.PositiveBigIntegerField(default=0, verbose_name="Hajmi (bayt)")
+    upload_count = models.PositiveIntegerField(default=1, verbose_name="Yuklashlar soni")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Saqlangan fayl"
+        verbose_name_plural = "Saqlangan fayllar"
+
+    def __str__(self):
+        return self.name
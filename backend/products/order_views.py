@@ -3,9 +3,18 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from django.db import transaction
-from .models import Cart, Order, OrderItem
-from .serializers import OrderSerializer, CreateOrderSerializer
+from .checkout import order_snapshot, place_order
+from .models import Order
+from .serializers import OrderSerializer, CreateOrderSerializer, only_columns
+
+
+def order_queryset(request):
+    """?fields= / ?omit= bo'yicha ustunlar; items so'ralgandagina mahsulotlari bilan yuklanadi"""
+    orders = Order.objects.only(*only_columns(OrderSerializer, request.query_params))
+    serializer_fields = OrderSerializer(context={'query_params': request.query_params}).fields
+    if 'items' in serializer_fields:
+        orders = orders.prefetch_related('items__product')
+    return orders
 
 
 class OrderListView(APIView):
@@ -13,8 +22,8 @@ class OrderListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        orders = Order.objects.filter(user=request.user).order_by('-created_at')
-        serializer = OrderSerializer(orders, many=True)
+        orders = order_queryset(request).filter(user=request.user).order_by('-created_at')
+        serializer = OrderSerializer(orders, many=True, context={'query_params': request.query_params})
         return Response(serializer.data)
 
 
@@ -23,8 +32,8 @@ class OrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id, user=request.user)
-        serializer = OrderSerializer(order)
+        order = get_object_or_404(order_queryset(request), id=order_id, user=request.user)
+        serializer = OrderSerializer(order, context={'query_params': request.query_params})
         return Response(serializer.data)
 
 
@@ -32,61 +41,22 @@ class CreateOrderView(APIView):
     """Buyurtma yaratish"""
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
     def post(self, request):
         # Validate order data
         serializer = CreateOrderSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get user's cart
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return Response(
-                {'error': 'Savatingiz bo\'sh'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Check if cart has items
-        cart_items = cart.items.all()
-        if not cart_items.exists():
+        # Savat va mahsulotlar qulflanadi, narxlar bir marta olinadi (products.checkout)
+        order = place_order(request.user, serializer.validated_data)
+        if order is None:
             return Response(
                 {'error': 'Savatingiz bo\'sh'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Calculate total price
-        total_price = cart.total_price
-
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            full_name=serializer.validated_data['full_name'],
-            phone=serializer.validated_data['phone'],
-            email=serializer.validated_data['email'],
-            address=serializer.validated_data['address'],
-            city=serializer.validated_data['city'],
-            postal_code=serializer.validated_data.get('postal_code', ''),
-            notes=serializer.validated_data.get('notes', ''),
-            total_price=total_price,
-            status='pending'
-        )
-
-        # Create order items from cart items
-        for cart_item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.discounted_price
-            )
-
-        # Clear cart
-        cart_items.delete()
-
         # Return order details
-        order_serializer = OrderSerializer(order)
+        order_serializer = OrderSerializer(order_snapshot(order))
         return Response({
             'message': 'Buyurtma muvaffaqiyatli yaratildi',
             'order': order_serializer.data
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Katalog sahifalash.
+
+    Odatiy holatda ?page= (PageNumberPagination) ishlaydi. ?cursor= berilsa
+    keyset rejimiga o'tiladi: COUNT(*) va OFFSET bajarilmaydi, keyingi sahifa
+    oxirgi qatorning ordering qiymatlari va `id` bo'yicha topiladi.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = "Noto'g'ri cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = self.get_keyset_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        # .values() querysetida keyingi cursor uchun ordering ustunlari ham kerak
+        selected = queryset.query.values_select
+        missing = [name for name, _ in self.ordering_fields() if selected and name not in selected]
+        if missing:
+            queryset = queryset.values(*selected, *missing)
+
+        position = self.decode_cursor(queryset.model, request)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position))
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        return self.page_rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page_rows[-1]
+        values = [self.get_row_value(last, name) for name, _ in self.ordering_fields()]
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values))
+
+    # ---------- keyset yordamchilari ----------
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Queryset ordering'i + barqaror `id` tiebreaker. Model ustuni bo'lmagan
+        tartiblar (masalan, qidiruvdagi `search_rank`) keyset'da ishlatilmaydi.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        ordering = [
+            field for field in ordering
+            if self.is_keyset_field(queryset.model, field.lstrip('-'))
+        ] or list(queryset.model._meta.ordering)
+        if not ordering:
+            return ['id']
+        tiebreaker = '-id' if ordering[0].startswith('-') else 'id'
+        return ordering + [tiebreaker]
+
+    @staticmethod
+    def is_keyset_field(model, name):
+        if name in ('id', 'pk'):
+            return False
+        try:
+            model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def ordering_fields(self):
+        return [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+    def keyset_filter(self, position):
+        """(a, b, id) > (x, y, z) shartini ordering yo'nalishlari bilan qurish"""
+        fields = self.ordering_fields()
+        condition = Q()
+        for index, (name, descending) in enumerate(fields):
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for prev_index, (prev_name, _) in enumerate(fields[:index]):
+                step &= Q(**{prev_name: position[prev_index]})
+            condition |= step
+        return condition
+
+    @staticmethod
+    def get_row_value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    def encode_cursor(self, values):
+        payload = [self.to_json_value(value) for value in values]
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, model, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            fields = self.ordering_fields()
+            if not isinstance(payload, list) or len(payload) != len(fields):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, payload)
+            ]
+        except (TypeError, ValueError, UnicodeError, binascii.Error,
+                FieldDoesNotExist, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def to_json_value(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
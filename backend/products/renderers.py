@@ -0,0 +1,25 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson o'rnatilmagan bo'lsa oddiy JSONRenderer ishlaydi
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer bilan bayt-ma-bayt bir xil natija beruvchi, orjson asosidagi
+    tezkor renderer. Decimal/datetime kabi turlar DRF encoder'iga topshiriladi,
+    shuning uchun ularning ko'rinishi o'zgarmaydi.
+    """
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        # JSONRenderer kabi \u2028 va \u2029 ni escape qilish
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
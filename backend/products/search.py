@@ -0,0 +1,156 @@
+"""
+Mahsulotlar uchun to'liq matnli qidiruv indeksi.
+
+PostgreSQL'da `products_product.search_vector` (tsvector + GIN), SQLite'da
+`products_product_fts` (FTS5 shadow jadval) ishlatiladi. Ikkala holatda ham
+matn oldin `normalize()` orqali o'tadi: kirill -> lotin transliteratsiya,
+apostroflar (o', g') olib tashlanadi, kichik harflarga o'tkaziladi. Shu
+sababli "совға", "sovg'a" va "SOVGʻA" bir xil tokenga aylanadi.
+"""
+import re
+import unicodedata
+
+from django.db import connections, router
+from django.db.models import FloatField, Q, Value
+
+from .models import Product
+
+FTS_TABLE = 'products_product_fts'
+
+# Ustunlar og'irligi: nomdagi moslik tavsifdagidan muhimroq
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '',
+    'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya', 'ў': 'o', 'қ': 'q',
+    'ғ': 'g', 'ҳ': 'h',
+}
+
+APOSTROPHES = "'`ʻʼ‘’´"
+
+_TRANSLATION = str.maketrans({
+    **CYRILLIC_TO_LATIN,
+    **{apostrophe: '' for apostrophe in APOSTROPHES},
+})
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """Matnni qidiruv tokenlariga aylantirish (lotin, kichik harf, apostrofsiz)"""
+    text = (text or '').lower().translate(_TRANSLATION)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(TOKEN_RE.findall(text))
+
+
+def _connection():
+    return connections[router.db_for_write(Product)]
+
+
+def _vendor(connection=None):
+    return (connection or _connection()).vendor
+
+
+# ---------- indeksni yangilash ----------
+
+def index_products(products, connection=None):
+    """Mahsulotlarni indeksga yozish (Product.save dan keyin yoki to'plam bo'lib)"""
+    connection = connection or _connection()
+    rows = [(normalize(p.name), normalize(p.description), p.pk) for p in products]
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {FTS_TABLE}(name, description, rowid) VALUES (%s, %s, %s)',
+                rows,
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.executemany(
+                "UPDATE products_product SET search_vector = "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') WHERE id = %s",
+                rows,
+            )
+
+
+def index_product(product, connection=None):
+    index_products([product], connection)
+
+
+def unindex_product(pk, connection=None):
+    """O'chirilgan mahsulotni indeksdan olib tashlash"""
+    connection = connection or _connection()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index(products, connection=None, batch_size=2000):
+    """Butun indeksni qaytadan qurish (migratsiya va management komanda uchun)"""
+    connection = connection or _connection()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    count, batch = 0, []
+    for product in products.iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) == batch_size:
+            index_products(batch, connection)
+            count, batch = count + len(batch), []
+    index_products(batch, connection)
+    return count + len(batch)
+
+
+# ---------- qidirish ----------
+
+def build_match_query(query, vendor):
+    """Foydalanuvchi so'rovini prefiks qidiruv ifodasiga aylantirish"""
+    tokens = normalize(query).split()
+    if not tokens:
+        return None
+    if vendor == 'postgresql':
+        return ' & '.join(f'{token}:*' for token in tokens)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_queryset(queryset, query):
+    """
+    Querysetni indeks orqali filterlash va `search_rank` (kattasi yaxshiroq)
+    ni qo'shish.
+    """
+    vendor = _vendor(connections[queryset.db])
+    match = build_match_query(query, vendor)
+    if match is None:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if vendor == 'sqlite':
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE}, %s, %s)'},
+            select_params=[NAME_WEIGHT, DESCRIPTION_WEIGHT],
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = products_product.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        )
+
+    if vendor == 'postgresql':
+        return queryset.extra(
+            select={'search_rank': "ts_rank(products_product.search_vector, to_tsquery('simple', %s))"},
+            select_params=[match],
+            where=["products_product.search_vector @@ to_tsquery('simple', %s)"],
+            params=[match],
+        )
+
+    # Boshqa bazalar uchun eski icontains xatti-harakati
+    condition = Q()
+    for term in query.split():
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
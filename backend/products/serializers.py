@@ -1,8 +1,171 @@
+from contextlib import contextmanager
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import UploadedFile
+from . import thumbnails
 from .models import Category, Product, Cart, CartItem, Order, OrderItem
 
-class CategorySerializer(serializers.ModelSerializer):
+
+def parse_field_list(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def select_fields(available, query_params=None, optional=()):
+    """
+    ?fields= va ?omit= bo'yicha qaytariladigan maydonlar (tartib saqlanadi).
+    `optional` maydonlar faqat ?fields= da so'ralganda qaytariladi.
+    """
+    selected = [name for name in available if name not in optional]
+    if query_params is None:
+        return selected
+
+    fields = parse_field_list(query_params.get('fields'))
+    omit = set(parse_field_list(query_params.get('omit')))
+    if fields:
+        selected = [name for name in available if name in fields]
+    return [name for name in selected if name not in omit]
+
+
+def sparse_query_params(request):
+    """Maydon tanlash faqat GET so'rovlarida ishlaydi (yozishda validatsiya to'liq qoladi)"""
+    if request is None or request.method != 'GET':
+        return None
+    # Fast path'ga oddiy Django HttpRequest ham kelishi mumkin
+    return getattr(request, 'query_params', request.GET)
+
+
+def only_columns(serializer_class, query_params):
+    """Tanlangan maydonlar uchun kerakli model ustunlari (.only() uchun)"""
+    model = serializer_class.Meta.model
+    concrete = {field.name for field in model._meta.concrete_fields}
+    serializer_fields = serializer_class(context={'all_fields': True}).fields
+    optional = getattr(serializer_class.Meta, 'optional_fields', ())
+    columns = {'id'}
+    for name in select_fields(list(serializer_fields), query_params, optional):
+        source = serializer_fields[name].source.split('.')[0]
+        if source.startswith('get_') and source.endswith('_display'):
+            source = source[len('get_'):-len('_display')]
+        if source in concrete:
+            columns.add(source)
+    return sorted(columns)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Product.image_variants (WebP nusxalar) dan o'qiladigan maydonlar uchun asos"""
+
+    def __init__(self, image_field='image', source='image_variants', **kwargs):
+        self.image_field = image_field
+        super().__init__(source=source, **kwargs)
+
+    def url_builder(self):
+        request = self.context.get('request')
+        storage = thumbnails.image_storage()
+
+        def url(name):
+            value = storage.url(name)
+            return request.build_absolute_uri(value) if request is not None else value
+        return url
+
+    def to_representation(self, variants):
+        return self.from_variants(variants, self.url_builder())
+
+    def from_variants(self, variants, url):
+        raise NotImplementedError
+
+    def names(self, variants):
+        """URL'i kerak bo'ladigan fayl nomlari (oldindan hal qilish uchun)"""
+        return thumbnails.variant_names(variants, self.image_field)
+
+
+class ImageSrcsetField(ImageVariantsField):
+    """`<img srcset>` uchun: "url 160w, url 320w, url 640w" (hosilalar bo'lmasa null)"""
+
+    def from_variants(self, variants, url):
+        return thumbnails.build_srcset(variants, self.image_field, url)
+
+
+class ImagePlaceholderField(ImageVariantsField):
+    """Rasm yuklanguncha ko'rsatiladigan 16px blur (data URI)"""
+
+    def from_variants(self, variants, url):
+        return thumbnails.placeholder(variants, self.image_field)
+
+    def names(self, variants):
+        return []
+
+
+class ImageThumbnailField(ImageVariantsField):
+    """Berilgan kenglikka eng mos bitta WebP nusxa URL'i (savat, buyurtmalar, admin)"""
+
+    def __init__(self, width=320, **kwargs):
+        self.width = width
+        super().__init__(**kwargs)
+
+    def from_variants(self, variants, url):
+        name = thumbnails.thumbnail_name(variants, self.image_field, self.width)
+        return url(name) if name else None
+
+    def names(self, variants):
+        name = thumbnails.thumbnail_name(variants, self.image_field, self.width)
+        return [name] if name else []
+
+
+def prefetch_image_urls(instances, serializer):
+    """Serializer'dagi rasm URL'larini storage'da bir yo'la hal qilish (Telegram getFile)"""
+    names_by_storage = {}
+    for field in serializer.fields.values():
+        if not isinstance(field, (serializers.ImageField, ImageVariantsField)):
+            continue
+        for instance in instances:
+            try:
+                value = field.get_attribute(instance)
+            except (AttributeError, KeyError):
+                continue
+            if isinstance(field, ImageVariantsField):
+                storage, names = thumbnails.image_storage(), field.names(value)
+            else:
+                storage, names = getattr(value, 'storage', None), [value.name] if value else []
+            if names and hasattr(storage, 'prefetch_urls'):
+                names_by_storage.setdefault(storage, []).extend(names)
+    for storage, names in names_by_storage.items():
+        storage.prefetch_urls(names)
+
+
+class ImagePrefetchListSerializer(serializers.ListSerializer):
+    """many=True ro'yxatlar uchun: rasm URL'lari har bir rasm uchun alohida emas, sahifa bo'yicha"""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        prefetch_image_urls(items, self.child)
+        return super().to_representation(items)
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= / ?omit= bo'yicha serializer maydonlarini qisqartirish.
+
+    So'rov parametrlari context['query_params'] dan (yoki context['request']
+    dan) olinadi; ichki serializer'lar uchun context['sparse_fields'] = False
+    (so'rov e'tiborga olinmaydi, Meta.optional_fields baribir chiqmaydi).
+    context['all_fields'] = True - barcha maydonlar (introspeksiya uchun).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('all_fields'):
+            return
+        query_params = None
+        if self.context.get('sparse_fields', True):
+            query_params = self.context.get('query_params') or sparse_query_params(self.context.get('request'))
+        optional = getattr(self.Meta, 'optional_fields', ())
+        keep = set(select_fields(list(self.fields), query_params, optional))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -13,38 +176,66 @@ class CategorySerializer(serializers.ModelSerializer):
         return obj.products.filter(is_active=True).count()
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_srcset = ImageSrcsetField()
+    image_placeholder = ImagePlaceholderField()
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'slug', 'category', 'category_name', 'description', 'price', 'image', 'image_2', 'image_3', 'uzum_link', 'yandex_market_link', 'discount_percentage', 'is_featured']
+        fields = ['id', 'name', 'slug', 'category', 'category_name', 'description', 'price', 'image', 'image_2', 'image_3', 'uzum_link', 'yandex_market_link', 'discount_percentage', 'is_featured', 'image_srcset', 'image_placeholder', 'excerpt']
+        list_serializer_class = ImagePrefetchListSerializer
+        # Faqat ?fields= orqali so'raladi (kartochkalar uchun description o'rniga)
+        optional_fields = ['excerpt']
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_srcset = ImageSrcsetField()
+    image_2_srcset = ImageSrcsetField(image_field='image_2')
+    image_3_srcset = ImageSrcsetField(image_field='image_3')
+    image_placeholder = ImagePlaceholderField()
     similar_products = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = ['id', 'name', 'slug', 'category', 'category_name', 'description', 'price',
                   'image', 'image_2', 'image_3', 'uzum_link', 'yandex_market_link',
-                  'discount_percentage', 'is_featured', 'created_at', 'similar_products']
+                  'discount_percentage', 'is_featured', 'created_at',
+                  'image_srcset', 'image_2_srcset', 'image_3_srcset', 'image_placeholder', 'similar_products']
+        list_serializer_class = ImagePrefetchListSerializer
 
     def get_similar_products(self, obj):
-        similar = Product.objects.filter(category=obj.category, is_active=True).exclude(id=obj.id)[:4]
-        return ProductListSerializer(similar, many=True, context=self.context).data
+        similar = list(similar_products_queryset(obj.id)) or fallback_similar_queryset(obj.id, obj.category_id)
+        context = {**self.context, 'sparse_fields': False}
+        return ProductListSerializer(similar, many=True, context=context).data
+
+
+def similar_products_queryset(product_id):
+    """Oldindan hisoblangan o'xshash mahsulotlar - (product, rank) indeksi bo'yicha bitta JOIN"""
+    return (
+        Product.objects.filter(is_active=True, similar_to__product_id=product_id)
+        .order_by('similar_to__rank')[:4]
+    )
 
 
-class ProductAdminSerializer(serializers.ModelSerializer):
+def fallback_similar_queryset(product_id, category_id):
+    """Indeksda hali yo'q mahsulot uchun: shu kategoriyadagi eng yangi 4 ta mahsulot"""
+    return Product.objects.filter(category_id=category_id, is_active=True).exclude(id=product_id)[:4]
+
+
+class ProductAdminSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Admin uchun mahsulot yaratish va tahrirlash serializer"""
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_thumbnail = ImageThumbnailField(width=160)
 
     class Meta:
         model = Product
         fields = ['id', 'name', 'slug', 'category', 'category_name', 'description', 'price',
                   'image', 'image_2', 'image_3', 'uzum_link', 'yandex_market_link',
-                  'discount_percentage', 'is_featured', 'is_active', 'created_at', 'updated_at']
+                  'discount_percentage', 'is_featured', 'is_active', 'created_at', 'updated_at',
+                  'image_thumbnail']
+        list_serializer_class = ImagePrefetchListSerializer
         read_only_fields = ['slug', 'created_at', 'updated_at']
 
     def validate_discount_percentage(self, value):
@@ -59,6 +250,38 @@ class ProductAdminSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Narx musbat son bo'lishi kerak")
         return value
 
+    def create(self, validated_data):
+        with self.stored_images(validated_data):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with self.stored_images(validated_data, instance):
+            return super().update(instance, validated_data)
+
+    @contextmanager
+    def stored_images(self, validated_data, instance=None):
+        """
+        Yuklangan rasmlarni storage.save_many bilan parallel saqlab, maydonlarga
+        tayyor nomlarni qo'yish; mahsulotni saqlash xato bersa yangi fayllar o'chiriladi.
+        """
+        storage = Product._meta.get_field('image').storage
+        fields = [name for name in thumbnails.IMAGE_FIELDS if isinstance(validated_data.get(name), UploadedFile)]
+        if not fields or not hasattr(storage, 'save_many'):
+            yield
+            return
+
+        items = []
+        for name in fields:
+            upload = validated_data[name]
+            items.append((Product._meta.get_field(name).generate_filename(instance, upload.name), upload))
+        names, created = storage.save_many(items, max_length=Product._meta.get_field('image').max_length)
+        validated_data.update(zip(fields, names))
+        try:
+            yield
+        except Exception:
+            storage.discard(created)
+            raise
+
 
 # ============== USER AUTHENTICATION SERIALIZERS ==============
 
@@ -113,15 +336,17 @@ class CartItemSerializer(serializers.ModelSerializer):
     """Savat elementi serializer"""
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_image = serializers.ImageField(source='product.image', read_only=True)
+    product_thumbnail = ImageThumbnailField(source='product.image_variants', width=160)
     product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
     product_discount = serializers.IntegerField(source='product.discount_percentage', read_only=True)
-    discounted_price = serializers.DecimalField(source='product.discounted_price', max_digits=10, decimal_places=2, read_only=True)
+    discounted_price = serializers.DecimalField(source='product.effective_price', max_digits=10, decimal_places=2, read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'product_name', 'product_image', 'product_price',
+        fields = ['id', 'product', 'product_name', 'product_image', 'product_thumbnail', 'product_price',
                   'product_discount', 'discounted_price', 'quantity', 'subtotal']
+        list_serializer_class = ImagePrefetchListSerializer
         read_only_fields = ['id', 'subtotal']
 
     def validate_quantity(self, value):
@@ -140,18 +365,49 @@ class CartSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'items', 'total_price', 'total_items', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'items', 'total_price', 'total_items', 'version', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'version', 'created_at', 'updated_at']
+
+
+class CartDeltaSerializer(serializers.Serializer):
+    """Batch javobi: faqat o'zgargan qatorlar, o'chirilgan element id'lari va yangi jamlar"""
+    version = serializers.IntegerField()
+    changed = CartItemSerializer(many=True)
+    removed = serializers.ListField(child=serializers.IntegerField())
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_items = serializers.IntegerField()
 
 
 class AddToCartSerializer(serializers.Serializer):
     """Savatga qo'shish serializer"""
+    # Mahsulot faolligi alohida so'rovsiz, upsert ichida tekshiriladi (carts.add_to_cart)
     product_id = serializers.IntegerField()
     quantity = serializers.IntegerField(default=1, min_value=1, max_value=99)
 
-    def validate_product_id(self, value):
-        if not Product.objects.filter(id=value, is_active=True).exists():
-            raise serializers.ValidationError("Mahsulot topilmadi yoki faol emas")
+
+class CartOperationSerializer(serializers.Serializer):
+    """Batch amali: add (qo'shish), set (miqdorni o'rnatish), remove (o'chirish)"""
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'])
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False, min_value=1, max_value=99)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'remove' and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': 'Miqdor talab qilinadi'})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Savatga bir nechta amalni bitta so'rovda qo'llash"""
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
+
+    def validate_operations(self, value):
+        # Faqat qo'shiladigan mahsulotlar faol bo'lishi shart; o'chirish har doim mumkin
+        product_ids = {operation['product_id'] for operation in value if operation['op'] != 'remove'}
+        active = set(Product.objects.filter(id__in=product_ids, is_active=True).values_list('id', flat=True))
+        missing = sorted(product_ids - active)
+        if missing:
+            raise serializers.ValidationError(f"Mahsulot topilmadi yoki faol emas: {missing}")
         return value
 
 
@@ -161,15 +417,17 @@ class OrderItemSerializer(serializers.ModelSerializer):
     """Buyurtma elementi serializer"""
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_image = serializers.ImageField(source='product.image', read_only=True)
+    product_thumbnail = ImageThumbnailField(source='product.image_variants', width=160)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'product_name', 'product_image', 'quantity', 'price', 'subtotal']
+        fields = ['id', 'product', 'product_name', 'product_image', 'product_thumbnail', 'quantity', 'price', 'subtotal']
+        list_serializer_class = ImagePrefetchListSerializer
         read_only_fields = ['id', 'price', 'subtotal']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Buyurtma serializer"""
     items = OrderItemSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -0,0 +1,55 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import search, thumbnails, uploads
+from .cache import bump_catalog_version
+from .carts import mark_totals_stale
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, using=None, **kwargs):
+    """Mahsulot saqlanganda qidiruv indeksi, Telegram yuklashlari va rasm hosilalarini yangilash"""
+    if raw:
+        return
+    search.index_product(instance, connections[using])
+    uploads.apply_completed_uploads(instance)
+    if thumbnails.stale_fields(instance):
+        transaction.on_commit(lambda: thumbnails.schedule_variants(instance.pk), using=using)
+
+
+@receiver(post_save, sender=Product)
+def product_repriced(sender, instance, created=False, raw=False, using=None, **kwargs):
+    """
+    Narx yoki chegirma o'zgarganda shu mahsulot bor savatlar jamlarini eskirgan deb belgilash.
+    Commit'dan keyin: mahsulot qatori qulfi ostida savatlarni qulflash checkout (savat,
+    keyin mahsulotlar) bilan teskari tartib bo'lardi va deadlock berardi.
+    """
+    if not raw and not created and instance.effective_price != getattr(instance, 'loaded_effective_price', None):
+        product_id = instance.pk
+        transaction.on_commit(lambda: mark_totals_stale([product_id]), using=using)
+
+
+@receiver(pre_delete, sender=Product)
+def product_deleting(sender, instance, **kwargs):
+    """
+    Savat elementlari kaskad o'chiriladi - savatlar jamlari eskiradi. Mahsulot
+    hali qulflanmagan: savatlar checkout'dagidek undan oldin qulflanadi.
+    """
+    mark_totals_stale([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, using=None, **kwargs):
+    """O'chirilgan mahsulotni qidiruv indeksidan olib tashlash"""
+    search.unindex_product(instance.pk, connections[using])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, using=None, **kwargs):
+    """Katalog o'zgarganda (admin panel va Admin API ham) kesh versiyasini oshirish"""
+    transaction.on_commit(bump_catalog_version, using=using)
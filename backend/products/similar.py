@@ -0,0 +1,146 @@
+"""
+O'xshash mahsulotlar indeksi (products_similarproduct jadvali).
+
+Ball = kategoriya mosligi + chegirmali narx yaqinligi + birga sotib olingan
+buyurtmalar soni. To'liq indeks `build_similar_products` komandasi bilan quriladi.
+Buyurtmadagi mahsulotlar checkout tranzaksiyasida `similar_stale` deb belgilanadi
+va ularni so'rovdan tashqarida fon worker'i (yoki `build_similar_products --stale`)
+partiyalab yangilaydi - checkout so'rovlari soni savat hajmiga bog'liq emas.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import OrderItem, Product, SimilarProduct
+from .workers import BackgroundWorker
+
+SIMILAR_LIMIT = 4
+STALE_BATCH_SIZE = 100
+PRICE_NEIGHBOURS = 20  # Kategoriya ichida narx bo'yicha har tomondan nomzodlar soni
+CATEGORY_WEIGHT = 1.0
+PRICE_WEIGHT = 1.0
+CO_PURCHASE_WEIGHT = 2.0
+
+_FIELDS = ('id', 'category_id', 'effective_price')
+
+
+def price_proximity(a, b):
+    high = max(a, b)
+    return 1.0 - float(abs(a - b) / high) if high else 1.0
+
+
+def co_purchase_counts(product_ids=None):
+    """{mahsulot: {boshqa mahsulot: nechta buyurtmada birga}}"""
+    items = OrderItem.objects.all()
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    rows = (
+        items.values('product_id', other_id=F('order__items__product_id'))
+        .exclude(other_id=F('product_id'))
+        .annotate(orders=Count('order_id', distinct=True))
+        .order_by()
+    )
+    counts = defaultdict(dict)
+    for row in rows:
+        counts[row['product_id']][row['other_id']] = row['orders']
+    return counts
+
+
+def rank_candidates(product, candidates, co_counts, limit=SIMILAR_LIMIT):
+    """Nomzodlarni ballash va eng yaxshi `limit` tasini SimilarProduct sifatida qaytarish"""
+    scores = {}
+    for candidate in candidates:
+        if candidate['id'] == product['id']:
+            continue
+        score = PRICE_WEIGHT * price_proximity(product['effective_price'], candidate['effective_price'])
+        if candidate['category_id'] == product['category_id']:
+            score += CATEGORY_WEIGHT
+        score += CO_PURCHASE_WEIGHT * co_counts.get(candidate['id'], 0)
+        scores[candidate['id']] = score
+
+    best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [
+        SimilarProduct(product_id=product['id'], similar_id=similar_id, rank=rank, score=score)
+        for rank, (similar_id, score) in enumerate(best)
+    ]
+
+
+def build_similar_products(limit=SIMILAR_LIMIT):
+    """Butun jadvalni qaytadan qurish"""
+    products = list(Product.objects.filter(is_active=True).values(*_FIELDS))
+    by_id = {product['id']: product for product in products}
+    by_category = defaultdict(list)
+    for product in products:
+        by_category[product['category_id']].append(product)
+    co_counts = co_purchase_counts()
+
+    links = []
+    for category_products in by_category.values():
+        category_products.sort(key=lambda product: (product['effective_price'], product['id']))
+        for index, product in enumerate(category_products):
+            neighbours = category_products[max(0, index - PRICE_NEIGHBOURS):index + PRICE_NEIGHBOURS + 1]
+            partners = [by_id[pk] for pk in co_counts.get(product['id'], {}) if pk in by_id]
+            links += rank_candidates(product, neighbours + partners, co_counts.get(product['id'], {}), limit)
+
+    with transaction.atomic():
+        SimilarProduct.objects.all().delete()
+        SimilarProduct.objects.bulk_create(links, batch_size=1000)
+    return len(links)
+
+
+def refresh_similar_products(product_ids, limit=SIMILAR_LIMIT):
+    """Berilgan mahsulotlar uchun o'xshashlarni qayta hisoblash (buyurtmadan keyin)"""
+    products = list(Product.objects.filter(id__in=product_ids, is_active=True).values(*_FIELDS))
+    co_counts = co_purchase_counts([product['id'] for product in products])
+    partner_ids = {pk for partners in co_counts.values() for pk in partners}
+    partners = {
+        product['id']: product
+        for product in Product.objects.filter(id__in=partner_ids, is_active=True).values(*_FIELDS)
+    }
+
+    links = []
+    for product in products:
+        same_category = Product.objects.filter(is_active=True, category_id=product['category_id'])
+        above = same_category.filter(effective_price__gte=product['effective_price']).order_by('effective_price', 'id')
+        below = same_category.filter(effective_price__lt=product['effective_price']).order_by('-effective_price', '-id')
+        neighbours = (
+            list(above.values(*_FIELDS)[:PRICE_NEIGHBOURS + 1])
+            + list(below.values(*_FIELDS)[:PRICE_NEIGHBOURS])
+        )
+        product_co_counts = co_counts.get(product['id'], {})
+        candidates = neighbours + [partners[pk] for pk in product_co_counts if pk in partners]
+        links += rank_candidates(product, candidates, product_co_counts, limit)
+
+    with transaction.atomic():
+        SimilarProduct.objects.filter(product_id__in=product_ids).delete()
+        SimilarProduct.objects.bulk_create(links)
+    return len(links)
+
+
+def mark_similar_stale(product_ids):
+    """Buyurtmadagi mahsulotlar o'xshashlarini fon worker'iga topshirish (bitta UPDATE)"""
+    Product.objects.filter(pk__in=product_ids, similar_stale=False).update(similar_stale=True)
+    if settings.SIMILAR_REFRESH_WORKER:
+        transaction.on_commit(worker.wake)
+
+
+def refresh_stale_similar_products(batch_size=STALE_BATCH_SIZE):
+    """Bir partiya `similar_stale` mahsulotlar o'xshashlarini yangilash; yangilanganlar soni"""
+    product_ids = list(
+        Product.objects.filter(similar_stale=True).order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not product_ids:
+        return 0
+    # Bayroq oldin tushiriladi: shu payt kelgan yangi buyurtma uni qayta ko'taradi
+    Product.objects.filter(pk__in=product_ids).update(similar_stale=False)
+    try:
+        refresh_similar_products(product_ids)
+    except Exception:
+        Product.objects.filter(pk__in=product_ids).update(similar_stale=True)
+        raise
+    return len(product_ids)
+
+
+worker = BackgroundWorker('similar-products-worker', refresh_stale_similar_products)
@@ -0,0 +1,139 @@
+"""
+Kontent bo'yicha manzillanadigan (content-addressed) rasm saqlash.
+
+CONTENT_ADDRESSED_PREFIXES dagi fayllar (mahsulot rasmlari) sha256 bo'yicha
+`products/ab/<sha256>.jpg` nomi bilan saqlanadi va StoredBlob jadvalida
+indekslanadi. Bir xil baytlar qayta yuklansa mavjud nom qaytariladi - disk
+yozuvi ham, Telegram'ga yuklash ham bo'lmaydi (`uploads.deduplicated`
+metrikasi). Hash yuklanish paytida (products.upload_handlers) hisoblanadi.
+
+`save_many` bir so'rovdagi bir nechta rasmni parallel saqlaydi (Telegram
+storage'da har biri alohida lokal yozuv + navbat).
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+
+from . import metrics
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_digest(content):
+    """(sha256, hajm): yuklash handler'i hisoblagan bo'lsa o'sha, aks holda o'qib"""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest, content.size
+    hasher = hashlib.sha256()
+    size = 0
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        hasher.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return hasher.hexdigest(), size
+
+
+def content_name(name, digest):
+    """'products/photo.JPG' -> 'products/ab/ab12...ef.jpg'"""
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, digest[:2], digest + extension).replace(os.sep, '/')
+
+
+def register_blob(digest, name, size):
+    from .models import StoredBlob
+
+    # update_or_create o'rniga avval yozish (SQLite'da upload worker bilan qulf bo'lmaydi)
+    if StoredBlob.objects.filter(sha256=digest).update(name=name, size=size):
+        return
+    try:
+        StoredBlob.objects.create(sha256=digest, name=name, size=size)
+    except IntegrityError:  # parallel so'rov ulgurdi - u ham shu baytlar
+        pass
+
+
+class ContentAddressedMixin:
+    def is_content_addressed(self, name):
+        return name.startswith(tuple(settings.CONTENT_ADDRESSED_PREFIXES))
+
+    def save(self, name, content, max_length=None):
+        return self.store(name, content, max_length)[0]
+
+    def store(self, name, content, max_length=None):
+        """(nom, yangi yozildimi) - takror baytlar uchun False"""
+        from .models import StoredBlob
+
+        if name is None:
+            name = content.name
+        if not self.is_content_addressed(name):
+            return super().save(name, content, max_length), True
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest, size = content_digest(content)
+        blob = StoredBlob.objects.filter(sha256=digest).only('name').first()
+        if blob is not None and self.exists(blob.name):
+            StoredBlob.objects.filter(pk=blob.pk).update(upload_count=F('upload_count') + 1)
+            metrics.increment('uploads.deduplicated')
+            metrics.increment('uploads.deduplicated_bytes', size)
+            return blob.name, False
+
+        name = content_name(name, digest)
+        if self.exists(name):
+            register_blob(digest, name, size)
+            return name, False
+        name = super().save(name, content, max_length)
+        metrics.increment('uploads.stored')
+        metrics.increment('uploads.stored_bytes', size)
+        register_blob(digest, name, size)
+        return name, True
+
+    def save_many(self, items, max_length=None):
+        """
+        [(nom, kontent), ...] ni parallel saqlash (UPLOAD_SAVE_WORKERS ta thread).
+        (nomlar, yangi yozilgan nomlar) qaytadi; bittasi xato bersa shu chaqiruvda
+        yangi yozilgan fayllar o'chiriladi va xato qayta ko'tariladi.
+        """
+        # Tranzaksiya ichida thread'lar uning DB yozuvlarini ko'rmaydi (SQLite'da qulf) - ketma-ket
+        if len(items) < 2 or transaction.get_connection().in_atomic_block:
+            outcomes = [self.store(name, content, max_length) for name, content in items]
+            return [name for name, _ in outcomes], [name for name, is_new in outcomes if is_new]
+
+        workers = min(len(items), settings.UPLOAD_SAVE_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='storage-save') as executor:
+            futures = [executor.submit(self.store_in_thread, name, content, max_length) for name, content in items]
+            wait(futures)
+
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        outcomes = [future.result() for future in futures if future.exception() is None]
+        created = [name for name, is_new in outcomes if is_new]
+        if errors:
+            self.discard(created)
+            raise errors[0]
+        return [name for name, _ in outcomes], created
+
+    def store_in_thread(self, name, content, max_length):
+        try:
+            return self.store(name, content, max_length)
+        finally:
+            # Thread'ning DB ulanishi (StoredBlob, RemoteUpload) pool bilan yopiladi
+            connections.close_all()
+
+    def discard(self, names):
+        """save_many bekor qilinganda yangi yozilgan fayllarni va indeks yozuvlarini o'chirish"""
+        from .models import StoredBlob
+
+        for name in names:
+            self.delete(name)
+        StoredBlob.objects.filter(name__in=names).delete()
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    """Lokal storage (Telegram sozlanmagan bo'lsa)"""
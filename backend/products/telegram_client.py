@@ -0,0 +1,261 @@
+"""
+Telegram Bot API uchun umumiy HTTP klient.
+
+- Har bir jarayonda bitta keep-alive `requests.Session` (cheklangan pool).
+- Tarmoq xatolari, 5xx va 429 da eksponensial kutish bilan qayta urinish;
+  429 javobidagi `retry_after` hurmat qilinadi.
+- Circuit breaker: ketma-ket xatolardan keyin Telegram'ga so'rovlar vaqtincha
+  yuborilmaydi (CircuitOpenError), storage esa lokal nusxadan foydalanadi.
+- Fayllar multipart tanasiga bo'laklab o'qiladi (MultipartBody) - katta rasm
+  butunligicha xotiraga yuklanmaydi.
+"""
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = 10
+CONNECT_TIMEOUT = 5
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # soniya, har urinishda ikki barobar
+MAX_BACKOFF = 30
+FAILURE_THRESHOLD = 5  # ketma-ket xatolar, keyin breaker ochiladi
+RESET_TIMEOUT = 60  # soniya, keyin bitta sinov so'roviga ruxsat
+
+
+class TelegramAPIError(Exception):
+    """Telegram so'rovni rad etdi yoki javob bermadi"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(TelegramAPIError):
+    """Telegram vaqtincha ishlamayapti - so'rov yuborilmadi"""
+
+
+class CircuitBreaker:
+    """closed -> (FAILURE_THRESHOLD xato) -> open -> (RESET_TIMEOUT) -> half-open"""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def seconds_until_retry(self):
+        """Breaker yopilishi mumkin bo'lgan vaqtgacha qolgan soniyalar"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.probing:
+                return False
+            self.probing = True  # half-open: faqat bitta sinov so'rovi
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    logger.error("Telegram circuit breaker opened after %s failures", self.failures)
+                    metrics.increment('telegram.circuit_opened')
+                self.opened_at = time.monotonic()
+
+
+class MultipartBody:
+    """
+    multipart/form-data tanasi fayl obyektlaridan CHUNK_SIZE bo'laklab
+    o'qiladi; uzunligi oldindan ma'lum (Content-Length, chunked emas).
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields=None, files=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.parts = []
+        for name, value in (fields or {}).items():
+            self.parts.append(self.part_header(name) + b'\r\n' + str(value).encode('utf-8') + b'\r\n')
+        for name, (filename, fileobj, content_type) in (files or {}).items():
+            self.parts.append(
+                self.part_header(name, filename) + f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8')
+            )
+            self.parts.append(fileobj)
+            self.parts.append(b'\r\n')
+        self.parts.append(f'--{self.boundary}--\r\n'.encode('ascii'))
+        self.length = sum(part_size(part) for part in self.parts)
+        self.rewind()
+
+    def part_header(self, name, filename=None):
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        return f'--{self.boundary}\r\nContent-Disposition: {disposition}\r\n'.encode('utf-8')
+
+    def rewind(self):
+        """Qayta urinishdan oldin boshiga qaytish"""
+        for part in self.parts:
+            if not isinstance(part, bytes):
+                part.seek(0)
+        self.index = 0
+        self.offset = 0
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        size = self.CHUNK_SIZE if size is None or size < 0 else size
+        while self.index < len(self.parts):
+            part = self.parts[self.index]
+            if isinstance(part, bytes):
+                chunk = part[self.offset:self.offset + size]
+                self.offset += len(chunk)
+            else:
+                chunk = part.read(size)
+            if chunk:
+                return chunk
+            self.index += 1
+            self.offset = 0
+        return b''
+
+
+def part_size(part):
+    if isinstance(part, bytes):
+        return len(part)
+    part.seek(0, os.SEEK_END)
+    size = part.tell()
+    part.seek(0)
+    return size
+
+
+class TelegramClient:
+    def __init__(self, token, api_url=None, pool_size=POOL_SIZE):
+        self.api_url = (api_url or settings.TELEGRAM_API_URL).rstrip('/')
+        self.base_url = f"{self.api_url}/bot{token}"
+        self.file_url = f"{self.api_url}/file/bot{token}"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker()
+
+    def call(self, method, *, http_method='POST', timeout=30, retries=MAX_RETRIES, params=None, data=None, files=None):
+        """
+        Bot API metodini chaqirish va `result` ni qaytarish.
+
+        `files` ({nom: (fayl nomi, fayl obyekti, turi)}) bo'lsa tana oqim sifatida
+        yuboriladi va har bir urinishdan oldin boshiga qaytariladi.
+        """
+        if not self.breaker.allow():
+            metrics.increment('telegram.circuit_rejected')
+            raise CircuitOpenError(f"{method}: circuit open", retry_after=self.breaker.seconds_until_retry())
+
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            try:
+                result = self._request(method, http_method, timeout, params, data, files)
+            except TelegramAPIError as exc:
+                metrics.increment(f'telegram.{method}.errors')
+                if exc.retry_after is None:
+                    # 4xx - Telegram ishlayapti, so'rovning o'zi noto'g'ri
+                    self.breaker.record_success()
+                    raise
+                if attempt > retries or exc.retry_after > MAX_BACKOFF:
+                    # Uzoq flood-wait'ni shu yerda kutmaymiz - chaqiruvchi keyinroq urinadi
+                    self.breaker.record_failure()
+                    raise
+                delay = exc.retry_after or min(BACKOFF_BASE * 2 ** (attempt - 1), MAX_BACKOFF)
+                delay += random.uniform(0, delay / 4)
+                logger.warning("Telegram %s failed (%s), retry %s in %.1fs", method, exc, attempt, delay)
+                metrics.increment(f'telegram.{method}.retries')
+                time.sleep(delay)
+                continue
+            finally:
+                metrics.observe(f'telegram.{method}', (time.monotonic() - started) * 1000)
+
+            self.breaker.record_success()
+            metrics.increment(f'telegram.{method}.ok')
+            return result
+
+    def _request(self, method, http_method, timeout, params, data, files):
+        headers = None
+        if files:
+            data = MultipartBody(data, files)
+            headers = {'Content-Type': data.content_type}
+        try:
+            response = self.session.request(
+                http_method, f"{self.base_url}/{method}",
+                params=params, data=data, headers=headers, timeout=(CONNECT_TIMEOUT, timeout),
+            )
+        except requests.RequestException as exc:
+            # Tarmoq xatosi - qayta urinish mumkin (retry_after=0 -> standart backoff)
+            raise TelegramAPIError(f"{method}: {exc}", retry_after=0) from exc
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if response.ok and payload.get('ok'):
+            return payload['result']
+
+        description = payload.get('description') or response.reason
+        if response.status_code == 429:
+            retry_after = (payload.get('parameters') or {}).get('retry_after', 1)
+            raise TelegramAPIError(f"{method}: {description}", retry_after=retry_after)
+        if response.status_code >= 500:
+            raise TelegramAPIError(f"{method}: {response.status_code} {description}", retry_after=0)
+        raise TelegramAPIError(f"{method}: {response.status_code} {description}")
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(token):
+    """Jarayon uchun umumiy klient (fork'dan keyin yangisi yaratiladi)"""
+    key = (os.getpid(), token)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = TelegramClient(token)
+        return client
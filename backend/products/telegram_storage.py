@@ -1,88 +1,262 @@
-import requests
-from django.core.files.storage import Storage
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db.models import Q
 from django.conf import settings
 
+from . import metrics
+from .storage import ContentAddressedMixin
+from .telegram_client import TelegramAPIError, get_client
+
+logger = logging.getLogger(__name__)
+
+FILE_ID_PREFIX = 'tg:'
+# Telegram fayl havolasi kamida 1 soat amal qiladi - undan oldinroq yangilaymiz
+FILE_PATH_TTL = 50 * 60
+# Yangilab bo'lmasa (Telegram o'chiq) eskirgan yo'l shuncha vaqt ishlatiladi
+FILE_PATH_STALE_TTL = 24 * 60 * 60
+RESOLVE_WORKERS = 8
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# sendPhoto rasmni JPEG'ga qayta siqadi - qolgan turlar (WebP hosilalar, PNG)
+# sendDocument bilan o'z turida, baytma-bayt saqlanadi
+PHOTO_CONTENT_TYPES = ('image/jpeg',)
+
+
+def file_path_cache_key(file_id):
+    return f'telegram:file_path:{file_id}'
+
+
+class TelegramStorage(ContentAddressedMixin, Storage):
+    """
+    Rasmlar avval lokal diskka yoziladi va darhol qaytariladi, Telegram'ga esa
+    fon worker'i (products.uploads) yuklaydi. Yuklangunga qadar, shuningdek
+    Telegram ishlamay turganda (circuit breaker ochiq) maydon lokal nomni
+    saqlaydi va URL /media/ orqali beriladi.
+
+    Yuklangandan keyin maydonda o'zgarmas `tg:<file_id>` saqlanadi va
+    (MEDIA_PROXY_REMOTE) URL'i ham /media/tg:... bo'ladi - rasmni core.media
+    disk keshidan beradi. Aks holda Telegram fayl yo'llari eskiradi, shuning
+    uchun `url()` ularni getFile orqali olib keshda (FILE_PATH_TTL) saqlaydi;
+    `prefetch_urls` bir sahifadagi barcha rasmlarni bitta parallel so'rovlar
+    to'plamida hal qiladi.
+    """
 
-class TelegramStorage(Storage):
     def __init__(self):
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
         self.chat_id = settings.TELEGRAM_CHAT_ID
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.local = FileSystemStorage()
+
+    @property
+    def client(self):
+        return get_client(self.bot_token)
 
-        # DEBUG: Settings tekshirish
-        print(f"[TELEGRAM STORAGE] Token: {self.bot_token[:20]}...")
-        print(f"[TELEGRAM STORAGE] Chat ID: {self.chat_id}")
+    @staticmethod
+    def is_remote(name):
+        return name.startswith((FILE_ID_PREFIX, 'http://', 'https://'))
 
     def _save(self, name, content):
-        """Rasmni Telegram'ga yuklash"""
-        print(f"[TELEGRAM STORAGE] Uploading: {name}")
+        """Rasmni lokal diskka yozib, Telegram'ga yuklashni navbatga qo'yish"""
+        from .uploads import enqueue_upload
 
-        url = f"{self.base_url}/sendPhoto"
+        name = self.local.save(name, content)
+        enqueue_upload(name)
+        return name
 
-        # Fayl content'ini o'qish
+    def _open(self, name, mode='rb'):
+        """Lokal nusxa yoki Telegram'dan yuklab olingan fayl (thumbnail, media keshi uchun)"""
+        if not self.is_remote(name):
+            if self.local.exists(name):
+                return self.local.open(name, mode)
+            # Lokal nusxa yuklangandan keyin o'chiriladi - eski URL'lar uchun Telegram nomi
+            name = self.uploaded_name(name)
+        url = self.remote_url(name)
+        if url is None:
+            raise FileNotFoundError(f"Telegram file is not available: {name}")
+        if not self.is_file_url(url):
+            # Faqat Bot API fayl manzili yuklab olinadi (SSRF)
+            raise FileNotFoundError(f"Not a Telegram file URL: {name}")
+        # Butun fayl xotiraga olinmaydi: FILE_UPLOAD_MAX_MEMORY_SIZE dan kattasi vaqtinchalik diskka
+        content = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        try:
+            with self.client.session.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    content.write(chunk)
+        except Exception:
+            content.close()
+            raise
         content.seek(0)
-        file_data = content.read()
-        print(f"[TELEGRAM STORAGE] File size: {len(file_data)} bytes")
-
-        files = {
-            'photo': (name, file_data, 'image/jpeg')
-        }
-        data = {
-            'chat_id': self.chat_id,
-            'caption': f"MoonGift Product: {name}"
-        }
+        return File(content, name=name)
 
+    def upload(self, name):
+        """
+        Lokal faylni Telegram'ga yuborib, `tg:<file_id>` nomini qaytarish (worker chaqiradi).
+        Xatoda TelegramAPIError (CircuitOpenError - Telegram vaqtincha o'chiq).
+        """
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        as_photo = content_type in PHOTO_CONTENT_TYPES
+        field = 'photo' if as_photo else 'document'
+        data = {'chat_id': self.chat_id, 'caption': f"MoonGift Product: {name}"}
+        if not as_photo:
+            # Aks holda .webp stiker sifatida qabul qilinadi
+            data['disable_content_type_detection'] = 'true'
+        started = time.monotonic()
         try:
-            print(f"[TELEGRAM STORAGE] Sending to: {url}")
-            response = requests.post(url, files=files, data=data, timeout=60)
-            result = response.json()
+            with self.local.open(name, 'rb') as content:
+                result = self.client.call(
+                    'sendPhoto' if as_photo else 'sendDocument',
+                    files={field: (os.path.basename(name), content, content_type)},
+                    data=data,
+                    timeout=60,
+                )
+        except Exception:
+            metrics.increment('telegram.upload.failed')
+            raise
 
-            print(f"[TELEGRAM STORAGE] Response: {result}")
+        elapsed = (time.monotonic() - started) * 1000
+        metrics.observe('telegram.upload', elapsed)
+        metrics.increment('telegram.upload.ok')
+        logger.info("Uploaded %s to Telegram in %.0f ms", name, elapsed)
+        if as_photo:
+            # Eng katta rasmning file_id'si
+            return FILE_ID_PREFIX + result['photo'][-1]['file_id']
+        return FILE_ID_PREFIX + result['document']['file_id']
 
-            if result.get('ok'):
-                # Eng katta rasmning file_id'sini olish
-                photos = result['result']['photo']
-                file_id = photos[-1]['file_id']
+    @staticmethod
+    def uploaded_name(local_name):
+        from .models import RemoteUpload
 
-                print(f"[TELEGRAM STORAGE] File ID: {file_id}")
+        remote_name = RemoteUpload.objects.filter(
+            local_name=local_name, status=RemoteUpload.DONE,
+        ).values_list('remote_name', flat=True).first()
+        if not remote_name:
+            raise FileNotFoundError(local_name)
+        return remote_name
 
-                # File path olish
-                file_url = f"{self.base_url}/getFile"
-                file_response = requests.get(file_url, params={'file_id': file_id}, timeout=30)
-                file_result = file_response.json()
+    def url(self, name):
+        """
+        `tg:<file_id>` uchun /media/ proksi (yoki keshlangan Telegram) URL'i,
+        eski yozuvlar uchun saqlangan URL, hali yuklanmagan fayl uchun lokal /media/ URL.
+        """
+        if name.startswith(FILE_ID_PREFIX) and not settings.MEDIA_PROXY_REMOTE:
+            return self.resolve_urls([name])[name]
+        if self.is_remote(name) and not name.startswith(FILE_ID_PREFIX):
+            return name
+        return self.local.url(name)
 
-                if file_result.get('ok'):
-                    file_path = file_result['result']['file_path']
-                    # Public URL qaytarish
-                    public_url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
+    def remote_url(self, name):
+        """Telegram'dagi fayl manzili (yo'lni olib bo'lmasa yoki Bot API manzili bo'lmasa None)"""
+        if not name.startswith(FILE_ID_PREFIX):
+            return name if self.is_remote(name) and self.is_file_url(name) else None
+        path = self.resolve_paths([name]).get(name[len(FILE_ID_PREFIX):])
+        return f"{self.client.file_url}/{path}" if path else None
 
-                    print(f"[TELEGRAM STORAGE] SUCCESS! URL: {public_url}")
-                    return public_url
-                else:
-                    print(f"[TELEGRAM STORAGE] getFile failed: {file_result}")
-            else:
-                print(f"[TELEGRAM STORAGE] Upload failed: {result}")
+    def is_file_url(self, url):
+        return url.startswith(f"{self.client.file_url}/")
 
-            return None
+    def is_servable(self, name):
+        """
+        /media/ proksi faqat bazada qayd etilgan nomlarni yuklab oladi: mahsulot
+        yoki StoredBlob'dagi `tg:` nomi, yuklangan fayl (asl rasm, hosila) va
+        yuklangan faylning eski lokal nomi. Ixtiyoriy URL yoki file_id - yo'q.
+        """
+        from .models import Product, RemoteUpload, StoredBlob
 
-        except Exception as e:
-            print(f"[TELEGRAM STORAGE] Exception: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+        if not name.startswith(FILE_ID_PREFIX):
+            return not self.is_remote(name) and RemoteUpload.objects.filter(
+                local_name=name, status=RemoteUpload.DONE,
+            ).exists()
+        return (
+            StoredBlob.objects.filter(name=name).exists()
+            or RemoteUpload.objects.filter(remote_name=name, status=RemoteUpload.DONE).exists()
+            or Product.objects.filter(Q(image=name) | Q(image_2=name) | Q(image_3=name)).exists()
+        )
 
-    def url(self, name):
-        """URL qaytarish"""
-        return name
+    def prefetch_urls(self, names):
+        """Bir nechta rasm URL'ini oldindan hal qilish (keyingi url() chaqiruvlari keshdan)"""
+        if not settings.MEDIA_PROXY_REMOTE:
+            self.resolve_urls(names)
+
+    def resolve_urls(self, names):
+        paths = self.resolve_paths(names)
+        urls = {}
+        for name in names:
+            if name and name.startswith(FILE_ID_PREFIX):
+                path = paths.get(name[len(FILE_ID_PREFIX):])
+                # Yo'l umuman olinmagan bo'lsa - lokal /media/ manzili
+                urls[name] = f"{self.client.file_url}/{path}" if path else self.local.url(name)
+        return urls
+
+    def resolve_paths(self, names):
+        """{file_id: Telegram fayl yo'li} (keshdan, eskirganlari getFile orqali)"""
+        file_ids = {name[len(FILE_ID_PREFIX):] for name in names if name and name.startswith(FILE_ID_PREFIX)}
+        if not file_ids:
+            return {}
+
+        entries = cache.get_many([file_path_cache_key(file_id) for file_id in file_ids])
+        now = time.time()
+        paths = {}
+        expired = []
+        for file_id in file_ids:
+            entry = entries.get(file_path_cache_key(file_id))
+            if entry is not None:
+                paths[file_id] = entry['path']
+            if entry is None or now - entry['fetched'] > FILE_PATH_TTL:
+                expired.append(file_id)
+        metrics.increment('telegram.url.cache_hit', len(file_ids) - len(expired))
+
+        if expired:
+            metrics.increment('telegram.url.cache_miss', len(expired))
+            fetched = {file_id: path for file_id, path in self.fetch_file_paths(expired).items() if path}
+            cache.set_many(
+                {file_path_cache_key(file_id): {'path': path, 'fetched': now} for file_id, path in fetched.items()},
+                FILE_PATH_STALE_TTL,
+            )
+            paths.update(fetched)
+        return paths
+
+    def fetch_file_paths(self, file_ids):
+        """getFile so'rovlari parallel (Bot API'da ommaviy getFile yo'q)"""
+        if len(file_ids) == 1:
+            return {file_ids[0]: self.get_file_path(file_ids[0])}
+        with ThreadPoolExecutor(max_workers=min(RESOLVE_WORKERS, len(file_ids))) as executor:
+            return dict(zip(file_ids, executor.map(self.get_file_path, file_ids)))
+
+    def get_file_path(self, file_id):
+        try:
+            result = self.client.call('getFile', http_method='GET', params={'file_id': file_id}, timeout=5, retries=0)
+        except TelegramAPIError as exc:
+            logger.warning("getFile failed for %s: %s", file_id, exc)
+            return None
+        return result.get('file_path')
 
     def exists(self, name):
-        """Har doim False qaytarish"""
-        return False
+        """Lokal nusxa yoki StoredBlob indeksidagi Telegram fayli bor-yo'qligi"""
+        from .models import StoredBlob
+
+        if name.startswith(FILE_ID_PREFIX):
+            return StoredBlob.objects.filter(name=name).exists()
+        if self.is_remote(name):
+            return False
+        return self.local.exists(name)
 
     def delete(self, name):
-        """Delete operatsiyasi"""
-        pass
+        """Lokal nusxani va uning kutilayotgan yuklashini o'chirish (Telegram'dagi xabar o'chirilmaydi)"""
+        from .models import RemoteUpload
+
+        if name and not self.is_remote(name):
+            RemoteUpload.objects.filter(local_name=name, status=RemoteUpload.PENDING).delete()
+            self.local.delete(name)
 
     def size(self, name):
         """Fayl hajmi"""
-        return 0
\ No newline at end of file
+        if self.is_remote(name):
+            return 0
+        return self.local.size(name)
@@ -0,0 +1,450 @@
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, connections
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.media import MediaCache, serve_media
+
+from .benchmark import seed_catalog
+from .carts import MAX_QUANTITY, add_to_cart, purge_idle_carts
+from .models import Cart, CartItem, Category, Product, StoredBlob
+from .serializers import ProductDetailSerializer, ProductListSerializer
+from .telegram_client import (
+    BACKOFF_BASE, MAX_BACKOFF, CircuitBreaker, CircuitOpenError, TelegramAPIError, TelegramClient,
+)
+from .telegram_storage import TelegramStorage
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+class CartQueryCountTests(TestCase):
+    """CartView so'rovlar soni savatdagi elementlar soniga bog'liq emas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(20)
+        cls.products = list(Product.objects.order_by('id'))
+        cls.user = User.objects.create_user('cart-queries')
+        cls.cart = Cart.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, size):
+        CartItem.objects.filter(cart=self.cart).delete()
+        CartItem.objects.bulk_create(
+            CartItem(cart=self.cart, product=product, quantity=i % 3 + 1)
+            for i, product in enumerate(self.products[:size])
+        )
+
+    def test_cart_view_query_count_is_constant(self):
+        for size in (0, 1, 5, 20):
+            with self.subTest(size=size):
+                self.fill_cart(size)
+                # Savat va uning elementlari (mahsulotlar va jamlar bilan) - ikkita so'rov
+                with self.assertNumQueries(2):
+                    response = self.client.get('/api/products/cart/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['items']), size)
+
+    def test_add_to_cart_is_one_upsert(self):
+        product = self.products[0]
+        add_to_cart(self.user, product.pk, 1)
+        with CaptureQueriesContext(connection) as captured:
+            cart = add_to_cart(self.user, product.pk, 1)
+        # Savat qulfi, upsert va savatni yangilash; tranzaksiya boshqaruvi hisobga olinmaydi
+        queries = [query for query in captured if not query['sql'].startswith(TRANSACTION_CONTROL)]
+        self.assertEqual(len(queries), 3, [query['sql'] for query in queries])
+        self.assertEqual(CartItem.objects.get(cart=cart, product=product).quantity, 2)
+
+
+class CartLockOrderTests(TestCase):
+    """Savatni o'zgartiradigan har bir so'rov elementlardan oldin savat qatorini qulflaydi (checkout tartibi)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(2, categories=1)
+        cls.products = list(Product.objects.order_by('id'))
+        cls.user = User.objects.create_user('cart-lock-order')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        add_to_cart(self.user, self.products[0].pk, 1)
+        self.item = CartItem.objects.get(cart__user=self.user, product=self.products[0])
+
+    def assertLocksCartFirst(self, send):
+        with CaptureQueriesContext(connection) as captured:
+            response = send()
+        self.assertIn(response.status_code, (200, 201), getattr(response, 'data', None))
+        # Savat jadvallariga tegadigan birinchi so'rov - savat qulfi (mahsulot validatsiyasi undan oldin bo'lishi mumkin)
+        statements = [query['sql'] for query in captured if '"products_cart' in query['sql']]
+        self.assertRegex(statements[0], r'^UPDATE "products_cart" SET .* WHERE "user_id" = ', statements)
+
+    def test_mutations_lock_cart_first(self):
+        item_url = f'/api/products/cart/items/{self.item.pk}'
+        requests = {
+            'add': lambda: self.client.post(
+                '/api/products/cart/add/', {'product_id': self.products[1].pk, 'quantity': 1}, format='json',
+            ),
+            'update': lambda: self.client.put(f'{item_url}/update/', {'quantity': 3}, format='json'),
+            'batch': lambda: self.client.post('/api/products/cart/batch/', {'operations': [
+                {'op': 'set', 'product_id': self.products[1].pk, 'quantity': 2},
+            ]}, format='json'),
+            'remove': lambda: self.client.delete(f'{item_url}/remove/'),
+            'clear': lambda: self.client.delete('/api/products/cart/clear/'),
+        }
+        for name, send in requests.items():
+            with self.subTest(name):
+                self.assertLocksCartFirst(send)
+
+
+class PurgedCartTests(TestCase):
+    """purge_idle_carts savatni o'chirgandan keyin qo'shish yangi savat yaratadi (FK xatosi emas)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(2, categories=1)
+        cls.product = Product.objects.order_by('id').first()
+        cls.user = User.objects.create_user('cart-purged')
+
+    def test_add_after_purge_recreates_cart(self):
+        old = add_to_cart(self.user, self.product.pk, 2)
+        deleted, _ = purge_idle_carts(timezone.now() + timedelta(days=1), timezone.now())
+        self.assertGreaterEqual(deleted, 1)
+        self.assertFalse(Cart.objects.filter(pk=old.pk).exists())
+
+        cart = add_to_cart(self.user, self.product.pk, 1)
+        self.assertNotEqual(cart.pk, old.pk)
+        self.assertEqual(cart.total_items, 1)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+
+
+class SparseFieldsTests(TestCase):
+    """Meta.optional_fields faqat ?fields= da so'ralganda chiqadi (ichki serializer'larda ham)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(5, categories=1)
+        cls.product = Product.objects.order_by('id').first()
+
+    def test_similar_products_omit_optional_fields(self):
+        data = ProductDetailSerializer(self.product).data
+        self.assertTrue(data['similar_products'])
+        for similar in data['similar_products']:
+            self.assertNotIn('excerpt', similar)
+
+    def test_optional_field_only_when_requested(self):
+        self.assertNotIn('excerpt', ProductListSerializer(self.product).data)
+        context = {'query_params': {'fields': 'id,excerpt'}}
+        self.assertEqual(list(ProductListSerializer(self.product, context=context).data), ['id', 'excerpt'])
+
+
+class AddToCartConcurrencyTests(TransactionTestCase):
+    """Parallel qo'shishlarda miqdor yo'qolmaydi va foydalanuvchida bitta savat bo'ladi"""
+    requests = 20
+    quantity = 2
+
+    def setUp(self):
+        category = Category.objects.create(name='Concurrency', slug='concurrency')
+        self.product = Product.objects.create(
+            name='Concurrency', slug='concurrency', category=category,
+            description='Test', price=Decimal(1000), uzum_link='https://uzum.uz/',
+        )
+        self.user = User.objects.create_user('cart-concurrency')
+
+    def post(self, _):
+        try:
+            client = APIClient()
+            client.force_authenticate(self.user)
+            return client.post(
+                '/api/products/cart/add/', {'product_id': self.product.pk, 'quantity': self.quantity}, format='json',
+            ).status_code
+        finally:
+            connections.close_all()
+
+    def test_parallel_adds_keep_every_quantity(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(self.post, range(self.requests)))
+
+        self.assertEqual(statuses, [201] * self.requests)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            CartItem.objects.get(cart__user=self.user, product=self.product).quantity,
+            min(self.requests * self.quantity, MAX_QUANTITY),
+        )
+
+
+class FakeBotAPI(BaseHTTPRequestHandler):
+    """Lokal Bot API: server.responses dagi (status, payload) javoblarni navbat bilan qaytaradi"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        server = self.server
+        with server.lock:
+            server.calls.append(self.path)
+            server.bodies.append(body)
+            status, payload = server.responses.pop(0) if server.responses else (200, {'ok': True, 'result': True})
+        if server.hold is not None:
+            server.hold.wait(5)
+        # bytes - fayl (/file/bot.../...) javobi
+        raw = isinstance(payload, bytes)
+        body = payload if raw else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream' if raw else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
+
+def ok(result=True):
+    return 200, {'ok': True, 'result': result}
+
+
+def error(status, description='Error', **parameters):
+    payload = {'ok': False, 'error_code': status, 'description': description}
+    if parameters:
+        payload['parameters'] = parameters
+    return status, payload
+
+
+class FakeBotAPIMixin:
+    """Har bir test uchun threaded http.server'dagi soxta Bot API va unga ulangan klient"""
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBotAPI)
+        self.server.lock = threading.Lock()
+        self.server.calls = []
+        self.server.bodies = []
+        self.server.responses = []
+        self.server.hold = None
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        host, port = self.server.server_address
+        self.client = TelegramClient('TOKEN', api_url=f'http://{host}:{port}')
+        self.addCleanup(self.client.session.close)
+        sleep = mock.patch('products.telegram_client.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def respond(self, *responses):
+        self.server.responses.extend(responses)
+
+
+class TelegramClientTests(FakeBotAPIMixin, SimpleTestCase):
+    """Qayta urinish, retry_after va circuit breaker"""
+
+    def delays(self):
+        return [call.args[0] for call in self.sleep.call_args_list]
+
+    def test_server_errors_are_retried_with_exponential_backoff(self):
+        self.respond(error(500), error(502), ok({'message_id': 1}))
+        self.assertEqual(self.client.call('sendMessage'), {'message_id': 1})
+
+        self.assertEqual(self.server.calls, ['/botTOKEN/sendMessage'] * 3)
+        first, second = self.delays()
+        # Jitter: kutish + [0, kutish / 4]
+        self.assertTrue(BACKOFF_BASE <= first <= BACKOFF_BASE * 1.25, first)
+        self.assertTrue(BACKOFF_BASE * 2 <= second <= BACKOFF_BASE * 2.5, second)
+        self.assertEqual(self.client.breaker.failures, 0)
+
+    def test_gives_up_after_max_retries(self):
+        self.respond(*[error(503)] * 3)
+        with self.assertRaises(TelegramAPIError):
+            self.client.call('sendMessage', retries=2)
+        self.assertEqual(len(self.server.calls), 3)
+        self.assertEqual(len(self.delays()), 2)
+        self.assertEqual(self.client.breaker.failures, 1)
+
+    def test_retry_after_is_honoured(self):
+        self.respond(error(429, 'Too Many Requests', retry_after=3), ok())
+        self.assertTrue(self.client.call('sendMessage'))
+        [delay] = self.delays()
+        self.assertTrue(3 <= delay <= 3.75, delay)
+
+    def test_long_flood_wait_is_not_slept_in_process(self):
+        self.respond(error(429, 'Too Many Requests', retry_after=MAX_BACKOFF + 1))
+        with self.assertRaises(TelegramAPIError) as raised:
+            self.client.call('sendMessage')
+        self.assertEqual(raised.exception.retry_after, MAX_BACKOFF + 1)
+        self.assertEqual(len(self.server.calls), 1)
+        self.assertEqual(self.delays(), [])
+
+    def test_client_errors_are_not_retried_and_keep_breaker_closed(self):
+        self.client.breaker = CircuitBreaker(failure_threshold=1)
+        self.respond(error(400, 'Bad Request: chat not found'))
+        with self.assertRaises(TelegramAPIError) as raised:
+            self.client.call('sendMessage')
+        self.assertIsNone(raised.exception.retry_after)
+        self.assertEqual(len(self.server.calls), 1)
+        self.assertFalse(self.client.breaker.is_open)
+
+    def test_circuit_opens_and_rejects_without_calling_telegram(self):
+        self.client.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.respond(error(500), error(500))
+        with self.assertLogs('products.telegram_client', 'ERROR'):
+            for _ in range(2):
+                with self.assertRaises(TelegramAPIError):
+                    self.client.call('sendMessage', retries=0)
+        self.assertTrue(self.client.breaker.is_open)
+
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.client.call('sendMessage')
+        self.assertGreater(raised.exception.retry_after, 0)
+        self.assertEqual(len(self.server.calls), 2)
+
+    def open_breaker_past_reset_timeout(self):
+        breaker = self.client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        with self.assertLogs('products.telegram_client', 'ERROR'):
+            breaker.record_failure()
+        breaker.opened_at -= breaker.reset_timeout
+        self.assertFalse(breaker.is_open)
+        return breaker
+
+    def test_half_open_allows_a_single_probe(self):
+        self.open_breaker_past_reset_timeout()
+        self.server.hold = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            probe = executor.submit(self.client.call, 'getMe', retries=0)
+            while not self.server.calls:
+                threading.Event().wait(0.01)
+            # Sinov so'rovi javob kutayotganda boshqa so'rovlar yuborilmaydi
+            with self.assertRaises(CircuitOpenError):
+                self.client.call('sendMessage')
+            self.server.hold.set()
+            self.assertTrue(probe.result(timeout=5))
+
+        self.assertEqual(self.server.calls, ['/botTOKEN/getMe'])
+        self.assertEqual(self.client.breaker.failures, 0)
+        self.assertIsNone(self.client.breaker.opened_at)
+
+    def test_failed_probe_reopens_circuit(self):
+        breaker = self.open_breaker_past_reset_timeout()
+        self.respond(error(502))
+        with self.assertRaises(TelegramAPIError):
+            self.client.call('getMe', retries=0)
+        self.assertTrue(breaker.is_open)
+        with self.assertRaises(CircuitOpenError):
+            self.client.call('getMe')
+        self.assertEqual(len(self.server.calls), 1)
+
+
+class FakeTelegramStorageMixin(FakeBotAPIMixin):
+    """Soxta Bot API'ga ulangan TelegramStorage (lokal nusxalar vaqtinchalik papkada)"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        client = self.client
+
+        class Storage(TelegramStorage):
+            client = None
+
+        self.storage = Storage()
+        self.storage.client = client
+        self.storage.chat_id = 42
+        self.storage.local = FileSystemStorage(location=directory.name)
+
+
+class TelegramStorageUploadTests(FakeTelegramStorageMixin, SimpleTestCase):
+    """JPEG - sendPhoto, boshqa turlar (WebP hosilalar) - sendDocument, baytma-bayt"""
+
+    def test_variants_are_sent_as_documents_with_their_type(self):
+        webp = b'RIFF\x10\x00\x00\x00WEBPVP8 ' + bytes(range(256))
+        name = self.storage.local.save('thumbnails/1-image-abcd1234-160.webp', ContentFile(webp))
+        self.respond(ok({'message_id': 1, 'document': {'file_id': 'DOC'}}))
+
+        self.assertEqual(self.storage.upload(name), 'tg:DOC')
+        self.assertEqual(self.server.calls, ['/botTOKEN/sendDocument'])
+        body = self.server.bodies[0]
+        self.assertIn(b'name="document"; filename="1-image-abcd1234-160.webp"\r\nContent-Type: image/webp', body)
+        self.assertIn(webp, body)
+        self.assertIn(b'name="disable_content_type_detection"', body)
+
+    def test_jpeg_is_sent_as_photo(self):
+        name = self.storage.local.save('products/photo.jpg', ContentFile(b'\xff\xd8\xff jpeg'))
+        self.respond(ok({'message_id': 1, 'photo': [{'file_id': 'SMALL'}, {'file_id': 'LARGE'}]}))
+
+        self.assertEqual(self.storage.upload(name), 'tg:LARGE')
+        self.assertEqual(self.server.calls, ['/botTOKEN/sendPhoto'])
+        self.assertIn(b'Content-Type: image/jpeg', self.server.bodies[0])
+
+
+class MediaProxyTests(FakeTelegramStorageMixin, TestCase):
+    """/media/ proksi ixtiyoriy URL yoki qayd etilmagan file_id'ni yuklab olmaydi (SSRF)"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, value in (('default_storage', self.storage), ('media_cache', MediaCache(directory.name, 1 << 20))):
+            patcher = mock.patch(f'core.media.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def get(self, name):
+        return serve_media(self.factory.get(f'/media/{name}'), name)
+
+    def test_arbitrary_urls_are_not_fetched(self):
+        host, port = self.server.server_address
+        for name in (f'http://{host}:{port}/internal', f'https://{host}:{port}/internal'):
+            with self.subTest(name=name):
+                with self.assertRaises(Http404):
+                    self.get(name)
+                with self.assertRaises(FileNotFoundError):
+                    self.storage.open(name)
+        self.assertEqual(self.server.calls, [])
+
+    def test_unreferenced_file_id_is_not_resolved(self):
+        with self.assertRaises(Http404):
+            self.get('tg:UNKNOWN')
+        self.assertEqual(self.server.calls, [])
+
+    def test_non_bot_api_file_path_is_refused(self):
+        StoredBlob.objects.create(sha256='0' * 64, name='tg:ESCAPE')
+        host, port = self.server.server_address
+        with mock.patch.object(self.storage, 'resolve_paths', return_value={'ESCAPE': 'x'}), \
+                mock.patch.object(self.storage, 'remote_url', return_value=f'http://{host}:{port}/internal'):
+            with self.assertRaises(Http404):
+                self.get('tg:ESCAPE')
+        self.assertEqual(self.server.calls, [])
+
+    def test_referenced_file_id_is_served(self):
+        StoredBlob.objects.create(sha256='1' * 64, name='tg:KNOWN')
+        image = b'\xff\xd8\xff known image'
+        self.respond(ok({'file_id': 'KNOWN', 'file_path': 'photos/file_1.jpg'}), (200, image))
+
+        response = self.get('tg:KNOWN')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), image)
+        self.assertEqual(
+            [path.split('?')[0] for path in self.server.calls],
+            ['/botTOKEN/getFile', '/file/botTOKEN/photos/file_1.jpg'],
+        )
@@ -0,0 +1,287 @@
+"""
+Mahsulot rasmlarining WebP hosilalari (Product.image_variants).
+
+    image_variants = {
+        'image': {
+            'source': 'tg:...',            # qaysi asl rasmdan yaratilgan
+            'lqip': 'data:image/webp;...', # 16px blur placeholder
+            'widths': {'160': 'thumbnails/...webp', '320': ..., '640': ...},
+        },
+        'image_2': {...},
+    }
+
+Rasm yuklanganda (post_save, commit'dan keyin) hosilalar ProcessPoolExecutor'da
+yaratiladi: pool'ga baytlar emas, vaqtinchalik fayl yo'llari beriladi (lokal
+rasm - hard link, Telegram'dagisi - diskka bo'laklab), ya'ni asl rasmlar so'rov
+jarayoni xotirasiga o'qilmaydi. Natijalar
+odatiy storage orqali saqlanadi (Telegram bo'lsa - o'sha yuklash navbati,
+WebP fayllar sendDocument bilan - qayta siqilmaydi).
+Mavjud rasmlar uchun `build_image_variants` komandasi.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .imaging import render_many
+from .models import Product, RemoteUpload
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = ('image', 'image_2', 'image_3')
+CHUNK_SIZE = 64 * 1024
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Jarayon uchun umumiy process pool (spawn - thread'li jarayondan fork xavfsiz emas)"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def image_storage():
+    return Product._meta.get_field('image').storage
+
+
+# ---------- image_variants'dan o'qish ----------
+
+def sorted_widths(entry):
+    return sorted(entry['widths'].items(), key=lambda item: int(item[0]))
+
+
+def build_srcset(variants, field, url):
+    entry = (variants or {}).get(field)
+    if not entry:
+        return None
+    return ', '.join(f"{url(name)} {width}w" for width, name in sorted_widths(entry))
+
+
+def thumbnail_name(variants, field, width):
+    """`width` dan kichik bo'lmagan eng kichik nusxa (bo'lmasa eng kattasi)"""
+    entry = (variants or {}).get(field)
+    if not entry:
+        return None
+    widths = sorted_widths(entry)
+    for rendition_width, name in widths:
+        if int(rendition_width) >= width:
+            return name
+    return widths[-1][1]
+
+
+def placeholder(variants, field):
+    entry = (variants or {}).get(field)
+    return entry['lqip'] if entry else None
+
+
+def variant_names(variants, field):
+    entry = (variants or {}).get(field)
+    return list(entry['widths'].values()) if entry else []
+
+
+def replace_variant_name(variants, old_name, new_name):
+    """Lokal nom Telegram nomiga almashtirilganda JSON ichidagi nomlarni ham yangilash"""
+    if isinstance(variants, dict):
+        return {key: replace_variant_name(value, old_name, new_name) for key, value in variants.items()}
+    return new_name if variants == old_name else variants
+
+
+# ---------- yaratish ----------
+
+def stale_fields(product, force=False):
+    """Hosilalari yo'q yoki boshqa rasmdan yaratilgan maydonlar"""
+    variants = product.image_variants or {}
+    return [
+        field for field in IMAGE_FIELDS
+        if getattr(product, field)
+        and (force or (variants.get(field) or {}).get('source') != getattr(product, field).name)
+    ]
+
+
+def local_file_path(storage, name):
+    """Storage'dagi faylning lokal yo'li (TelegramStorage - uning lokal nusxasi), bo'lmasa None"""
+    local = getattr(storage, 'local', storage)
+    try:
+        path = local.path(name)
+    except (NotImplementedError, SuspiciousFileOperation):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def stage_images(product, fields, directory):
+    """
+    Asl rasmlarni `directory` ga tayyorlash: {maydon: fayl yo'li}. Lokal fayl
+    hard link qilinadi (upload worker uni o'chirsa ham yo'l ishlaydi), aks holda
+    bo'laklab nusxalanadi - fayl butunligicha xotiraga olinmaydi.
+    """
+    paths = {}
+    for field in fields:
+        fieldfile = getattr(product, field)
+        target = os.path.join(directory, field)
+        source_path = local_file_path(fieldfile.storage, fieldfile.name)
+        try:
+            try:
+                if source_path is None:
+                    raise OSError
+                os.link(source_path, target)
+            except OSError:  # masofaviy fayl, boshqa disk yoki orada o'chirilgan
+                with fieldfile.storage.open(fieldfile.name, 'rb') as content, open(target, 'wb') as staged:
+                    for chunk in content.chunks(CHUNK_SIZE):
+                        staged.write(chunk)
+        except Exception as exc:
+            logger.warning("Cannot read %s for product %s: %s", fieldfile.name, product.pk, exc)
+            continue
+        paths[field] = target
+    return paths
+
+
+def variant_file_name(product_id, field, source, width):
+    digest = hashlib.md5(source.encode('utf-8')).hexdigest()[:8]
+    return f"thumbnails/{product_id}-{field}-{digest}-{width}.webp"
+
+
+def is_same_source(source, current):
+    # Hosila yaratilayotganda asl rasm Telegram'ga yuklanib, nomi tg:... ga almashgan bo'lishi mumkin
+    return source == current or RemoteUpload.objects.filter(local_name=source, remote_name=current).exists()
+
+
+def store_variants(product_id, sources, results):
+    """Natijalarni storage'ga yozib, image_variants'ni yangilash (rasm orada almashmagan bo'lsa)"""
+    storage = image_storage()
+    entries = {}
+    for field, result in results.items():
+        if result is None:
+            continue
+        entries[field] = {
+            'source': sources[field],
+            'lqip': result['lqip'],
+            'widths': {
+                str(width): storage.save(variant_file_name(product_id, field, sources[field], width), ContentFile(data))
+                for width, data in result['widths'].items()
+            },
+        }
+
+    obsolete = []
+    # Optimistik qulf (updated_at): SQLite'da ham thread'lar bir-birini bloklamaydi
+    for _ in range(3):
+        product = Product.objects.only('id', 'updated_at', 'image_variants', *IMAGE_FIELDS).filter(pk=product_id).first()
+        if product is None:
+            obsolete = [name for entry in entries.values() for name in entry['widths'].values()]
+            break
+        variants = dict(product.image_variants or {})
+        obsolete = []
+        for field in IMAGE_FIELDS:
+            current = getattr(product, field).name
+            entry = entries.get(field)
+            if entry is not None and current and is_same_source(entry['source'], current):
+                obsolete += variant_names(variants, field)
+                variants[field] = {**entry, 'source': current}
+            elif entry is not None:
+                obsolete += entry['widths'].values()
+            if not current and field in variants:
+                obsolete += variant_names(variants, field)
+                del variants[field]
+        updated = Product.objects.filter(pk=product_id, updated_at=product.updated_at).update(
+            image_variants=variants, updated_at=timezone.now()
+        )
+        if updated:
+            bump_catalog_version()
+            break
+    else:
+        # Uchala urinish ham muvaffaqiyatsiz: bazadagi hosilalar hali ishlatiladi,
+        # faqat shu safar yozilgan (hech qayerda saqlanmagan) fayllar o'chiriladi
+        stored = {name for field in IMAGE_FIELDS for name in variant_names(product.image_variants, field)}
+        obsolete = [
+            name for entry in entries.values() for name in entry['widths'].values() if name not in stored
+        ]
+
+    if obsolete:
+        for name in obsolete:
+            storage.delete(name)
+
+
+def _store_result(product_id, sources, directory, future):
+    try:
+        store_variants(product_id, sources, future.result())
+    except Exception:
+        logger.exception("Storing image variants failed for product %s", product_id)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        close_old_connections()
+
+
+def schedule_variants(product_id):
+    """Yangi yoki almashtirilgan rasmlar uchun hosilalarni process pool'da yaratish"""
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None:
+        return
+    fields = stale_fields(product)
+    if not fields:
+        return
+    directory = tempfile.mkdtemp(prefix='thumbnails-')
+    images = stage_images(product, fields, directory)
+    sources = {field: getattr(product, field).name for field in images}
+    if not images or not settings.THUMBNAIL_WORKERS:
+        try:
+            if images:
+                store_variants(product_id, sources, render_many(images, settings.THUMBNAIL_WIDTHS))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        return
+    future = get_executor().submit(render_many, images, settings.THUMBNAIL_WIDTHS)
+    future.add_done_callback(lambda done: _store_result(product_id, sources, directory, done))
+
+
+def backfill_variants(queryset, force=False, batch_size=20):
+    """Mavjud mahsulotlar uchun hosilalar; yangilangan mahsulotlar sonini qaytaradi"""
+    executor = get_executor() if settings.THUMBNAIL_WORKERS else None
+    mapper = executor.map if executor else map
+    products = queryset.only('id', 'image_variants', *IMAGE_FIELDS).order_by('id')
+    updated = 0
+    batch = []
+    with tempfile.TemporaryDirectory(prefix='thumbnails-') as directory:
+        for product in products.iterator(chunk_size=batch_size):
+            fields = stale_fields(product, force)
+            if not fields:
+                continue
+            staging = os.path.join(directory, str(product.pk))
+            os.mkdir(staging)
+            images = stage_images(product, fields, staging)
+            if images:
+                batch.append((product.pk, {field: getattr(product, field).name for field in images}, images))
+            if len(batch) >= batch_size:
+                updated += _render_batch(batch, mapper)
+                batch = []
+        if batch:
+            updated += _render_batch(batch, mapper)
+    return updated
+
+
+def _render_batch(batch, mapper):
+    results = mapper(render_many, [images for _, _, images in batch], repeat(settings.THUMBNAIL_WIDTHS))
+    for (product_id, sources, images), result in zip(batch, results):
+        store_variants(product_id, sources, result)
+        for path in images.values():
+            os.unlink(path)
+    return len(batch)
@@ -0,0 +1,42 @@
+"""
+Fayl yuklash handler'lari: fayl bo'laklari (64 KB) kelishi bilan sha256
+hisoblanadi (`uploaded_file.sha256`) va hajmi UPLOAD_MAX_FILE_SIZE dan
+oshsa yuklash darhol to'xtatiladi (RequestDataTooBig -> 413,
+core.middleware.UploadLimitMiddleware). FILE_UPLOAD_MAX_MEMORY_SIZE dan
+katta fayllar xotirada emas, vaqtinchalik faylda yig'iladi.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+class HashingMixin:
+    def new_file(self, *args, **kwargs):
+        # MemoryFileUploadHandler.new_file StopFutureHandlers ko'taradi - hasher oldinroq
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_FILE_SIZE:
+            raise RequestDataTooBig(
+                f"{self.file_name}: fayl hajmi {filesizeformat(settings.UPLOAD_MAX_FILE_SIZE)} dan oshmasligi kerak"
+            )
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.sha256 = self.hasher.hexdigest()
+        return uploaded_file
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    pass
@@ -0,0 +1,179 @@
+"""
+Telegram'ga rasm yuklash navbati (RemoteUpload jadvali).
+
+TelegramStorage faylni lokal diskka yozadi va `enqueue_upload` ni chaqiradi.
+Har bir jarayonda bitta fon thread'i (`worker`) navbatdagi yozuvlarni
+yuklaydi, xatoda eksponensial kutish bilan qayta urinadi. Jarayon qayta
+ishga tushsa qolgan yozuvlarni `process_uploads` komandasi yoki keyingi
+uyg'onish oladi.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import Product, RemoteUpload, StoredBlob
+from .telegram_client import CircuitOpenError
+from .telegram_storage import TelegramStorage
+from .thumbnails import replace_variant_name
+from .workers import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = ('image', 'image_2', 'image_3')
+MAX_ATTEMPTS = 8
+RETRY_DELAY = 5  # soniya, har urinishda ikki barobar oshadi
+MAX_RETRY_DELAY = 3600
+STALE_UPLOAD_TIMEOUT = 600  # 'uploading' holatida qotib qolgan yozuv (jarayon o'lgan)
+POLL_INTERVAL = 30
+
+
+def enqueue_upload(local_name):
+    """Lokal faylni yuklash navbatiga qo'yish va worker'ni uyg'otish"""
+    fields = {
+        'status': RemoteUpload.PENDING,
+        'remote_name': '',
+        'attempts': 0,
+        'last_error': '',
+        'next_attempt_at': timezone.now(),
+    }
+    # update_or_create o'rniga avval yozish: SQLite'da worker thread bilan o'qish->yozish qulfi bo'lmaydi
+    if not RemoteUpload.objects.filter(local_name=local_name).update(**fields, updated_at=timezone.now()):
+        RemoteUpload.objects.create(local_name=local_name, **fields)
+    if settings.TELEGRAM_UPLOAD_WORKER:
+        transaction.on_commit(worker.wake)
+
+
+def due_uploads_filter(now):
+    stale = now - timedelta(seconds=STALE_UPLOAD_TIMEOUT)
+    return (
+        Q(status=RemoteUpload.PENDING, next_attempt_at__lte=now)
+        | Q(status=RemoteUpload.UPLOADING, updated_at__lt=stale)
+    )
+
+
+def claim_upload(upload_id):
+    """Yozuvni atomar ravishda band qilish (bir nechta jarayon bir vaqtda ishlasa ham)"""
+    now = timezone.now()
+    claimed = RemoteUpload.objects.filter(due_uploads_filter(now), id=upload_id).update(
+        status=RemoteUpload.UPLOADING, updated_at=now
+    )
+    return claimed == 1
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def apply_remote_name(local_name, remote_name):
+    """Mahsulot maydonlari va rasm hosilalarini lokal nomdan Telegram nomiga (tg:<file_id>) almashtirish"""
+    updated = 0
+    for field in IMAGE_FIELDS:
+        updated += Product.objects.filter(**{field: local_name}).update(
+            **{field: remote_name, 'updated_at': timezone.now()}
+        )
+    # WebP hosilalari va ularning `source` nomlari image_variants ichida
+    for product in Product.objects.filter(image_variants__icontains=local_name).only('id', 'image_variants'):
+        updated += Product.objects.filter(pk=product.pk).update(
+            image_variants=replace_variant_name(product.image_variants, local_name, remote_name),
+            updated_at=timezone.now(),
+        )
+    # Keyingi bir xil yuklashlar to'g'ridan-to'g'ri Telegram nomini oladi
+    StoredBlob.objects.filter(name=local_name).update(name=remote_name, updated_at=timezone.now())
+    if updated:
+        transaction.on_commit(bump_catalog_version)
+    return updated
+
+
+def apply_completed_uploads(product):
+    """
+    Worker mahsulot saqlanishidan oldin ulgurgan bo'lsa (yuklash tez tugasa),
+    saqlangan mahsulotdagi lokal nomlarni ham almashtirish.
+    """
+    if not isinstance(default_storage, TelegramStorage):
+        return
+    names = [
+        getattr(product, field).name for field in IMAGE_FIELDS
+        if getattr(product, field) and not default_storage.is_remote(getattr(product, field).name)
+    ]
+    if not names:
+        return
+    completed = RemoteUpload.objects.filter(local_name__in=names, status=RemoteUpload.DONE)
+    for local_name, remote_name in completed.values_list('local_name', 'remote_name'):
+        apply_remote_name(local_name, remote_name)
+
+
+def process_upload(upload, storage):
+    try:
+        remote_name = storage.upload(upload.local_name)
+    except CircuitOpenError as exc:
+        # Telegram vaqtincha o'chiq - urinish hisoblanmaydi, fayl lokal qoladi
+        upload.status = RemoteUpload.PENDING
+        upload.next_attempt_at = timezone.now() + timedelta(seconds=exc.retry_after or RETRY_DELAY)
+        upload.save(update_fields=['status', 'next_attempt_at', 'updated_at'])
+        return False
+    except Exception as exc:
+        upload.attempts += 1
+        upload.last_error = str(exc)
+        if upload.attempts >= MAX_ATTEMPTS:
+            upload.status = RemoteUpload.FAILED
+            logger.error("Telegram upload failed permanently: %s (%s)", upload.local_name, exc)
+        else:
+            upload.status = RemoteUpload.PENDING
+            delay = retry_delay(upload.attempts)
+            # 429 flood-wait: Telegram aytgan muddatdan oldin urinmaymiz
+            delay = max(delay, timedelta(seconds=getattr(exc, 'retry_after', None) or 0))
+            upload.next_attempt_at = timezone.now() + delay
+            logger.warning("Telegram upload failed, retrying: %s (%s)", upload.local_name, exc)
+        upload.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at', 'updated_at'])
+        return False
+
+    with transaction.atomic():
+        upload.status = RemoteUpload.DONE
+        upload.remote_name = remote_name
+        upload.attempts += 1
+        upload.last_error = ''
+        upload.save(update_fields=['status', 'remote_name', 'attempts', 'last_error', 'updated_at'])
+        apply_remote_name(upload.local_name, remote_name)
+    storage.delete(upload.local_name)
+    return True
+
+
+def process_due_uploads(limit=50, storage=None):
+    """Vaqti kelgan yozuvlarni yuklash; qayta ishlanganlar sonini qaytaradi"""
+    storage = storage or default_storage
+    ids = list(
+        RemoteUpload.objects.filter(due_uploads_filter(timezone.now()))
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:limit]
+    )
+    workers = min(len(ids), settings.TELEGRAM_UPLOAD_CONCURRENCY)
+    if workers < 2:
+        return sum(process_claimed(upload_id, storage) for upload_id in ids)
+    # Bir nechta rasm (masalan, bitta mahsulotning 3 tasi) bir vaqtda yuklanadi
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='telegram-upload') as executor:
+        return sum(executor.map(lambda upload_id: process_in_thread(upload_id, storage), ids))
+
+
+def process_claimed(upload_id, storage):
+    if not claim_upload(upload_id):
+        return 0  # Boshqa jarayon oldi
+    process_upload(RemoteUpload.objects.get(id=upload_id), storage)
+    return 1
+
+
+def process_in_thread(upload_id, storage):
+    try:
+        return process_claimed(upload_id, storage)
+    finally:
+        connections.close_all()  # pool thread'i tugaydi - ulanishi qolib ketmasin
+
+
+# Uyg'otilganda yoki POLL_INTERVAL da navbatni bo'shatadi
+worker = BackgroundWorker('telegram-upload-worker', process_due_uploads, POLL_INTERVAL)
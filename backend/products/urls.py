@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import (
-    CategoryListView, ProductListView, ProductDetailView, FeaturedProductsView,
+    CategoryListView, ProductListView, ProductDetailView, FeaturedProductsView, ProductFacetsView,
     AdminProductListView, AdminProductCreateView, AdminProductUpdateView, AdminProductDeleteView
 )
 from .auth_views import (
@@ -8,7 +8,7 @@ from .auth_views import (
     UserRegisterView, UserLoginView, UserLogoutView, UserCheckAuthView, UserProfileView
 )
 from .cart_views import (
-    CartView, AddToCartView, UpdateCartItemView, RemoveFromCartView, ClearCartView
+    CartView, AddToCartView, UpdateCartItemView, RemoveFromCartView, ClearCartView, CartBatchView
 )
 from .order_views import (
     OrderListView, OrderDetailView, CreateOrderView, CancelOrderView
@@ -19,6 +19,7 @@ urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('', ProductListView.as_view(), name='product-list'),
     path('featured/', FeaturedProductsView.as_view(), name='featured-products'),
+    path('facets/', ProductFacetsView.as_view(), name='product-facets'),
 
     # CSRF Token
     path('auth/csrf/', CSRFTokenView.as_view(), name='csrf-token'),
@@ -40,6 +41,7 @@ urlpatterns = [
     path('cart/items/<int:item_id>/update/', UpdateCartItemView.as_view(), name='update-cart-item'),
     path('cart/items/<int:item_id>/remove/', RemoveFromCartView.as_view(), name='remove-from-cart'),
     path('cart/clear/', ClearCartView.as_view(), name='clear-cart'),
+    path('cart/batch/', CartBatchView.as_view(), name='cart-batch'),
 
     # Order endpoints
     path('orders/', OrderListView.as_view(), name='order-list'),
@@ -1,62 +1,111 @@
-from rest_framework import generics, filters, status
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAdminUser
-from .models import Category, Product
-from .serializers import CategorySerializer, ProductListSerializer, ProductDetailSerializer, ProductAdminSerializer
-
-
-class CategoryListView(generics.ListAPIView):
-    queryset = Category.objects.all()
+from django.db.models import Count, Max
+from .cache import CatalogCacheMixin, ConditionalGetMixin
+from .models import Category, Product, SimilarProduct
+from .facets import get_catalog_facets
+from .fastpath import product_detail_rows, product_list_rows
+from .filters import CatalogOrderingFilter, ProductSearchFilter, apply_catalog_filters, parse_catalog_filters
+from .pagination import CatalogPagination
+from .serializers import (
+    CategorySerializer, ProductListSerializer, ProductDetailSerializer, ProductAdminSerializer,
+    fallback_similar_queryset, only_columns, similar_products_queryset, sparse_query_params
+)
+
+
+def product_validator_values(queryset):
+    """ETag/Last-Modified uchun mahsulotlar va ularning kategoriyalari bo'yicha agregat"""
+    return queryset.order_by().aggregate(
+        updated_at=Max('updated_at'),
+        category_updated_at=Max('category__updated_at'),
+        count=Count('id', distinct=True),
+    )
+
+
+class CategoryListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     serializer_class = CategorySerializer
 
+    def get_queryset(self):
+        # ?fields= bo'yicha faqat kerakli ustunlar
+        return Category.objects.only(*only_columns(CategorySerializer, sparse_query_params(self.request)))
+
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     """Mahsulotlar ro'yxati - filter, qidiruv va ordering bilan"""
     serializer_class = ProductListSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
-    ordering_fields = ['price', 'name', 'created_at']
+    pagination_class = CatalogPagination
+    filter_backends = [ProductSearchFilter, CatalogOrderingFilter]
+    ordering_fields = ['price', 'effective_price', 'name', 'created_at']
     ordering = ['-created_at']
 
     def get_queryset(self):
         queryset = Product.objects.filter(is_active=True)
+        # Kategoriya (slug), ?on_sale= va narx oralig'i filterlari
+        return apply_catalog_filters(queryset, parse_catalog_filters(self.request.query_params))
 
-        # Kategoriya filter (slug bo'yicha)
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__slug=category)
-
-        # Narx oralig'i filter
-        min_price = self.request.query_params.get('min_price', None)
-        max_price = self.request.query_params.get('max_price', None)
-
-        if min_price:
-            try:
-                queryset = queryset.filter(price__gte=float(min_price))
-            except ValueError:
-                pass  # Invalid min_price, ignore
+    def list(self, request, *args, **kwargs):
+        # Tezkor yo'l: bitta .values() JOIN so'rovi, ProductListSerializer'siz
+        rows = product_list_rows.values(self.filter_queryset(self.get_queryset()), request)
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(product_list_rows.render(page, request, sparse=True))
 
-        if max_price:
-            try:
-                queryset = queryset.filter(price__lte=float(max_price))
-            except ValueError:
-                pass  # Invalid max_price, ignore
 
-        return queryset
-
-
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductDetailView(ConditionalGetMixin, CatalogCacheMixin, generics.RetrieveAPIView):
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductDetailSerializer
     lookup_field = 'slug'
 
+    def get_validator_values(self):
+        # Mahsulotning o'zi bilan kategoriyasi va oldindan hisoblangan o'xshashlar - ikkita
+        # alohida indeksli so'rov (bitta OR'li JOIN kategoriyani o'zi bilan ko'paytirardi)
+        product = Product.objects.filter(slug=self.kwargs['slug'])
+        category = product_validator_values(Product.objects.filter(category__in=product.values('category')))
+        # Bog'lanishlarning o'zi ham (fon worker'i ro'yxatni qayta yozsa created_at o'zgaradi)
+        similar = SimilarProduct.objects.filter(product__in=product.values('pk')).aggregate(
+            created_at=Max('created_at'),
+            updated_at=Max('similar__updated_at'),
+            category_updated_at=Max('similar__category__updated_at'),
+            count=Count('id'),
+        )
+        return {
+            **{f'category_{key}': value for key, value in category.items()},
+            **{f'similar_{key}': value for key, value in similar.items()},
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        rows = product_detail_rows.values(self.get_queryset(), request, extra=('id', 'category'))
+        row = get_object_or_404(rows, slug=kwargs['slug'])
+        similar = None
+        if 'similar_products' in product_detail_rows.selected_keys(request):
+            similar = list(product_list_rows.values(similar_products_queryset(row['id'])))
+            if not similar:
+                similar = list(product_list_rows.values(fallback_similar_queryset(row['id'], row['category'])))
+            # Mahsulot va o'xshashlar rasmlari bitta getFile to'plamida
+            product_detail_rows.prefetch_images([row] + similar)
+
+        data = product_detail_rows.render([row], request, sparse=True)[0]
+        if similar is not None:
+            data['similar_products'] = product_list_rows.render(similar, request)
+        return Response(data)
+
+
+class FeaturedProductsView(ConditionalGetMixin, CatalogCacheMixin, APIView):
+    def get(self, request):
+        products = Product.objects.filter(is_active=True, is_featured=True)
+        rows = product_list_rows.values(products, request)[:4]
+        return Response(product_list_rows.render(rows, request, sparse=True))
+
+
+class ProductFacetsView(APIView):
+    """Filter paneli uchun kategoriya sonlari, narx gistogrammasi va chegirmalar"""
 
-class FeaturedProductsView(APIView):
     def get(self, request):
-        products = Product.objects.filter(is_active=True, is_featured=True)[:4]
-        serializer = ProductListSerializer(products, many=True, context={'request': request})
-        return Response(serializer.data)
+        params = parse_catalog_filters(request.query_params)
+        query = ProductSearchFilter().get_search_query(request)
+        return Response(get_catalog_facets(params, query))
 
 
 # ==========================================
@@ -67,13 +116,13 @@ class AdminProductListView(generics.ListAPIView):
     """Admin uchun barcha mahsulotlar ro'yxati (faol va nofaol)"""
     permission_classes = [IsAdminUser]
     serializer_class = ProductAdminSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
-    ordering_fields = ['price', 'name', 'created_at']
+    pagination_class = CatalogPagination
+    filter_backends = [ProductSearchFilter, CatalogOrderingFilter]
+    ordering_fields = ['price', 'effective_price', 'name', 'created_at']
     ordering = ['-created_at']
 
     def get_queryset(self):
-        return Product.objects.all()
+        return Product.objects.only(*only_columns(ProductAdminSerializer, sparse_query_params(self.request)))
 
 
 class AdminProductCreateView(generics.CreateAPIView):
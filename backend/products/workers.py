@@ -0,0 +1,41 @@
+"""Jarayon ichidagi fon thread'lari (Telegram yuklashlari, o'xshash mahsulotlar)"""
+import logging
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """
+    Uyg'otilganda yoki `poll_interval` da `drain()` ni u 0 qaytarguncha chaqiradi.
+    Navbatning o'zi bazada - jarayon o'lsa ham ish yo'qolmaydi.
+    """
+
+    def __init__(self, name, drain, poll_interval=None):
+        self.name = name
+        self.drain = drain
+        self.poll_interval = poll_interval
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def wake(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self.thread.start()
+        self.event.set()
+
+    def run(self):
+        while True:
+            self.event.wait(self.poll_interval)
+            self.event.clear()
+            try:
+                while self.drain():
+                    pass
+            except Exception:
+                logger.exception("%s error", self.name)
+            finally:
+                close_old_connections()